@@ -0,0 +1,145 @@
+"""
+Сравнение задержек страниц профиля и поста под конкурентной нагрузкой
+через WSGI- и ASGI-обработчики Django.
+
+Клиенты входят на сайт: анонимные запросы после прогрева отдавал бы кэш
+страниц (``posts.pagecache``), и замер не доходил бы ни до асинхронных
+представлений, ни до ``gather_queries``.
+
+Запуск из корня проекта::
+
+    python benchmarks/asgi_vs_wsgi.py --requests 400 --concurrency 16
+
+Данные создаются во временной тестовой базе и удаляются после замера.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import AsyncClient, Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from posts.models import Comment, Follow, Post  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(name, latencies, elapsed):
+    return (
+        f'{name:<6} rps={len(latencies) / elapsed:8.1f} '
+        f'p50={percentile(latencies, 0.50) * 1000:7.2f}ms '
+        f'p95={percentile(latencies, 0.95) * 1000:7.2f}ms '
+        f'p99={percentile(latencies, 0.99) * 1000:7.2f}ms '
+        f'mean={statistics.mean(latencies) * 1000:7.2f}ms'
+    )
+
+
+def seed(authors, posts_per_author, comments_per_post):
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'bench_{i}', email=f'bench_{i}@yatube.ru')
+        for i in range(authors)
+    ])
+    users = list(CustomUser.objects.filter(username__startswith='bench_'))
+    Post.objects.bulk_create([
+        Post(author=user, heading='Заголовок', text=f'Текст {i}')
+        for user in users for i in range(posts_per_author)
+    ])
+    posts = list(Post.objects.all())
+    Comment.objects.bulk_create([
+        Comment(post=post, author=users[i % len(users)], text='Комментарий')
+        for post in posts for i in range(comments_per_post)
+    ])
+    Follow.objects.bulk_create([
+        Follow(user=user, author=users[(index + 1) % len(users)])
+        for index, user in enumerate(users)
+    ])
+    urls = [
+        f'/{post.author.username}/' if index % 2 else
+        f'/{post.author.username}/{post.pk}/'
+        for index, post in enumerate(
+            Post.objects.select_related('author')[:50]
+        )
+    ]
+    return urls, users[0]
+
+
+def run_wsgi(urls, user, total, concurrency):
+    client = Client()
+    client.force_login(user)
+
+    def fetch(index):
+        started = time.perf_counter()
+        response = client.get(urls[index % len(urls)])
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(fetch, range(total)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_asgi(urls, user, total, concurrency):
+    client = AsyncClient()
+    await sync_to_async(client.force_login)(user)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(index):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(urls[index % len(urls)])
+            assert response.status_code == 200, response.status_code
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(fetch(i) for i in range(total)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--authors', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--comments', type=int, default=5)
+    options = parser.parse_args()
+
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        urls, user = seed(options.authors, options.posts, options.comments)
+        # Прогрев: шаблоны, кэш карточек, соединения.
+        run_wsgi(urls, user, len(urls), 1)
+        wsgi = run_wsgi(urls, user, options.requests, options.concurrency)
+        asgi = asyncio.run(
+            run_asgi(urls, user, options.requests, options.concurrency)
+        )
+        print(f'{options.requests} запросов, конкурентность '
+              f'{options.concurrency}')
+        print(summary('WSGI', *wsgi))
+        print(summary('ASGI', *asgi))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
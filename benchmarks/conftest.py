@@ -0,0 +1,150 @@
+import os
+import random
+
+import pytest
+
+from .harness import (baseline_changes, load_baseline, measure, regressions,
+                      save_baseline, slowdowns)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('yatube benchmarks')
+    group.addoption('--bench-iterations', type=int, default=30,
+                    help='Сколько замеров делать для каждого сценария.')
+    group.addoption('--bench-tolerance', type=float, default=0.25,
+                    help='Допустимый рост пика памяти (0.25 = +25%%).')
+    group.addoption('--bench-latency-tolerance', type=float, default=0.5,
+                    help='Допустимый рост задержки p50 (для p99 — вдвое '
+                         'больше).')
+    group.addoption('--bench-gate-latency', action='store_true',
+                    help='Падать и на росте задержек. По умолчанию он '
+                         'только попадает в отчёт: на общих CI-машинах '
+                         'задержки шумят.')
+    group.addoption('--bench-scale', type=int, default=1,
+                    help='Множитель объёма тестовых данных.')
+    group.addoption('--bench-baseline', default=DEFAULT_BASELINE,
+                    help='Файл с baseline.')
+    group.addoption('--bench-update-baseline', action='store_true',
+                    help='Записать результаты прогона в baseline.')
+
+
+def pytest_configure(config):
+    config.bench_report = {'slowdowns': [], 'changes': []}
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    report = getattr(config, 'bench_report', None)
+    if not report:
+        return
+    sections = (
+        ('slowdowns', 'задержки хуже baseline'),
+        ('changes', 'изменения baseline — опишите их в коммите'),
+    )
+    for key, title in sections:
+        if report[key]:
+            terminalreporter.section(title)
+            for line in report[key]:
+                terminalreporter.write_line(line)
+
+
+@pytest.fixture(scope='session')
+def bench_data(request, django_db_setup, django_db_blocker):
+    """Пользователи, группы, посты, комментарии и подписки для замеров."""
+    from posts.models import Comment, Follow, Group, Post
+    from posts.timeline import rebuild_timeline
+    from users.models import CustomUser, change_counters
+
+    scale = request.config.getoption('--bench-scale')
+    users_count, groups_count = 100 * scale, 10 * scale
+    rnd = random.Random(0)
+    with django_db_blocker.unblock():
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench_{i}', email=f'bench_{i}@yatube.ru')
+            for i in range(users_count)
+        ])
+        users = list(CustomUser.objects.filter(username__startswith='bench_'))
+        Group.objects.bulk_create([
+            Group(title=f'Группа {i}', slug=f'bench-group-{i}',
+                  description='Описание')
+            for i in range(groups_count)
+        ])
+        groups = list(Group.objects.filter(slug__startswith='bench-group-'))
+        for user in users:
+            posts = [
+                Post(author=user, heading='Заголовок',
+                     text=f'Текст поста {i} ' * 10,
+                     group=rnd.choice(groups + [None]))
+                for i in range(10)
+            ]
+            for post in posts:
+                post.save()
+            change_counters(user.pk, posts_count=len(posts))
+        posts = list(Post.objects.all())
+        Comment.objects.bulk_create([
+            Comment(post=post, author=rnd.choice(users), text='Комментарий')
+            for post in posts for _ in range(3)
+        ])
+        reader = users[0]
+        for author in users[1:11]:
+            if Follow.objects.follow(reader, author):
+                change_counters(reader.pk, follows_count=1)
+                change_counters(author.pk, followers_count=1)
+        rebuild_timeline(reader)
+        post = Post.objects.filter(author=users[1]).first()
+    return {'reader': reader, 'author': users[1], 'group': groups[0],
+            'post': post}
+
+
+@pytest.fixture(scope='session')
+def bench_results(request):
+    results = {}
+    yield results
+    if request.config.getoption('--bench-update-baseline') and results:
+        path = request.config.getoption('--bench-baseline')
+        baseline = load_baseline(path)
+        baseline.update(results)
+        save_baseline(path, baseline)
+
+
+@pytest.fixture
+def benchmark(request, bench_results):
+    """
+    ``benchmark(name, func)`` замеряет сценарий, печатает результат и
+    падает, если запросов стало больше или пик памяти вырос сверх
+    допуска. Рост задержек попадает в отчёт в конце прогона, а с
+    ``--bench-gate-latency`` тоже валит сценарий.
+    """
+    config = request.config
+    baseline = load_baseline(config.getoption('--bench-baseline'))
+
+    def run(name, func):
+        measurement = measure(
+            name, func, config.getoption('--bench-iterations')
+        )
+        print(measurement)
+        bench_results[name] = measurement.as_dict()
+        if config.getoption('--bench-update-baseline'):
+            changes = baseline_changes(baseline.get(name),
+                                       bench_results[name])
+            if changes:
+                config.bench_report['changes'].append(
+                    f'{name}: ' + '; '.join(changes)
+                )
+            return measurement
+        slower = slowdowns(measurement, baseline.get(name),
+                           config.getoption('--bench-latency-tolerance'))
+        if slower:
+            config.bench_report['slowdowns'].append(
+                f'{name}: ' + '; '.join(slower)
+            )
+        problems = regressions(measurement, baseline.get(name),
+                               config.getoption('--bench-tolerance'))
+        if config.getoption('--bench-gate-latency'):
+            problems += slower
+        if problems:
+            pytest.fail(f'{name}: ' + '; '.join(problems))
+        return measurement
+
+    return run
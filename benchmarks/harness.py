@@ -0,0 +1,140 @@
+"""
+Замеры для бенчмарков: задержки (p50/p99), число SQL-запросов и пик
+памяти на запрос, сравнение с сохранённым baseline.
+
+По умолчанию бенчмарк падает только на детерминированных метриках:
+число запросов не может расти, пик памяти — не больше допуска. Задержки
+зависят от загрузки машины, поэтому их рост попадает в отчёт, а валит
+прогон только с ``--bench-gate-latency`` (на выделенной машине).
+
+Baseline перезаписывается в том же коммите, что меняет замеры, и
+сообщение коммита называет принятое изменение: ``--bench-update-baseline``
+печатает список изменений метрик для него.
+"""
+import json
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Measurement:
+    def __init__(self, name, latencies, queries, peak_memory):
+        self.name = name
+        self.latencies = latencies
+        self.queries = queries
+        self.peak_memory = peak_memory
+
+    @property
+    def p50(self):
+        return percentile(self.latencies, 0.50)
+
+    @property
+    def p99(self):
+        return percentile(self.latencies, 0.99)
+
+    def as_dict(self):
+        return {
+            'p50_ms': round(self.p50 * 1000, 3),
+            'p99_ms': round(self.p99 * 1000, 3),
+            'queries': self.queries,
+            'peak_kb': round(self.peak_memory / 1024, 1),
+        }
+
+    def __str__(self):
+        data = self.as_dict()
+        return (
+            f'{self.name:<24} p50={data["p50_ms"]:8.2f}ms '
+            f'p99={data["p99_ms"]:8.2f}ms queries={data["queries"]:3} '
+            f'peak={data["peak_kb"]:9.1f}KB'
+        )
+
+
+def measure(name, func, iterations, warmup=2):
+    """
+    Вызывает ``func`` ``warmup + iterations`` раз. Запросы и память
+    считаются по последнему прогону, задержки — по всем после прогрева.
+    """
+    for _ in range(warmup):
+        func()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - started)
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            func()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return Measurement(name, latencies, len(queries), peak_memory)
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as baseline:
+            return json.load(baseline)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump(results, baseline, indent=2, sort_keys=True,
+                  ensure_ascii=False)
+        baseline.write('\n')
+
+
+GATED_METRICS = ('queries', 'peak_kb')
+
+
+def regressions(measurement, baseline, memory_tolerance):
+    """Регрессии, на которых бенчмарк падает: запросы и пик памяти."""
+    if not baseline:
+        return []
+    current = measurement.as_dict()
+    problems = []
+    if current['queries'] > baseline['queries']:
+        problems.append(
+            f'запросов {current["queries"]} > {baseline["queries"]}'
+        )
+    if current['peak_kb'] > baseline['peak_kb'] * (1 + memory_tolerance):
+        problems.append(
+            f'peak_kb {current["peak_kb"]} > {baseline["peak_kb"]} '
+            f'(+{memory_tolerance:.0%})'
+        )
+    return problems
+
+
+def slowdowns(measurement, baseline, tolerance):
+    """Рост задержек сверх допуска; валит прогон с ``--bench-gate-latency``."""
+    if not baseline:
+        return []
+    current = measurement.as_dict()
+    # Хвост распределения шумнее медианы, поэтому допуск для p99 вдвое шире.
+    limits = {'p50_ms': tolerance, 'p99_ms': 2 * tolerance}
+    return [
+        f'{key} {current[key]} > {baseline[key]} (+{allowed:.0%})'
+        for key, allowed in limits.items()
+        if current[key] > baseline[key] * (1 + allowed)
+    ]
+
+
+def baseline_changes(baseline, current):
+    """Изменения проверяемых метрик, которые вносит перезапись baseline."""
+    if not baseline:
+        return ['новый сценарий']
+    return [
+        f'{key} {baseline[key]} -> {current[key]}'
+        for key in GATED_METRICS
+        if baseline[key] != current[key]
+    ]
@@ -0,0 +1,255 @@
+"""
+Сравнение профилей настроек ``development`` и ``production``: время
+запуска воркера и задержка запросов.
+
+Запуск из корня проекта::
+
+    python benchmarks/profiles.py --users 200 --requests 100 --starts 5
+
+Каждый замер идёт в отдельном процессе с нужным ``YATUBE_ENV``: у
+профилей разные ``INSTALLED_APPS``, в одном процессе их не сравнить.
+``preload`` — боевой профиль с ``YATUBE_PRELOAD=1``. Запуск — время от
+``import django`` до готового ``yatube.wsgi`` (с настройкой приложений,
+загрузкой middleware и прогревом), медиана из ``--starts`` процессов.
+Затем процесс форкает «воркер», который отрабатывает по запросу на
+страницу и сообщает, сколько памяти сделал своей (``Private_Dirty``,
+только Linux), и сам запрашивает тестовым клиентом главную анонимом,
+профиль и пост от имени пользователя с подписками и файл статики; для
+каждой страницы печатаются первый запрос и медиана остальных.
+
+База (generate_data) и собранная статика (collectstatic) лежат во
+временном каталоге, кэш у всех профилей в памяти процесса.
+
+Пример (SQLite, 200 пользователей, 100 запросов)::
+
+                               development    production       preload
+    запуск, мс                       527.4         449.5         532.9
+    модулей загружено                  759           722           815
+    своя память воркера, КБ          34096         22968         22196
+    index, первый, мс                261.5          29.7          28.4
+    index, мс                         43.2           0.6           0.6
+    profile, первый, мс              132.3          39.1          40.3
+    profile, мс                       77.4          28.4          25.7
+    post, первый, мс                  97.5          32.0          28.0
+    post, мс                          81.1          26.1          27.4
+    static, первый, мс                55.2           5.9           4.4
+    static, мс                        42.6           0.5           0.5
+
+В разработке на каждом ответе работает панель отладки (на HTML — и
+рендерится, даже если страница взята из кэша), SQL пишется в
+``connection.queries``, а шаблоны разбираются заново. Боевой профиль
+запускается быстрее, хотя и прогревает шаблоны: не импортируется
+панель отладки со своими зависимостями. ``preload`` запускается дольше,
+но под ``gunicorn --preload`` это время тратит один мастер, а воркеры
+получают всё готовым через fork.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRODUCTION = {
+    'YATUBE_ENV': 'production',
+    'DJANGO_SECRET_KEY': 'benchmark-secret-key',
+    'DJANGO_ALLOWED_HOSTS': 'testserver',
+}
+PROFILES = {
+    'development': {'YATUBE_ENV': 'development'},
+    'production': PRODUCTION,
+    'preload': {**PRODUCTION, 'YATUBE_PRELOAD': '1'},
+}
+
+
+def setup(directory):
+    """Настраивает Django в дочернем процессе; возвращает время запуска."""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'yatube.settings'
+
+    from django.conf import settings
+    settings.DATABASES['default'] = {
+        'ENGINE': 'yatube.backends.sqlite3',
+        'NAME': os.path.join(directory, 'default.sqlite3'),
+    }
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+    settings.STATIC_ROOT = os.path.join(directory, 'static')
+
+    import yatube.wsgi  # noqa: F401
+    return time.perf_counter() - started
+
+
+def prepare(users):
+    from django.core.management import call_command
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    call_command('generate_data', users=users, workers=1,
+                 stdout=io.StringIO())
+    call_command('collectstatic', interactive=False, verbosity=0)
+
+
+def timed(client, url):
+    started = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, (url, response.status_code)
+    return elapsed
+
+
+def page_clients():
+    from django.db.models import Count
+    from django.templatetags.static import static
+    from django.test import Client
+    from django.urls import reverse
+
+    from posts.models import Post
+    from users.models import CustomUser
+
+    reader = CustomUser.objects.order_by('-follows_count').first()
+    author = CustomUser.objects.order_by('-posts_count').first()
+    post = Post.objects.annotate(
+        total=Count('comments')
+    ).order_by('-total').first()
+    anonymous = Client()
+    client = Client()
+    client.force_login(reader)
+    return {
+        'index': (anonymous, reverse('index')),
+        'profile': (client, reverse('profile', args=[author.username])),
+        'post': (client, reverse('post', args=[post.author.username,
+                                               post.pk])),
+        'static': (anonymous, static('admin/css/base.css')),
+    }
+
+
+def run_requests(requests):
+    results = {}
+    for page, (page_client, url) in page_clients().items():
+        first = timed(page_client, url)
+        rest = [timed(page_client, url) for _ in range(requests)]
+        results[page] = (first, statistics.median(rest))
+    return results
+
+
+def private_dirty_kb():
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            if line.startswith('Private_Dirty:'):
+                return int(line.split()[1])
+    return 0
+
+
+def worker_private_kb():
+    """
+    Сколько памяти форкнутый воркер сделал своей (скопировал или выделил),
+    отработав по запросу на страницу, — как воркер gunicorn после fork.
+    """
+    from django.db import connections
+
+    connections.close_all()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        try:
+            for page_client, url in page_clients().values():
+                timed(page_client, url)
+            os.write(write, str(private_dirty_kb()).encode())
+        finally:
+            os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        value = pipe.read()
+    os.waitpid(pid, 0)
+    return int(value)
+
+
+def child(options):
+    startup = setup(options.directory)
+    if options.prepare:
+        prepare(options.users)
+        return
+    result = {'startup': startup, 'modules': len(sys.modules)}
+    if options.requests:
+        if os.path.exists('/proc/self/smaps_rollup'):
+            result['worker_private_kb'] = worker_private_kb()
+        result['pages'] = run_requests(options.requests)
+    print(json.dumps(result))
+
+
+def spawn(directory, profile, *args):
+    output = subprocess.run(
+        [sys.executable, '-W', 'ignore', os.path.abspath(__file__),
+         '--child', '--directory', directory, *args],
+        env={**os.environ, 'YATUBE_PRELOAD': '0', **PROFILES[profile],
+             'DJANGO_SETTINGS_MODULE': 'yatube.settings'},
+        check=True, capture_output=True, text=True, cwd=ROOT,
+    ).stdout
+    return json.loads(output.splitlines()[-1]) if output else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--starts', type=int, default=5)
+    parser.add_argument('--child', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', action='store_true',
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--directory', help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    if options.child:
+        child(options)
+        return
+
+    directory = tempfile.mkdtemp(prefix='yatube-profiles-bench-')
+    try:
+        # collectstatic с хешами нужен только боевому профилю.
+        spawn(directory, 'production', '--prepare',
+              '--users', str(options.users))
+        rows = {}
+        for profile in PROFILES:
+            starts = [
+                spawn(directory, profile, '--requests', '0')
+                for _ in range(options.starts - 1)
+            ]
+            full = spawn(directory, profile,
+                         '--requests', str(options.requests))
+            starts.append(full)
+            rows.setdefault('запуск, мс', []).append(
+                statistics.median(run['startup'] for run in starts) * 1000
+            )
+            rows.setdefault('модулей загружено', []).append(full['modules'])
+            if 'worker_private_kb' in full:
+                rows.setdefault('своя память воркера, КБ', []).append(
+                    full['worker_private_kb']
+                )
+            for page, (first, median) in full['pages'].items():
+                rows.setdefault(f'{page}, первый, мс', []).append(
+                    first * 1000
+                )
+                rows.setdefault(f'{page}, мс', []).append(median * 1000)
+
+        print(f'{"":<24}' + ''.join(f'{profile:>14}' for profile in PROFILES))
+        for title, values in rows.items():
+            print(f'{title:<24}' + ''.join(
+                f'{value:14.0f}' if isinstance(value, int)
+                else f'{value:14.1f}'
+                for value in values
+            ))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Пропускная способность читателей SQLite, пока параллельно пишут
+писатели: штатный бэкенд против ``yatube.backends.sqlite3``.
+
+Запуск из корня проекта::
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 4
+
+Для каждого бэкенда создаётся отдельный файл базы во временном
+каталоге. Читатели крутят запрос главной ленты, писатели в транзакциях
+добавляют комментарии и правят посты.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+ENGINES = {
+    'plain': 'django.db.backends.sqlite3',
+    'tuned': 'yatube.backends.sqlite3',
+}
+DIRECTORY = tempfile.mkdtemp(prefix='yatube-sqlite-bench-')
+for alias, engine in ENGINES.items():
+    settings.DATABASES[alias] = {
+        'ENGINE': engine,
+        'NAME': os.path.join(DIRECTORY, f'{alias}.sqlite3'),
+    }
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import OperationalError, connections, transaction  # noqa: E402
+
+from posts.feeds import build_feed  # noqa: E402
+from posts.models import Comment, Post  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+
+
+def seed(alias, authors, posts_per_author):
+    call_command('migrate', database=alias, run_syncdb=True, verbosity=0)
+    CustomUser.objects.using(alias).bulk_create([
+        CustomUser(username=f'bench_{i}', email=f'bench_{i}@yatube.ru')
+        for i in range(authors)
+    ])
+    users = list(CustomUser.objects.using(alias).all())
+    Post.objects.using(alias).bulk_create([
+        Post(author=user, heading='Заголовок', text=f'Текст {i}')
+        for user in users for i in range(posts_per_author)
+    ])
+    return [user.pk for user in users], list(
+        Post.objects.using(alias).values_list('pk', flat=True)
+    )
+
+
+def run(alias, readers, writers, duration, user_ids, post_ids):
+    stop = threading.Event()
+    stats = {'reads': 0, 'writes': 0, 'write_errors': 0, 'read_errors': 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            stats[key] += 1
+
+    def reader():
+        try:
+            while not stop.is_set():
+                try:
+                    list(build_feed(Post.objects.using(alias))[:10])
+                except OperationalError:
+                    bump('read_errors')
+                else:
+                    bump('reads')
+        finally:
+            connections[alias].close()
+
+    def writer():
+        rng = random.Random()
+        try:
+            while not stop.is_set():
+                post_id = rng.choice(post_ids)
+                try:
+                    with transaction.atomic(using=alias):
+                        # bulk_create без сигналов: поисковый индекс
+                        # пишется в базу по умолчанию.
+                        Comment.objects.using(alias).bulk_create([Comment(
+                            post_id=post_id,
+                            author_id=rng.choice(user_ids),
+                            text='Комментарий',
+                        )])
+                        Post.objects.using(alias).filter(pk=post_id).update(
+                            text=f'Текст {rng.random()}'
+                        )
+                except OperationalError:
+                    bump('write_errors')
+                else:
+                    bump('writes')
+        finally:
+            connections[alias].close()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {key: value / duration if key in ('reads', 'writes') else value
+            for key, value in stats.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--authors', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=20)
+    options = parser.parse_args()
+
+    print(f'{options.readers} читателей, {options.writers} писателей, '
+          f'{options.duration:.0f} с')
+    try:
+        for alias in ENGINES:
+            user_ids, post_ids = seed(alias, options.authors, options.posts)
+            connections[alias].close()
+            result = run(alias, options.readers, options.writers,
+                         options.duration, user_ids, post_ids)
+            print(
+                f'{alias:<6} чтений/с={result["reads"]:8.1f} '
+                f'записей/с={result["writes"]:7.1f} '
+                f'ошибок чтения={result["read_errors"]} '
+                f'ошибок записи={result["write_errors"]}'
+            )
+    finally:
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
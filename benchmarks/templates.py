@@ -0,0 +1,265 @@
+"""
+Стоимость рендера шаблонов лент: без кэша шаблонов и с кэширующим
+загрузчиком, по страницам и по отдельным шаблонам.
+
+Запуск из корня проекта::
+
+    python benchmarks/templates.py --users 300 --requests 50
+
+База во временном каталоге заполняется generate_data, страницы
+запрашиваются тестовым клиентом от имени пользователя с подписками.
+Время каждого шаблона меряется обёрткой над ``Template._render``:
+«всего» — вместе с вложенными шаблонами, «своё» — без них. Блоки
+дочернего шаблона рендерит родитель, поэтому их время попадает в
+``base.html``; поиск и разбор шаблона в ``{% include %}`` — в
+шаблон, который его включает. С ``--cold-cards`` кэш очищается перед
+каждым запросом, и карточки постов (``post_card.html``) рендерятся
+заново, а не берутся из ``{% cache %}``.
+
+В конце — время первого запроса главной в свежем воркере без прогрева
+шаблонов и после ``warm_templates``.
+
+Пример (SQLite, 300 пользователей, карточки из кэша, сокращено)::
+
+    страница                  без кэша                 кэш
+    index               14.33 ( 7.30)       9.21 ( 4.40)
+    profile             32.75 ( 7.71)      23.63 ( 3.34)
+    post                29.24 (10.89)      19.98 ( 5.48)
+    шаблон                                 вызовов  без кэша      своё     всего
+    base.html                                  1.0    2269.8     450.8    3207.9
+    nav.html                                   1.0    1228.4     993.6     993.6
+    posts/comment_list.html                    0.2    3555.8    3160.9    3160.9
+    posts/post_item.html                       5.2     112.4      86.1      86.1
+    первый запрос главной без прогрева: 17.1 мс
+    первый запрос главной после прогрева: 13.1 мс (прогрев 67 шаблонов 31.6 мс)
+
+Без кэша почти половина рендера уходит на поиск и разбор включаемых
+шаблонов (своё время ``base.html`` и ``comments.html``); с кэшем
+дороже всего ``nav.html`` и список комментариев.
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp(prefix='yatube-templates-bench-')
+settings.DATABASES['default'] = {
+    'ENGINE': 'yatube.backends.sqlite3',
+    'NAME': os.path.join(DIRECTORY, 'default.sqlite3'),
+}
+settings.CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+# Без панели отладки и с шаблонами, как в бою.
+settings.DEBUG = False
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.template.base import Template  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from posts.models import Group, Post  # noqa: E402
+from users.models import CustomUser  # noqa: E402
+from yatube.warmup import warm_templates  # noqa: E402
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def templates_with(loaders):
+    engine = settings.TEMPLATES[0]
+    return [{
+        **engine,
+        'APP_DIRS': False,
+        'OPTIONS': {**engine['OPTIONS'], 'loaders': loaders},
+    }]
+
+
+PROFILES = {
+    'без кэша': templates_with(LOADERS),
+    'кэш': templates_with([('django.template.loaders.cached.Loader',
+                            LOADERS)]),
+}
+
+
+class RenderTimer:
+    """Время ``Template._render`` по именам шаблонов."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stack = []
+        self.calls = Counter()
+        self.total = defaultdict(float)
+        self.own = defaultdict(float)
+        self.outer = 0.0
+
+    def wrap(self, render):
+        timer = self
+
+        def _render(template, context):
+            timer.stack.append(0.0)
+            started = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = timer.stack.pop()
+                name = template.origin.template_name or '<строка>'
+                timer.calls[name] += 1
+                timer.total[name] += elapsed
+                timer.own[name] += elapsed - children
+                if timer.stack:
+                    timer.stack[-1] += elapsed
+                else:
+                    timer.outer += elapsed
+        return _render
+
+
+def pages():
+    reader = CustomUser.objects.order_by('-follows_count').first()
+    author = CustomUser.objects.order_by('-posts_count').first()
+    group = Group.objects.annotate(
+        total=Count('group_posts')
+    ).order_by('-total').first()
+    post = Post.objects.annotate(
+        total=Count('comments')
+    ).order_by('-total').first()
+    return reader, {
+        'index': reverse('index'),
+        'group': reverse('group', kwargs={'slug': group.slug}),
+        'profile': reverse('profile', args=[author.username]),
+        'post': reverse('post', args=[post.author.username, post.pk]),
+        'follow_index': reverse('follow_index'),
+        'trending': reverse('trending'),
+    }
+
+
+def request(client, url, cold_cards):
+    if cold_cards:
+        cache.clear()
+    started = time.perf_counter()
+    response = client.get(url)
+    elapsed = time.perf_counter() - started
+    assert response.status_code == 200, (url, response.status_code)
+    return elapsed
+
+
+def measure(client, urls, timer, requests, cold_cards):
+    """Медианы запроса и рендера по страницам, счётчики шаблонов."""
+    results = {}
+    totals = (Counter(), defaultdict(float), defaultdict(float))
+    for page, url in urls.items():
+        # Первый запрос компилирует шаблоны и наполняет кэши.
+        request(client, url, cold_cards)
+        latencies, renders = [], []
+        for _ in range(requests):
+            timer.reset()
+            latencies.append(request(client, url, cold_cards))
+            renders.append(timer.outer)
+            totals[0].update(timer.calls)
+            for name in timer.calls:
+                totals[1][name] += timer.total[name]
+                totals[2][name] += timer.own[name]
+        results[page] = (median(latencies), median(renders))
+    return results, totals
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+def first_request(client, url, warm):
+    with override_settings(TEMPLATES=PROFILES['кэш']):
+        warmed = ''
+        if warm:
+            started = time.perf_counter()
+            compiled, _ = warm_templates()
+            warmed = (f' (прогрев {compiled} шаблонов '
+                      f'{(time.perf_counter() - started) * 1000:.1f} мс)')
+        elapsed = request(client, url, cold_cards=True)
+    return elapsed, warmed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--cold-cards', action='store_true')
+    options = parser.parse_args()
+
+    timer = RenderTimer()
+    Template._render = timer.wrap(Template._render)
+    try:
+        call_command('migrate', run_syncdb=True, verbosity=0)
+        call_command('generate_data', users=options.users, workers=1,
+                     stdout=io.StringIO())
+        reader, urls = pages()
+        client = Client()
+        client.force_login(reader)
+
+        measured = {}
+        for profile, templates in PROFILES.items():
+            with override_settings(TEMPLATES=templates):
+                measured[profile] = measure(client, urls, timer,
+                                            options.requests,
+                                            options.cold_cards)
+
+        cards = 'заново' if options.cold_cards else 'из кэша'
+        print(f'медианы из {options.requests} запросов, карточки {cards}; '
+              'мс на запрос (из них рендер)')
+        print(f'{"страница":<14}' + ''.join(
+            f'{profile:>20}' for profile in PROFILES
+        ))
+        for page in urls:
+            print(f'{page:<14}' + ''.join(
+                f'{latency * 1000:11.2f} ({render * 1000:5.2f})'
+                for latency, render in (
+                    measured[profile][0][page] for profile in PROFILES
+                )
+            ))
+
+        total_requests = options.requests * len(urls)
+        plain_calls, _, plain_own = measured['без кэша'][1]
+        calls, total, own = measured['кэш'][1]
+        print()
+        print('мкс на вызов: своё без кэша, своё и всего с кэшем')
+        print(f'{"шаблон":<36}{"вызовов":>10}{"без кэша":>10}'
+              f'{"своё":>10}{"всего":>10}')
+        for name, _ in sorted(total.items(), key=lambda item: -item[1]):
+            print(
+                f'{name:<36}{calls[name] / total_requests:10.1f}'
+                f'{plain_own[name] / plain_calls[name] * 1e6:10.1f}'
+                f'{own[name] / calls[name] * 1e6:10.1f}'
+                f'{total[name] / calls[name] * 1e6:10.1f}'
+            )
+
+        print()
+        for warm in (False, True):
+            elapsed, warmed = first_request(client, urls['index'], warm)
+            title = 'после прогрева' if warm else 'без прогрева'
+            print(f'первый запрос главной {title}: '
+                  f'{elapsed * 1000:.1f} мс{warmed}')
+    finally:
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import pytest
+from django.contrib.auth import authenticate
+
+pytestmark = pytest.mark.django_db
+
+PASSWORD = 'bench-password'
+
+
+@pytest.fixture
+def login_user(bench_data):
+    user = bench_data['author']
+    user.set_password(PASSWORD)
+    user.save(update_fields=['password'])
+    return user
+
+
+def login(username, password, expect_user):
+    def request():
+        user = authenticate(username=username, password=password)
+        assert (user is not None) == expect_user, user
+    return request
+
+
+def test_login_by_email(benchmark, login_user):
+    benchmark('login_by_email',
+              login(login_user.email.upper(), PASSWORD, True))
+
+
+def test_login_by_username(benchmark, login_user):
+    benchmark('login_by_username',
+              login(login_user.username, PASSWORD, True))
+
+
+def test_login_unknown_user(benchmark, login_user):
+    benchmark('login_unknown_user', login('nobody', PASSWORD, False))
@@ -0,0 +1,73 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def reader_client(bench_data):
+    client = Client()
+    client.force_login(bench_data['reader'])
+    return client
+
+
+def get_ok(client, url):
+    def request():
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+    return request
+
+
+def test_index(benchmark, reader_client):
+    benchmark('index', get_ok(reader_client, reverse('index')))
+
+
+def test_group_posts(benchmark, reader_client, bench_data):
+    url = reverse('group', kwargs={'slug': bench_data['group'].slug})
+    benchmark('group_posts', get_ok(reader_client, url))
+
+
+def test_profile(benchmark, reader_client, bench_data):
+    url = reverse('profile', args=[bench_data['author'].username])
+    benchmark('profile', get_ok(reader_client, url))
+
+
+def test_post_view(benchmark, reader_client, bench_data):
+    post = bench_data['post']
+    url = reverse('post', args=[post.author.username, post.pk])
+    benchmark('post_view', get_ok(reader_client, url))
+
+
+def test_follow_index(benchmark, reader_client):
+    benchmark('follow_index', get_ok(reader_client, reverse('follow_index')))
+
+
+def test_new_post(benchmark, reader_client):
+    def request():
+        response = reader_client.post(
+            reverse('new_post'), {'heading': 'Заголовок', 'text': 'Текст'}
+        )
+        assert response.status_code == 302, response.status_code
+    benchmark('new_post', request)
+
+
+def test_add_comment(benchmark, reader_client, bench_data):
+    post = bench_data['post']
+    url = reverse('add_comment', args=[post.author.username, post.pk])
+
+    def request():
+        response = reader_client.post(url, {'text': 'Комментарий'})
+        assert response.status_code == 302, response.status_code
+    benchmark('add_comment', request)
+
+
+def test_follow_unfollow(benchmark, reader_client, bench_data):
+    username = bench_data['author'].username
+    follow = reverse('profile_follow', args=[username])
+    unfollow = reverse('profile_unfollow', args=[username])
+
+    def request():
+        reader_client.get(unfollow)
+        reader_client.get(follow)
+    benchmark('follow_unfollow', request)
@@ -1,9 +1,22 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import matching_ids_sql, search_enabled
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """Поиск в админке через FTS5-индекс вместо LIKE по всей таблице."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search_enabled():
+            return super().get_search_results(request, queryset, search_term)
+        queryset = queryset.filter(
+            pk__in=matching_ids_sql(self.model, search_term)
+        )
+        return queryset, False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         "pk",
         "text",
@@ -23,7 +36,7 @@ class GroupAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = (
         "pk",
         "text",
@@ -0,0 +1,93 @@
+"""
+URL аватаров авторов для карточек постов и профиля.
+
+``{% avatar %}`` из django-avatar ищет аватар каждого пользователя
+отдельным запросом и проверяет миниатюру на диске: ``AVATAR_CACHE_ENABLED``
+выключен, потому что его кэш сбрасывается не при всех изменениях. Здесь
+URL лежит в кэше под ключом с версией автора из ``posts.cards``, а
+версия меняется при добавлении, смене и удалении аватара (``signals``).
+URL всех авторов страницы читаются одним ``get_many``, промахи
+дочитываются одним запросом к ``Avatar``.
+"""
+from avatar.conf import settings
+from avatar.models import Avatar
+from avatar.providers import PrimaryAvatarProvider
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .cards import author_versions
+
+AVATAR_URL_KEY = 'avatar_url:{}:{}:{}'
+AVATAR_URL_TIMEOUT = getattr(settings, 'AVATAR_URL_TIMEOUT', 24 * 60 * 60)
+
+
+def _provider_url(user, size):
+    """URL от остальных провайдеров (Gravatar, аватар по умолчанию)."""
+    for provider_path in settings.AVATAR_PROVIDERS:
+        provider = import_string(provider_path)
+        if provider is PrimaryAvatarProvider:
+            continue
+        url = provider.get_avatar_url(user, size)
+        if url:
+            return url
+    return ''
+
+
+def _load_urls(users, size):
+    """
+    Основные аватары пользователей одним запросом; недостающие миниатюры
+    нарезаются, как в ``avatar.utils.get_primary_avatar``.
+    """
+    users = {user.pk: user for user in users}
+    urls = {}
+    avatars = Avatar.objects.filter(user_id__in=users).order_by(
+        'user_id', '-primary', '-date_uploaded'
+    )
+    for avatar in avatars:
+        if avatar.user_id in urls:
+            continue
+        # Путь к файлу строится по пользователю, он уже загружен.
+        avatar.user = users[avatar.user_id]
+        if not avatar.thumbnail_exists(size):
+            avatar.create_thumbnail(size)
+        urls[avatar.user_id] = avatar.avatar_url(size)
+    for user_id, user in users.items():
+        if user_id not in urls:
+            urls[user_id] = _provider_url(user, size)
+    return urls
+
+
+def avatar_urls(users, size=settings.AVATAR_DEFAULT_SIZE):
+    """URL аватаров ``{id пользователя: url}``; пустая строка — аватара нет."""
+    users = {user.pk: user for user in users}
+    versions = author_versions(users)
+    keys = {user_id: AVATAR_URL_KEY.format(user_id, size, version)
+            for user_id, version in versions.items()}
+    cached = cache.get_many(keys.values())
+    urls = {user_id: cached[key] for user_id, key in keys.items()
+            if key in cached}
+    missing = [user for user_id, user in users.items() if user_id not in urls]
+    if missing:
+        loaded = _load_urls(missing, size)
+        cache.set_many({keys[user_id]: url for user_id, url in loaded.items()},
+                       timeout=AVATAR_URL_TIMEOUT)
+        urls.update(loaded)
+    return urls
+
+
+def attach_avatar_urls(users, size=settings.AVATAR_DEFAULT_SIZE):
+    """Запоминает URL аватаров на пользователях для ``feed_avatar``."""
+    users = list(users)
+    if not users:
+        return
+    urls = avatar_urls(users, size)
+    for user in users:
+        user.__dict__.setdefault('avatar_urls', {})[size] = urls[user.pk]
+
+
+def user_avatar_url(user, size=settings.AVATAR_DEFAULT_SIZE):
+    """URL аватара, запомненный ``attach_avatar_urls``, или из кэша."""
+    attached = user.__dict__.get('avatar_urls', {})
+    if size in attached:
+        return attached[size]
+    return avatar_urls([user], size)[user.pk]
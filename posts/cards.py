@@ -0,0 +1,85 @@
+"""
+Версии закэшированных карточек постов (``post_item.html``).
+
+Фрагмент карточки кэшируется по id поста и его версии. Версия поста
+меняется при правке, удалении и новых или удалённых комментариях, версия
+группы — при её правке, версия автора — при смене аватара. Версии
+меняют сигналы моделей (``signals``), поэтому карточку сбрасывает любой
+путь записи, в том числе админка. Старые фрагменты не удаляются, а
+просто перестают запрашиваться и истекают по таймауту.
+"""
+import time
+
+from django.core.cache import cache
+
+POST_VERSION_KEY = 'post_card:post:{}'
+AUTHOR_VERSION_KEY = 'post_card:author:{}'
+GROUP_VERSION_KEY = 'post_card:group:{}'
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return versions
+
+
+def _version_keys(post):
+    keys = [POST_VERSION_KEY.format(post.pk),
+            AUTHOR_VERSION_KEY.format(post.author_id)]
+    if post.group_id is not None:
+        keys.append(GROUP_VERSION_KEY.format(post.group_id))
+    return keys
+
+
+def _card_version(post, versions):
+    return '-'.join(
+        [str(int(post.pub_date.timestamp()))]
+        + [str(versions[key]) for key in _version_keys(post)]
+    )
+
+
+def post_card_version(post):
+    return _card_version(post, _versions(_version_keys(post)))
+
+
+def attach_card_versions(posts):
+    """Проставляет ``card_version`` всем постам страницы одним запросом."""
+    keys = set()
+    for post in posts:
+        keys.update(_version_keys(post))
+    if not keys:
+        return
+    versions = _versions(list(keys))
+    for post in posts:
+        post.__dict__['card_version'] = _card_version(post, versions)
+
+
+def author_versions(user_ids):
+    """Текущие версии авторов ``{id: версия}`` одним запросом к кэшу."""
+    keys = {user_id: AUTHOR_VERSION_KEY.format(user_id)
+            for user_id in user_ids}
+    if not keys:
+        return {}
+    versions = _versions(list(keys.values()))
+    return {user_id: versions[key] for user_id, key in keys.items()}
+
+
+def bump_post(post_id):
+    cache.set(POST_VERSION_KEY.format(post_id), _new_version(), timeout=None)
+
+
+def bump_author(user_id):
+    cache.set(AUTHOR_VERSION_KEY.format(user_id), _new_version(),
+              timeout=None)
+
+
+def bump_group(group_id):
+    cache.set(GROUP_VERSION_KEY.format(group_id), _new_version(),
+              timeout=None)
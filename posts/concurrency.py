@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import (OperationalError, close_old_connections, connection,
+                       transaction)
+
+WRITE_ATTEMPTS = 4
+RETRY_DELAY = 0.05
+# SQLSTATE ошибок сериализации и взаимоблокировки в PostgreSQL.
+SERIALIZATION_CODES = ('40001', '40P01')
+
+
+def _in_own_connection(func):
+    def wrapper():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def runs_under_asgi(request):
+    return isinstance(request, ASGIRequest)
+
+
+async def gather_queries(*funcs, parallel=True):
+    """
+    Выполняет независимые синхронные выборки параллельно, каждую в своём
+    потоке со своим соединением с БД, и возвращает их результаты по порядку.
+
+    С ``parallel=False`` выборки идут по очереди в потоке запроса и его
+    соединении. Так надо под WSGI: там у каждого запроса свой цикл
+    событий со своим пулом потоков, и соединения потоков пула не
+    переиспользуются — каждая выборка открывала бы новое. Внутри открытой
+    транзакции (например, в ``TestCase``) другие соединения не видят её
+    данных, поэтому выборки тоже идут по очереди.
+    """
+    in_transaction = await sync_to_async(
+        lambda: connection.in_atomic_block
+    )()
+    if in_transaction or not parallel:
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(
+        sync_to_async(_in_own_connection(func), thread_sensitive=False)()
+        for func in funcs
+    ))
+
+
+def is_serialization_failure(exc):
+    """Ошибка, после которой транзакцию можно просто повторить."""
+    cause = exc.__cause__
+    if getattr(cause, 'pgcode', None) in SERIALIZATION_CODES:
+        return True
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def atomic_write(func):
+    """
+    Выполняет ``func`` в ``transaction.atomic`` и повторяет транзакцию
+    с растущей случайной паузой, если она упала на блокировке или
+    ошибке сериализации. Внутри чужой транзакции повторять нельзя —
+    там ошибка пробрасывается сразу.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (connection.in_atomic_block
+                        or attempt == WRITE_ATTEMPTS - 1
+                        or not is_serialization_failure(exc)):
+                    raise
+            time.sleep(RETRY_DELAY * 2 ** attempt * random.random())
+    return wrapper
@@ -0,0 +1,62 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .avatars import attach_avatar_urls
+from .cards import attach_card_versions
+from .models import Comment, Post
+from .paginators import CursorPaginator
+
+POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+
+def comment_count_subquery(post_ref='pk'):
+    """Число комментариев поста ``post_ref`` из внешнего запроса."""
+    comments = (
+        Comment.objects.filter(post=OuterRef(post_ref))
+        .order_by()
+        .values('post')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+
+
+def build_feed(queryset=None):
+    """
+    Лента постов для ``post_item.html``: автор и группа подтягиваются
+    join-ом, число комментариев считается коррелированным подзапросом
+    (только для строк страницы, без GROUP BY по всей таблице). Аватары
+    авторов подставляет ``prepare_cards``.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return (
+        queryset.select_related('author', 'group')
+        .annotate(comment_count=comment_count_subquery())
+    )
+
+
+def prepare_cards(posts):
+    """Версии карточек и URL аватаров авторов для ``post_item.html``."""
+    attach_card_versions(posts)
+    attach_avatar_urls(post.author for post in posts)
+
+
+def paginate_feed(request, queryset, per_page=POSTS_PER_PAGE):
+    paginator = CursorPaginator(build_feed(queryset), per_page)
+    page = paginator.get_page(request.GET)
+    prepare_cards(page.object_list)
+    return paginator, page
+
+
+def comment_page(post_id, params, per_page=COMMENTS_PER_PAGE):
+    """
+    Страница комментариев поста, новые сверху, с авторами через join.
+    Листается курсором по индексу ``(post, created, id)``.
+    """
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        per_page, ordering=('-created', '-id'),
+    )
+    return paginator.get_page(params)
@@ -0,0 +1,26 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Min
+
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет повторяющиеся подписки (user, author), оставляя самую '
+        'раннюю. Запускать перед миграцией с ограничением unique_follow.'
+    )
+
+    def handle(self, *args, **options):
+        keep = (
+            Follow.objects.values('user', 'author')
+            .order_by()
+            .annotate(keep_id=Min('id'))
+            .values('keep_id')
+        )
+        with transaction.atomic():
+            deleted, _ = Follow.objects.exclude(id__in=keep).delete()
+        self.stdout.write(f'Удалено повторных подписок: {deleted}')
+        if deleted:
+            call_command('repair_counters', stdout=self.stdout)
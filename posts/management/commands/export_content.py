@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.transfer import EXPORT_CHUNK_SIZE, FORMATS, TABLES, export_table
+
+
+def _export(args):
+    try:
+        return export_table(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает пользователей, группы, посты, комментарии и '
+        'подписки в JSON Lines или CSV, по файлу на таблицу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог для файлов.')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl',
+                            help='Формат файлов.')
+        parser.add_argument('--tables', nargs='+', choices=list(TABLES),
+                            default=list(TABLES),
+                            help='Какие таблицы выгрузить.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=EXPORT_CHUNK_SIZE,
+                            help='Строк в одной выборке из базы.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Сколько таблиц выгружать одновременно.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Алиас базы, из которой читать.')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+        tasks = [
+            (name, directory, options['format'], options['database'],
+             options['chunk_size'])
+            for name in options['tables']
+        ]
+        if options['workers'] > 1:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                counts = list(pool.map(_export, tasks))
+        else:
+            counts = [export_table(*task) for task in tasks]
+        for name, count in zip(options['tables'], counts):
+            self.stdout.write(f'{name}: {count}')
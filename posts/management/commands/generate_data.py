@@ -0,0 +1,164 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.models import Group, Post
+from posts.synthetic import (GROUP_COLUMNS, DatabaseWriter, DumpWriter, Plan,
+                             dump_chunk, generate_authors, generate_groups,
+                             generate_links,
+                             next_id, post_offsets)
+from users.models import CustomUser
+
+
+def _authors(args):
+    return generate_authors(*args)
+
+
+def _links(args):
+    return generate_links(*args)
+
+
+def _dump(args):
+    return dump_chunk(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетических пользователей, группы, посты, подписки '
+        'и комментарии для нагрузочных прогонов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Сколько пользователей создать.')
+        parser.add_argument('--groups', type=int, default=None,
+                            help='Сколько групп создать '
+                                 '(по умолчанию одна на 500 пользователей).')
+        parser.add_argument('--posts-per-user', type=float, default=10,
+                            help='Среднее число постов на пользователя.')
+        parser.add_argument('--follows-per-user', type=float, default=20,
+                            help='Среднее число подписок на пользователя.')
+        parser.add_argument('--comments-per-user', type=float, default=20,
+                            help='Среднее число комментариев '
+                                 'на пользователя.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed генератора: одинаковый seed даёт '
+                                 'одинаковые данные.')
+        parser.add_argument('--start', default='2020-01-01',
+                            help='Дата первых регистраций, ГГГГ-ММ-ДД.')
+        parser.add_argument('--days', type=int, default=3 * 365,
+                            help='Длина периода публикаций в днях.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Пользователей в одном чанке '
+                                 '(и в одной транзакции).')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Строк в одном INSERT-пакете.')
+        parser.add_argument('--workers', type=int,
+                            default=os.cpu_count() or 1,
+                            help='Число процессов-генераторов.')
+        parser.add_argument('--password', default='password',
+                            help='Пароль всех созданных пользователей.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Алиас базы, в которую писать.')
+        parser.add_argument('--dump', metavar='DIR',
+                            help='Писать CSV-файлы в каталог вместо базы.')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя.')
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d')
+        except ValueError:
+            raise CommandError('--start ожидается в виде ГГГГ-ММ-ДД.')
+        groups = options['groups']
+        if groups is None:
+            groups = max(options['users'] // 500, 1)
+        using, dump = options['database'], options['dump']
+        plan = Plan(
+            seed=options['seed'],
+            users=options['users'],
+            groups=groups,
+            posts_per_user=options['posts_per_user'],
+            follows_per_user=options['follows_per_user'],
+            comments_per_user=options['comments_per_user'],
+            chunk_size=options['chunk_size'],
+            start=start.replace(tzinfo=timezone.utc),
+            days=options['days'],
+            # Соль от seed, чтобы и хеш пароля был воспроизводимым.
+            password=make_password(options['password'],
+                                   salt=f'synthetic{options["seed"]}'),
+        )
+        if not dump:
+            plan.user_base = next_id(CustomUser, using)
+            plan.group_base = next_id(Group, using)
+            plan.post_base = next_id(Post, using)
+        offsets, total_posts = post_offsets(plan)
+        if dump:
+            tasks = [
+                (plan, chunk, offsets[chunk], total_posts, dump)
+                for chunk in range(plan.chunks)
+            ]
+            totals = self._dump(plan, tasks, dump, options['workers'])
+        else:
+            totals = self._load(plan, offsets, total_posts, using, options)
+        for label, count in totals.items():
+            self.stdout.write(f'{label}: {count}')
+        if not dump:
+            call_command('repair_counters', database=using,
+                         stdout=self.stdout)
+            self.stdout.write(
+                'Ленты подписок и поисковый индекс не заполнялись: '
+                'запустите rebuild_timelines и rebuild_search_index.'
+            )
+
+    def _dump(self, plan, tasks, directory, workers):
+        groups = DumpWriter(directory).write(
+            Group, GROUP_COLUMNS, list(generate_groups(plan)), 'groups'
+        )
+        totals = {Group._meta.label: groups}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for counts in pool.map(_dump, tasks):
+                for label, count in counts.items():
+                    totals[label] = totals.get(label, 0) + count
+        return totals
+
+    def _load(self, plan, offsets, total_posts, using, options):
+        writer = DatabaseWriter(using, options['batch_size'])
+        totals = {}
+        self._write(writer, {Group: list(generate_groups(plan))}, totals)
+        # Генерация идёт в процессах, а запись — здесь, одним соединением:
+        # SQLite всё равно допускает только одного писателя.
+        connections.close_all()
+        workers = options['workers']
+        # Сначала все пользователи и посты, потом ссылающиеся на них
+        # подписки и комментарии: иначе внешние ключи не сойдутся.
+        stages = [
+            (_authors, [(plan, chunk, offsets[chunk])
+                        for chunk in range(plan.chunks)]),
+            (_links, [(plan, chunk, total_posts)
+                      for chunk in range(plan.chunks)]),
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for func, tasks in stages:
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.submit(func, task))
+                    # Не больше двух готовых чанков на процесс, чтобы
+                    # память не росла, если запись медленнее генерации.
+                    if len(pending) >= 2 * workers:
+                        self._write(writer, pending.popleft().result(),
+                                    totals)
+                while pending:
+                    self._write(writer, pending.popleft().result(), totals)
+        return totals
+
+    def _write(self, writer, rows, totals):
+        for model, count in writer.write_chunk(None, rows).items():
+            label = model._meta.label
+            totals[label] = totals.get(label, 0) + count
@@ -0,0 +1,95 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.pagecache import bump_pages
+from posts.transfer import (FORMATS, IMPORT_BATCH_SIZE, STAGES, TABLES,
+                            Remap, import_table, make_remaps, table_path)
+
+
+def _import(args):
+    try:
+        return import_table(*args)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пользователей, группы, посты, комментарии и подписки '
+        'из файлов export_content, пересчитывая id и внешние ключи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Каталог с файлами выгрузки.')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl',
+                            help='Формат файлов.')
+        parser.add_argument('--tables', nargs='+', choices=list(TABLES),
+                            default=list(TABLES),
+                            help='Какие таблицы загрузить; ссылки на '
+                                 'остальные считаются id уже лежащих '
+                                 'в базе строк.')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE,
+                            help='Строк в одной транзакции.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Сколько таблиц одной стадии загружать '
+                                 'параллельно.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Алиас базы, в которую писать.')
+
+    def handle(self, *args, **options):
+        directory, fmt = options['directory'], options['format']
+        using = options['database']
+        selected = [name for name in TABLES if name in options['tables']]
+        missing = [
+            table_path(directory, name, fmt) for name in selected
+            if not os.path.exists(table_path(directory, name, fmt))
+        ]
+        if missing:
+            raise CommandError(f'Нет файлов: {", ".join(missing)}')
+        remaps = make_remaps(using)
+        for name in remaps:
+            if name not in selected:
+                remaps[name] = Remap()
+        for stage in STAGES:
+            tasks = [
+                (name, table_path(directory, name, fmt), fmt, remaps, using,
+                 options['batch_size'])
+                for name in stage if name in selected
+            ]
+            if not tasks:
+                continue
+            if options['workers'] > 1 and len(tasks) > 1:
+                connections.close_all()
+                with ProcessPoolExecutor(
+                    max_workers=min(options['workers'], len(tasks))
+                ) as pool:
+                    results = list(pool.map(_import, tasks))
+            else:
+                results = [import_table(*task) for task in tasks]
+            for result in results:
+                self.report(result)
+                if result['remap'] is not None:
+                    remaps[result['name']] = result['remap']
+        call_command('repair_counters', database=using,
+                     stdout=self.stdout)
+        bump_pages()
+        self.stdout.write(
+            'Ленты подписок, поисковый индекс, популярное и рекомендации '
+            'не пересчитывались: запустите rebuild_timelines, '
+            'rebuild_search_index, recompute_trending и '
+            'recompute_recommendations.'
+        )
+
+    def report(self, result):
+        self.stdout.write(
+            f'{result["name"]}: загружено {result["imported"]}, '
+            f'уже были в базе {result["merged"]}, '
+            f'с ошибками {result["invalid"]}'
+        )
+        for error in result['errors']:
+            self.stderr.write(error)
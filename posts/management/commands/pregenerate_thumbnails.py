@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.models import Post
+from posts.thumbnails import (cut_thumbnail, ready_thumbnail,
+                              remember_thumbnail)
+
+
+def _cut_chunk(chunk):
+    connections.close_all()
+    return [(post_id, name, cut_thumbnail(name)) for post_id, name in chunk]
+
+
+class Command(BaseCommand):
+    help = 'Заранее нарезает миниатюры для картинок существующих постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов для нарезки.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=50,
+            help='Сколько картинок отдавать процессу за раз.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Нарезать и те миниатюры, что уже есть.',
+        )
+
+    def handle(self, *args, **options):
+        images = (
+            Post.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by('pk').values_list('pk', 'image')
+        )
+        todo = [
+            (post_id, name) for post_id, name in images.iterator()
+            if options['force'] or ready_thumbnail(name) is None
+        ]
+        size = options['chunk_size']
+        chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+        # Соединения с БД не должны переходить в дочерние процессы.
+        connections.close_all()
+        done = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            # Кэш дочернего процесса может быть локальным (LocMemCache),
+            # поэтому готовность и версии карточек отмечает родитель.
+            for results in pool.map(_cut_chunk, chunks):
+                for post_id, name, thumbnail_name in results:
+                    if thumbnail_name is not None:
+                        remember_thumbnail(name, thumbnail_name, post_id)
+                        done += 1
+        self.stdout.write(
+            f'Нарезано миниатюр: {done} из {len(todo)}'
+        )
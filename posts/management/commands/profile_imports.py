@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from yatube.importtime import package_totals, profile_imports
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует модуль (по умолчанию yatube.wsgi) в новом процессе '
+        'с замером импортов и печатает самые дорогие модули и пакеты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='yatube.wsgi',
+                            help='Какой модуль импортировать.')
+        parser.add_argument('--limit', type=int, default=25,
+                            help='Сколько строк в каждой таблице.')
+        parser.add_argument('--package', action='append', dest='packages',
+                            help='Показывать модули только этих пакетов.')
+
+    def handle(self, *args, **options):
+        entries = profile_imports(options['target'], cwd=settings.BASE_DIR)
+        target = next(
+            (entry for entry in entries if entry.name == options['target']),
+            None,
+        )
+        total = sum(entry.self_us for entry in entries)
+        if target is not None:
+            total = target.cumulative_us
+        self.stdout.write(
+            f'Импорт {options["target"]}: {total / 1000:.1f} мс, '
+            f'модулей {len(entries)}'
+        )
+
+        modules = entries
+        if options['packages']:
+            modules = [entry for entry in entries
+                       if entry.package in options['packages']]
+        self.stdout.write('')
+        self.stdout.write(f'{"всего, мс":>10}{"свой, мс":>10}  '
+                          f'{"модуль":<45}импортирован из')
+        ranked = sorted(modules, key=lambda entry: -entry.cumulative_us)
+        for entry in ranked[:options['limit']]:
+            self.stdout.write(
+                f'{entry.cumulative_us / 1000:10.1f}'
+                f'{entry.self_us / 1000:10.1f}  '
+                f'{entry.name:<45}{entry.parent or "—"}'
+            )
+
+        self.stdout.write('')
+        self.stdout.write(f'{"свой, мс":>10}  пакет')
+        for package, self_us in package_totals(entries)[:options['limit']]:
+            self.stdout.write(f'{self_us / 1000:10.1f}  {package}')
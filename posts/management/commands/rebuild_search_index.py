@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.search import rebuild_search_index, search_enabled
+
+
+class Command(BaseCommand):
+    help = 'Полностью пересобирает полнотекстовый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            raise CommandError('Полнотекстовый индекс есть только на SQLite.')
+        with transaction.atomic():
+            rebuild_search_index()
+        self.stdout.write('Поисковый индекс пересобран.')
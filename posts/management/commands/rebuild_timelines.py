@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from posts.timeline import rebuild_timeline
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет ленты подписок из таблицы подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            dest='usernames',
+            action='append',
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, **options):
+        # Пользователи без подписок тоже пересобираются: у них могли
+        # остаться записи от старых подписок.
+        users = CustomUser.objects.filter(
+            Q(follower__isnull=False) | Q(timeline__isnull=False)
+        ).distinct()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        rebuilt = 0
+        for user in users.iterator():
+            with transaction.atomic():
+                rebuild_timeline(user)
+            rebuilt += 1
+        self.stdout.write(f'Пересобрано лент: {rebuilt}')
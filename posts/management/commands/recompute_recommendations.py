@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import recompute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «на кого подписаться» по графу подписок.'
+
+    def handle(self, *args, **options):
+        rows = recompute_recommendations()
+        self.stdout.write(f'Сохранено рекомендаций: {rows}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import WINDOW_DAYS, recompute_trending
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счёт популярности постов и групп по постам '
+            'и комментариям за последние дни.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=WINDOW_DAYS,
+            help='Сколько последних дней учитывать.',
+        )
+
+    def handle(self, *args, **options):
+        rows = recompute_trending(days=options['days'])
+        self.stdout.write(f'Пересчитано счётчиков: {rows}')
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import connections, models, router
 from django.db.models.fields.related import ForeignKey
+from django.utils.functional import cached_property
 from users.models import CustomUser
 
+from .cards import post_card_version
 
 
 class Group(models.Model):
@@ -44,6 +46,10 @@ class Post(models.Model):
     def __str__(self):
         return self.text
 
+    @cached_property
+    def card_version(self):
+        return post_card_version(self)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
@@ -55,6 +61,36 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["post", "-created", "-id"],
+                         name="comment_post_created"),
+        ]
+
+
+class FollowManager(models.Manager):
+    def follow(self, user, author):
+        """
+        Подписка одним INSERT ... ON CONFLICT DO NOTHING.
+        Возвращает ``True``, если подписка действительно создана.
+        """
+        # self.db — алиас для чтения, а это запись: база выбирается
+        # роутером, как для save().
+        connection = connections[router.db_for_write(self.model)]
+        quote = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}, {}) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+        sql = sql.format(
+            quote(self.model._meta.db_table),
+            quote(self.model._meta.get_field("user").column),
+            quote(self.model._meta.get_field("author").column),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user.pk, author.pk])
+            return cursor.rowcount > 0
+
+    def unfollow(self, user, author):
+        """Отписка одним DELETE; возвращает число удалённых строк."""
+        deleted, _ = self.filter(user=user, author=author).delete()
+        return deleted
 
 
 class Follow(models.Model):
@@ -62,3 +98,81 @@ class Follow(models.Model):
                       related_name="follower")
     author = ForeignKey(CustomUser, on_delete=models.CASCADE,
                         related_name="following")
+
+    objects = FollowManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "author"],
+                                    name="unique_follow"),
+        ]
+        indexes = [
+            models.Index(fields=["author", "user"],
+                         name="follow_author_user"),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная подписчику при публикации поста."""
+    user = ForeignKey(CustomUser, on_delete=models.CASCADE,
+                      related_name="timeline")
+    post = ForeignKey(Post, on_delete=models.CASCADE,
+                      related_name="timeline_entries")
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = ["-pub_date", "-post"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"],
+                                    name="unique_timeline_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-pub_date", "-post"],
+                         name="timeline_user_pub_date"),
+        ]
+
+
+class TrendingScore(models.Model):
+    """
+    Затухающий счёт активности поста или группы в логарифмической
+    шкале (см. ``posts.trending``).
+    """
+    POST = "post"
+    GROUP = "group"
+    KINDS = [(POST, "Пост"), (GROUP, "Группа")]
+
+    kind = models.CharField("Тип", max_length=5, choices=KINDS)
+    object_id = models.PositiveIntegerField("id объекта")
+    score = models.FloatField("Счёт")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"],
+                                    name="unique_trending_score"),
+        ]
+        indexes = [
+            models.Index(fields=["kind", "-score"],
+                         name="trending_kind_score"),
+        ]
+
+
+class Recommendation(models.Model):
+    """
+    Автор, на которого стоит подписаться пользователю
+    (см. ``posts.recommendations``).
+    """
+    user = ForeignKey(CustomUser, on_delete=models.CASCADE,
+                      related_name="recommendations")
+    candidate = ForeignKey(CustomUser, on_delete=models.CASCADE,
+                           related_name="recommended_to")
+    score = models.FloatField("Счёт")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "candidate"],
+                                    name="unique_recommendation"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"],
+                         name="recommendation_user_score"),
+        ]
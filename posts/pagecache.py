@@ -0,0 +1,150 @@
+"""
+Кэш целых страниц для анонимных посетителей.
+
+Страница кэшируется по пути и параметрам листания (``page``, ``after``,
+``before``) под текущей версией страниц. Версия — момент последней
+записи поста или комментария в наносекундах; при холодном кэше она
+берётся из самых свежих ``pub_date`` и ``created`` в базе. Любая запись
+поста, комментария, подписки или аватара сдвигает версию, и все старые
+страницы перестают запрашиваться.
+
+Из версии же строятся ``ETag`` и ``Last-Modified``, поэтому повторный
+запрос с ``If-None-Match``/``If-Modified-Since`` получает 304 без
+обращения к базе.
+
+Запросы с cookie сессии или сообщений идут мимо кэша: страница
+вошедшего пользователя (с его меню, кнопками и CSRF-токеном в форме
+комментария) не должна попасть к другим. Ответы, ставящие cookie,
+не кэшируются.
+"""
+import asyncio
+import functools
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+PAGE_VERSION_KEY = 'anonymous_page:version'
+PAGE_KEY = 'anonymous_page:{}:{}'
+PAGE_PARAMS = ('page', 'after', 'before')
+PAGE_CACHE_SECONDS = getattr(settings, 'PAGE_CACHE_SECONDS', 600)
+CACHEABLE_METHODS = ('GET', 'HEAD')
+
+
+def bump_pages():
+    cache.set(PAGE_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def _latest_write_ns():
+    from .models import Comment, Post
+    moments = [
+        Post.objects.aggregate(latest=Max('pub_date'))['latest'],
+        Comment.objects.aggregate(latest=Max('created'))['latest'],
+    ]
+    moments = [moment for moment in moments if moment is not None]
+    if not moments:
+        return 0
+    return int(max(moments).timestamp() * 10 ** 9)
+
+
+def page_version():
+    # На холодном кэше агрегаты по постам и комментариям считает один
+    # запрос, остальные ждут его результата.
+    return cache.get_or_set(PAGE_VERSION_KEY, _latest_write_ns, timeout=None)
+
+
+def is_cacheable(request):
+    cookies = request.COOKIES
+    return (
+        request.method in CACHEABLE_METHODS
+        and settings.SESSION_COOKIE_NAME not in cookies
+        and 'messages' not in cookies
+    )
+
+
+def page_key(request, version):
+    params = sorted(
+        (name, value) for name, value in request.GET.items()
+        if name in PAGE_PARAMS
+    )
+    raw = '{}?{}'.format(request.path, params)
+    return PAGE_KEY.format(version, hashlib.md5(raw.encode()).hexdigest())
+
+
+def _validators(key, version):
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    last_modified = int(version // 10 ** 9)
+    return etag, last_modified
+
+
+def _set_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Cookie',))
+    # Кэш браузера каждый раз переспрашивает страницу по ETag.
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _lookup(request):
+    """
+    Ответ из кэша или 304; при промахе — ``None`` и ключ с валидаторами
+    для сохранения свежего ответа.
+    """
+    version = page_version()
+    key = page_key(request, version)
+    etag, last_modified = _validators(key, version)
+    conditional = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if conditional is not None:
+        return _set_headers(conditional, etag, last_modified), None
+    cached = cache.get(key)
+    if cached is not None:
+        content, content_type = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['X-Page-Cache'] = 'hit'
+        return _set_headers(response, etag, last_modified), None
+    return None, (key, etag, last_modified)
+
+
+def _store(miss, response):
+    if (response.status_code != 200 or response.cookies
+            or response.streaming):
+        return response
+    key, etag, last_modified = miss
+    cache.set(key, (response.content, response['Content-Type']),
+              PAGE_CACHE_SECONDS)
+    return _set_headers(response, etag, last_modified)
+
+
+def anonymous_page_cache(view):
+    """Кэширует ответ вьюхи (синхронной или асинхронной) для анонимов."""
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            if not is_cacheable(request):
+                return await view(request, *args, **kwargs)
+            cached, miss = await sync_to_async(_lookup)(request)
+            if cached is not None:
+                return cached
+            response = await view(request, *args, **kwargs)
+            return _store(miss, response)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable(request):
+            return view(request, *args, **kwargs)
+        cached, miss = _lookup(request)
+        if cached is not None:
+            return cached
+        return _store(miss, view(request, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,179 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.http import urlencode
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorPage:
+    """Страница ленты, полученная поиском по ключу, а не через OFFSET."""
+
+    def __init__(self, object_list, paginator, params,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.params = params
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _querystring(self, key, cursor):
+        params = {
+            name: value for name, value in self.params.items()
+            if name not in ('after', 'before', 'page')
+        }
+        params[key] = cursor
+        return urlencode(params)
+
+    @property
+    def next_querystring(self):
+        if self.has_next():
+            return self._querystring('after', self.next_cursor)
+        return ''
+
+    @property
+    def previous_querystring(self):
+        if self.has_previous():
+            return self._querystring('before', self.previous_cursor)
+        return ''
+
+
+class CursorPaginator:
+    """
+    Пагинация по ключу ``(pub_date, id)``: страница выбирается условием
+    ``WHERE`` по индексу вместо ``COUNT(*)`` и ``OFFSET``.
+
+    ``ordering`` задаётся как в ``order_by`` и должен однозначно
+    упорядочивать записи, поэтому последним полем идёт первичный ключ.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    @staticmethod
+    def encode_values(values):
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_values(cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list):
+            raise InvalidCursor(cursor)
+        return values
+
+    def encode_cursor(self, obj):
+        model = self.object_list.model
+        return self.encode_values([
+            model._meta.get_field(name).value_to_string(obj)
+            if name != 'pk' else str(obj.pk)
+            for name in self.fields
+        ])
+
+    def decode_cursor(self, cursor):
+        values = self.decode_values(cursor)
+        if len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        model = self.object_list.model
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                if name != 'pk' else model._meta.pk.to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            # Корректный JSON со значениями не тех типов, например [{}, 1].
+            raise InvalidCursor(cursor)
+
+    def _seek(self, values, forward):
+        """Условие «строго после курсора» в порядке сортировки (или до)."""
+        condition = Q()
+        for index, name in enumerate(self.fields):
+            descending = self.descending[index]
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_name, prev_value in zip(self.fields[:index],
+                                             values[:index]):
+                step &= Q(**{prev_name: prev_value})
+            condition |= step
+        return condition
+
+    def _reversed_ordering(self):
+        return [
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in self.ordering
+        ]
+
+    def rows(self, values=None, forward=True):
+        """
+        До ``per_page + 1`` записей строго после курсора ``values`` в
+        порядке сортировки (``forward=False`` — до курсора, от ближней).
+        """
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, forward))
+        ordering = self.ordering if forward else self._reversed_ordering()
+        return list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+    def page(self, after=None, before=None, params=None):
+        params = params if params is not None else {}
+        if before:
+            rows = self.rows(self.decode_cursor(before), forward=False)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            rows = self.rows(self.decode_cursor(after) if after else None)
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after)
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0])
+        return CursorPage(rows, self, params, next_cursor, previous_cursor)
+
+    def get_page(self, params):
+        """
+        Страница по GET-параметрам ``after``/``before``; битый курсор
+        отдаёт первую страницу, как ``Paginator.get_page`` с плохим номером.
+        """
+        try:
+            return self.page(after=params.get('after'),
+                             before=params.get('before'), params=params)
+        except InvalidCursor:
+            return self.page(params=params)
@@ -0,0 +1,196 @@
+"""
+Рекомендации «на кого подписаться».
+
+Кандидаты для пользователя ``u`` набираются двумя путями по графу
+подписок:
+
+* друзья друзей ``u → a → c``: каждый путь добавляет ``FOF_WEIGHT``;
+* совместные подписки ``u → a ← v → c``: читатели ``a`` подписаны и на
+  ``c``. Путь весит ``COFOLLOW_WEIGHT / sqrt(|читатели a| · |читатели c|)``,
+  поэтому сумма по ``v`` — косинусная близость авторов ``a`` и ``c``.
+  Для каждого автора близость считается один раз на весь пересчёт, и
+  запоминаются только ``COFOLLOW_NEIGHBOURS`` ближайших соседей.
+
+Сам пользователь и авторы, на которых он уже подписан, в кандидаты не
+попадают. Лучшие ``RECOMMENDATIONS_PER_USER`` хранятся в
+``Recommendation`` и читаются одним запросом по индексу
+``(user, -score)``.
+
+Полный пересчёт делает команда ``recompute_recommendations``: граф
+загружается в память словарями множеств id. Подписка и отписка правят
+только строки самого пользователя — вклад друзей друзей через этого
+автора добавляется или вычитается сразу; совместные подписки и
+рекомендации остальных пользователей обновит следующий пересчёт.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from users.models import CustomUser
+
+from .models import Follow, Recommendation
+
+RECOMMENDATIONS_PER_USER = getattr(settings, 'RECOMMENDATIONS_PER_USER', 20)
+RECOMMENDATIONS_SHOWN = 5
+# Читатели слишком популярного автора почти ничего не говорят о вкусах,
+# а перебор их подписок дорог: такие авторы в совместных подписках
+# не участвуют.
+COFOLLOW_READERS_LIMIT = getattr(settings, 'COFOLLOW_READERS_LIMIT', 1000)
+# Сколько самых близких авторов помнить для каждого автора.
+COFOLLOW_NEIGHBOURS = 50
+FOF_WEIGHT = 1.0
+COFOLLOW_WEIGHT = 1.0
+
+
+def load_graph():
+    """Подписки в памяти: ``following[user]`` и ``readers[author]``."""
+    following = defaultdict(set)
+    readers = defaultdict(set)
+    pairs = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in pairs.iterator():
+        following[user_id].add(author_id)
+        readers[author_id].add(user_id)
+    return following, readers
+
+
+def author_neighbours(author_id, following, readers):
+    """
+    Авторы, которых читают вместе с ``author_id``, с косинусной
+    близостью по множествам читателей; не больше ``COFOLLOW_NEIGHBOURS``.
+    """
+    author_readers = readers.get(author_id, ())
+    if len(author_readers) > COFOLLOW_READERS_LIMIT:
+        return []
+    common = Counter()
+    for reader_id in author_readers:
+        common.update(following[reader_id])
+    common.pop(author_id, None)
+    return heapq.nlargest(COFOLLOW_NEIGHBOURS, (
+        (candidate_id, COFOLLOW_WEIGHT * count / math.sqrt(
+            len(author_readers) * len(readers[candidate_id])
+        ))
+        for candidate_id, count in common.items()
+    ), key=lambda item: item[1])
+
+
+def score_candidates(user_id, following, readers, neighbours=None,
+                     limit=RECOMMENDATIONS_PER_USER):
+    """
+    Лучшие ``limit`` пар ``(кандидат, счёт)`` для пользователя.
+    ``neighbours`` — общий для всех пользователей кэш соседей авторов.
+    """
+    if neighbours is None:
+        neighbours = {}
+    followed = following.get(user_id, set())
+    scores = defaultdict(float)
+    for author_id in followed:
+        for candidate_id in following.get(author_id, ()):
+            scores[candidate_id] += FOF_WEIGHT
+        if author_id not in neighbours:
+            neighbours[author_id] = author_neighbours(author_id, following,
+                                                      readers)
+        for candidate_id, similarity in neighbours[author_id]:
+            scores[candidate_id] += similarity
+    # Подписка самого пользователя меняет близость только тех авторов,
+    # на которых он уже подписан, а они здесь и отбрасываются.
+    scores.pop(user_id, None)
+    for author_id in followed:
+        scores.pop(author_id, None)
+    return heapq.nlargest(limit, scores.items(),
+                          key=lambda item: (item[1], -item[0]))
+
+
+def recompute_recommendations(batch_size=500):
+    """Пересчитывает рекомендации всех; возвращает число строк."""
+    following, readers = load_graph()
+    neighbours = {}
+    created = 0
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        rows = []
+        for user_id in following:
+            rows.extend(
+                Recommendation(user_id=user_id, candidate_id=candidate_id,
+                               score=score)
+                for candidate_id, score in score_candidates(
+                    user_id, following, readers, neighbours
+                )
+            )
+            if len(rows) >= batch_size:
+                Recommendation.objects.bulk_create(rows)
+                created += len(rows)
+                rows = []
+        Recommendation.objects.bulk_create(rows)
+        created += len(rows)
+    return created
+
+
+def trim_recommendations(user_id):
+    """Оставляет пользователю ``RECOMMENDATIONS_PER_USER`` лучших строк."""
+    table = connection.ops.quote_name(Recommendation._meta.db_table)
+    sql = (
+        f'DELETE FROM {table} WHERE id IN ('
+        f'SELECT id FROM ('
+        f'SELECT id, ROW_NUMBER() OVER (ORDER BY score DESC, candidate_id) '
+        f'AS position FROM {table} WHERE user_id = %s'
+        f') AS ranked WHERE position > %s)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, RECOMMENDATIONS_PER_USER])
+
+
+def apply_follow(user, author):
+    """
+    Подписка: автор уходит из рекомендаций, а его подписки получают
+    вклад нового пути одним ``INSERT ... SELECT ... ON CONFLICT``.
+    """
+    Recommendation.objects.filter(user=user, candidate=author).delete()
+    quote = connection.ops.quote_name
+    table = quote(Recommendation._meta.db_table)
+    follows = quote(Follow._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} (user_id, candidate_id, score) '
+        f'SELECT %s, author_id, %s FROM {follows} '
+        f'WHERE user_id = %s AND author_id <> %s AND author_id NOT IN ('
+        f'SELECT author_id FROM {follows} WHERE user_id = %s) '
+        f'ON CONFLICT (user_id, candidate_id) DO UPDATE '
+        f'SET score = {table}.score + excluded.score'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, FOF_WEIGHT, author.pk, user.pk,
+                             user.pk])
+        added = cursor.rowcount
+    if added:
+        trim_recommendations(user.pk)
+
+
+def apply_unfollow(user, author):
+    """Отписка: подписки автора теряют вклад пути через него."""
+    updated = Recommendation.objects.filter(
+        user=user,
+        candidate__in=Follow.objects.filter(user=author).values('author'),
+    ).update(score=F('score') - FOF_WEIGHT)
+    if updated:
+        # Погрешность сложения float не должна оставлять пустые строки.
+        Recommendation.objects.filter(user=user, score__lte=1e-9).delete()
+
+
+def recommended_authors(user, limit=RECOMMENDATIONS_SHOWN, exclude=None):
+    """
+    Рекомендации для боковой панели. ``exclude`` — имя автора открытого
+    профиля. Подписки отсекаются и здесь: строки ``Recommendation``
+    остальных пользователей до пересчёта могут их ещё содержать.
+    """
+    if not user.is_authenticated:
+        return []
+    authors = (
+        CustomUser.objects.filter(recommended_to__user=user)
+        .exclude(pk__in=Follow.objects.filter(user=user).values('author'))
+    )
+    if exclude is not None:
+        authors = authors.exclude(username=exclude)
+    return list(authors.order_by('-recommended_to__score', 'pk')[:limit])
@@ -0,0 +1,233 @@
+"""
+Полнотекстовый поиск по постам и комментариям на SQLite FTS5.
+
+Индекс — виртуальная таблица ``posts_search``: строка поста хранится
+под rowid ``2 * post.id``, строка комментария — под ``2 * comment.id + 1``,
+поэтому обновление и удаление идут прямо по rowid. Результаты
+ранжируются bm25 (заголовок весит вдвое больше текста) и листаются
+курсором ``(rank, post_id)``. На других СУБД поиск деградирует до
+``icontains``.
+"""
+import re
+
+from django.db import (DEFAULT_DB_ALIAS, OperationalError, connection,
+                       connections)
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .feeds import POSTS_PER_PAGE, build_feed, prepare_cards
+from .models import Comment, Post
+from .paginators import CursorPage, CursorPaginator, InvalidCursor
+
+SEARCH_TABLE = 'posts_search'
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_enabled(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'sqlite'
+
+
+def create_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    if not search_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM sqlite_master WHERE name = %s', [SEARCH_TABLE]
+        )
+        if cursor.fetchone():
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+            f'post_id UNINDEXED, heading, text, '
+            f"tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) '
+            f"VALUES ('rank', 'bm25(0.0, 2.0, 1.0)')"
+        )
+
+
+def _post_rowid(post_id):
+    return 2 * post_id
+
+
+def _comment_rowid(comment_id):
+    return 2 * comment_id + 1
+
+
+def _replace(rowid, post_id, heading, text):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, post_id, heading, text) '
+            f'VALUES (%s, %s, %s, %s)',
+            [rowid, post_id, heading, text],
+        )
+
+
+def _delete(rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+        )
+
+
+def index_post(post):
+    if search_enabled():
+        _replace(_post_rowid(post.pk), post.pk, post.heading, post.text)
+
+
+def unindex_post(post_id):
+    if search_enabled():
+        _delete(_post_rowid(post_id))
+
+
+def index_comment(comment):
+    if search_enabled():
+        _replace(_comment_rowid(comment.pk), comment.post_id, '',
+                 comment.text)
+
+
+def unindex_comment(comment_id):
+    if search_enabled():
+        _delete(_comment_rowid(comment_id))
+
+
+def rebuild_search_index():
+    create_search_index()
+    posts = Post._meta.db_table
+    comments = Comment._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, post_id, heading, text) '
+            f'SELECT 2 * id, id, heading, text FROM {posts}'
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, post_id, heading, text) '
+            f"SELECT 2 * id + 1, post_id, '', text FROM {comments}"
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+
+
+def match_expression(query):
+    """Запрос пользователя как FTS5-выражение: все слова, каждое в кавычках."""
+    return ' '.join(f'"{word}"' for word in WORD_RE.findall(query))
+
+
+def matching_ids_sql(model, query):
+    """
+    Подзапрос id объектов ``model``, совпавших с запросом, — для
+    ``filter(pk__in=...)``, например в поиске админки.
+    """
+    kind = 0 if model is Post else 1
+    return RawSQL(
+        f'SELECT (rowid - {kind}) / 2 FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s AND rowid %% 2 = {kind}',
+        [match_expression(query)],
+    )
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов FTS5 по ``(rank, post_id)``."""
+
+    def __init__(self, query, per_page=POSTS_PER_PAGE):
+        self.query = query
+        self.expression = match_expression(query)
+        self.per_page = int(per_page)
+
+    def encode_cursor(self, rank, post_id):
+        return CursorPaginator.encode_values([rank, post_id])
+
+    def decode_cursor(self, cursor):
+        values = CursorPaginator.decode_values(cursor)
+        try:
+            rank, post_id = float(values[0]), int(values[1])
+        except (IndexError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        return rank, post_id
+
+    def _hits(self, cursor=None, forward=True):
+        comparison, order = ('>', 'ASC') if forward else ('<', 'DESC')
+        having, params = '', [self.expression]
+        if cursor is not None:
+            having = (
+                f'HAVING best {comparison} %s '
+                f'OR (best = %s AND post_id {comparison} %s)'
+            )
+            params += [cursor[0], cursor[0], cursor[1]]
+        sql = (
+            f'SELECT post_id, MIN(rank) AS best FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s GROUP BY post_id {having} '
+            f'ORDER BY best {order}, post_id {order} LIMIT %s'
+        )
+        params.append(self.per_page + 1)
+        with connection.cursor() as db_cursor:
+            try:
+                db_cursor.execute(sql, params)
+            except OperationalError as exc:
+                # Запрос, который FTS5 не разобрал, — просто пустой поиск;
+                # остальные ошибки (нет таблицы, битый индекс) — нет.
+                if 'fts5: syntax error' not in str(exc):
+                    raise
+                return []
+            return db_cursor.fetchall()
+
+    def page(self, after=None, before=None, params=None):
+        params = params if params is not None else {}
+        if not self.expression:
+            return CursorPage([], self, params)
+        if before:
+            hits = self._hits(self.decode_cursor(before), forward=False)
+            has_previous = len(hits) > self.per_page
+            hits = hits[:self.per_page][::-1]
+            has_next = True
+        else:
+            cursor = self.decode_cursor(after) if after else None
+            hits = self._hits(cursor)
+            has_next = len(hits) > self.per_page
+            hits = hits[:self.per_page]
+            has_previous = bool(after)
+        posts = build_feed(Post.objects.filter(
+            pk__in=[post_id for post_id, _ in hits]
+        )).in_bulk()
+        rows = [posts[post_id] for post_id, _ in hits if post_id in posts]
+        next_cursor = previous_cursor = None
+        if hits and has_next:
+            next_cursor = self.encode_cursor(hits[-1][1], hits[-1][0])
+        if hits and has_previous:
+            previous_cursor = self.encode_cursor(hits[0][1], hits[0][0])
+        return CursorPage(rows, self, params, next_cursor, previous_cursor)
+
+    def get_page(self, params):
+        try:
+            return self.page(after=params.get('after'),
+                             before=params.get('before'), params=params)
+        except InvalidCursor:
+            return self.page(params=params)
+
+
+def search_feed(request, query, per_page=POSTS_PER_PAGE):
+    if search_enabled():
+        paginator = SearchPaginator(query, per_page)
+    else:
+        words = WORD_RE.findall(query)
+        condition = Q(pk__in=[])
+        if words:
+            condition = Q()
+            for word in words:
+                condition &= (
+                    Q(heading__icontains=word)
+                    | Q(text__icontains=word)
+                    | Q(comments__text__icontains=word)
+                )
+        paginator = CursorPaginator(
+            build_feed(Post.objects.filter(condition).distinct()), per_page
+        )
+    page = paginator.get_page(request.GET)
+    prepare_cards(page.object_list)
+    return paginator, page
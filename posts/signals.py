@@ -0,0 +1,105 @@
+from avatar.models import Avatar
+from avatar.signals import avatar_deleted, avatar_updated
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cards import bump_author, bump_group, bump_post
+from .models import Comment, Group, Post
+from .pagecache import bump_pages
+from .search import (index_comment, index_post, unindex_comment,
+                     unindex_post)
+from .timeline import fan_out_post
+from .trending import record_comment, record_post
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def score_new_post(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        record_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def score_new_comment(sender, instance, created, **kwargs):
+    if created and not kwargs.get('raw'):
+        record_comment(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, **kwargs):
+    index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    unindex_comment(instance.pk)
+
+
+def bump_card(bump, object_id):
+    """
+    Внутри транзакции версия меняется ещё и после коммита: иначе запрос
+    между сигналом и коммитом закэширует старую карточку под новой версией.
+    """
+    bump(object_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump(object_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def refresh_post_card(sender, instance, **kwargs):
+    bump_card(bump_post, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_commented_card(sender, instance, **kwargs):
+    bump_card(bump_post, instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+def refresh_group_cards(sender, instance, created, **kwargs):
+    if not created:
+        bump_card(bump_group, instance.pk)
+
+
+@receiver(avatar_updated)
+@receiver(avatar_deleted)
+def refresh_author_cards(sender, user, **kwargs):
+    bump_author(user.pk)
+    bump_pages()
+
+
+# avatar_deleted отправляется до удаления строк, поэтому версия автора
+# меняется ещё раз, когда аватар действительно сохранён или удалён: иначе
+# запрос между сигналом и удалением закэширует старый URL под новой версией.
+@receiver(post_save, sender=Avatar)
+@receiver(post_delete, sender=Avatar)
+def refresh_avatar_owner(sender, instance, **kwargs):
+    bump_author(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def refresh_anonymous_pages(sender, **kwargs):
+    bump_pages()
@@ -0,0 +1,326 @@
+"""
+Генератор синтетических данных для нагрузочных прогонов.
+
+Пользователи режутся на чанки одинакового размера; всё, что относится
+к чанку (сами пользователи, их посты, подписки и комментарии), строится
+отдельными ``random.Random``, засеянными seed-ом и номером чанка. Поэтому
+результат не зависит ни от числа процессов, ни от порядка, в котором
+они досчитали: одинаковый seed даёт одинаковые строки.
+
+Первичные ключи пользователей, групп и постов выдаются заранее, чтобы
+внешние ключи можно было строить без обращения к базе. Для постов это
+требует знать, сколько постов в каждом чанке, — ``chunk_post_counts``
+считает это тем же генератором, что и воркер.
+
+Перекосы как в живой сети:
+
+* подписчики распределены по степенному закону — чем меньше номер
+  пользователя, тем он популярнее;
+* число постов у автора и подписок у читателя — распределение Парето;
+* автор пишет сериями: несколько постов с интервалом в минуты, потом
+  затишье;
+* размеры групп — длинный хвост, часть постов без группы.
+"""
+import csv
+import os
+import random
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from django.db import connections, transaction
+
+from users.models import CustomUser, CustomUserRole
+
+from .models import Comment, Follow, Group, Post
+
+WORDS = (
+    'день утро вечер город море лес дорога дом друг книга музыка кино '
+    'работа отпуск поезд кофе чай кот собака весна лето осень зима '
+    'новость мысль история фото прогулка парк река гора солнце дождь '
+    'снег ветер небо звезда окно улица мост площадь сад поле озеро'
+).split()
+
+USER_COLUMNS = (
+    'id', 'password', 'last_login', 'is_superuser', 'username',
+    'first_name', 'last_name', 'email', 'is_staff', 'is_active',
+    'date_joined', 'role', 'posts_count', 'followers_count',
+    'follows_count',
+)
+GROUP_COLUMNS = ('id', 'title', 'slug', 'description')
+POST_COLUMNS = ('id', 'heading', 'text', 'pub_date', 'author_id',
+                'group_id', 'image')
+FOLLOW_COLUMNS = ('user_id', 'author_id')
+COMMENT_COLUMNS = ('post_id', 'author_id', 'text', 'created')
+
+TABLES = (
+    (CustomUser, USER_COLUMNS),
+    (Group, GROUP_COLUMNS),
+    (Post, POST_COLUMNS),
+    (Follow, FOLLOW_COLUMNS),
+    (Comment, COMMENT_COLUMNS),
+)
+
+
+@dataclass
+class Plan:
+    """Параметры генерации, общие для всех чанков."""
+
+    seed: int
+    users: int
+    groups: int
+    posts_per_user: float
+    follows_per_user: float
+    comments_per_user: float
+    chunk_size: int
+    start: datetime
+    days: int
+    password: str
+    user_base: int = 1
+    group_base: int = 1
+    post_base: int = 1
+
+    @property
+    def chunks(self):
+        return (self.users + self.chunk_size - 1) // self.chunk_size
+
+    def chunk_users(self, chunk):
+        first = chunk * self.chunk_size
+        return range(first, min(first + self.chunk_size, self.users))
+
+
+def chunk_random(plan, chunk):
+    return random.Random(f'{plan.seed}:{chunk}')
+
+
+def pareto_count(rng, mean, alpha, limit):
+    """Целое с тяжёлым хвостом и средним около ``mean``."""
+    scale = mean * (alpha - 1) / alpha
+    return min(int(rng.paretovariate(alpha) * scale), limit)
+
+
+def skewed_index(rng, size, power):
+    """Индекс в ``range(size)``, маленькие индексы выпадают чаще."""
+    return min(int(size * rng.random() ** power), size - 1)
+
+
+def sentence(rng, words, limit=None):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+    return text[:limit] if limit else text
+
+
+def _post_counts(plan, rng, users):
+    return [
+        pareto_count(rng, plan.posts_per_user, 1.3,
+                     int(plan.posts_per_user * 50) + 1)
+        for _ in users
+    ]
+
+
+def chunk_post_counts(plan):
+    """Число постов в каждом чанке — для выдачи первичных ключей постов."""
+    return [
+        sum(_post_counts(plan, chunk_random(plan, chunk),
+                         plan.chunk_users(chunk)))
+        for chunk in range(plan.chunks)
+    ]
+
+
+def post_offsets(plan):
+    """Первый id поста каждого чанка и общее число постов."""
+    offsets, total = [], 0
+    for count in chunk_post_counts(plan):
+        offsets.append(plan.post_base + total)
+        total += count
+    return offsets, total
+
+
+def generate_groups(plan):
+    rng = random.Random(f'{plan.seed}:groups')
+    for index in range(plan.groups):
+        pk = plan.group_base + index
+        yield (pk, sentence(rng, 2, 50), f'group-{pk}', sentence(rng, 12))
+
+
+def _bursts(rng, count, start, span):
+    """Моменты публикации ``count`` постов, собранные в серии."""
+    moments = []
+    while len(moments) < count:
+        moment = start + rng.random() * span
+        for _ in range(min(rng.randint(1, 8), count - len(moments))):
+            moments.append(moment)
+            moment += rng.expovariate(1 / 600)
+    return sorted(moments)
+
+
+def generate_authors(plan, chunk, first_post_id):
+    """
+    Пользователи чанка и их посты в виде ``{модель: [кортежи]}``;
+    колонки идут в порядке ``*_COLUMNS``.
+    """
+    rng = chunk_random(plan, chunk)
+    users = plan.chunk_users(chunk)
+    post_counts = _post_counts(plan, rng, users)
+    span = plan.days * 86400
+    start = plan.start.timestamp()
+    rows = {CustomUser: [], Post: []}
+    post_id = first_post_id
+    for index, posts in zip(users, post_counts):
+        pk = plan.user_base + index
+        joined = start + rng.random() * span / 2
+        rows[CustomUser].append((
+            pk, plan.password, None, False, f'user{pk}', '', '',
+            f'user{pk}@example.com', False, True, _moment(joined),
+            CustomUserRole.user, 0, 0, 0,
+        ))
+        for moment in _bursts(rng, posts, joined, start + span - joined):
+            group_id = None
+            if plan.groups and rng.random() < 0.8:
+                group_id = plan.group_base + skewed_index(
+                    rng, plan.groups, 2.5
+                )
+            rows[Post].append((
+                post_id, sentence(rng, 4, 50),
+                sentence(rng, rng.randint(5, 60)), _moment(moment), pk,
+                group_id, '',
+            ))
+            post_id += 1
+    return rows
+
+
+def generate_links(plan, chunk, total_posts):
+    """
+    Подписки и комментарии пользователей чанка. Они ссылаются на
+    пользователей и посты любых чанков, поэтому в базу пишутся после
+    того, как записаны все ``generate_authors``.
+    """
+    rng = random.Random(f'{plan.seed}:{chunk}:links')
+    span = plan.days * 86400
+    start = plan.start.timestamp()
+    rows = {Follow: [], Comment: []}
+    for index in plan.chunk_users(chunk):
+        pk = plan.user_base + index
+        follows = pareto_count(
+            rng, plan.follows_per_user, 1.5,
+            min(int(plan.follows_per_user * 50) + 1, (plan.users - 1) // 2),
+        )
+        authors = set()
+        while len(authors) < follows:
+            author = skewed_index(rng, plan.users, 3)
+            if author != index:
+                authors.add(author)
+        rows[Follow].extend(
+            (pk, plan.user_base + author) for author in sorted(authors)
+        )
+        if not total_posts:
+            continue
+        comments = pareto_count(rng, plan.comments_per_user, 1.5,
+                                int(plan.comments_per_user * 50) + 1)
+        for _ in range(comments):
+            rows[Comment].append((
+                plan.post_base + skewed_index(rng, total_posts, 2), pk,
+                sentence(rng, rng.randint(3, 25)),
+                _moment(start + span * (0.5 + rng.random() / 2)),
+            ))
+    return rows
+
+
+def _moment(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class DatabaseWriter:
+    """Пишет строки пачками ``executemany`` внутри транзакции на чанк."""
+
+    def __init__(self, using='default', batch_size=5000):
+        self.connection = connections[using]
+        self.using = using
+        self.batch_size = batch_size
+
+    def _adapt(self, columns, rows):
+        ops = self.connection.ops
+        dates = [
+            index for index, column in enumerate(columns)
+            if column in ('last_login', 'date_joined', 'pub_date', 'created')
+        ]
+        for row in rows:
+            if dates:
+                row = list(row)
+                for index in dates:
+                    row[index] = ops.adapt_datetimefield_value(row[index])
+            yield row
+
+    def write(self, model, columns, rows, ignore_conflicts=False):
+        quote = self.connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(column) for column in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        if ignore_conflicts:
+            sql += ' ON CONFLICT DO NOTHING'
+        rows = list(self._adapt(columns, rows))
+        written = 0
+        with self.connection.cursor() as cursor:
+            for start in range(0, len(rows), self.batch_size):
+                cursor.executemany(sql, rows[start:start + self.batch_size])
+                # Строки, пропущенные ON CONFLICT, не считаются.
+                written += cursor.rowcount
+        return written
+
+    def write_chunk(self, chunk, rows):
+        with transaction.atomic(using=self.using):
+            return {
+                model: self.write(model, columns, rows[model])
+                for model, columns in TABLES if rows.get(model)
+            }
+
+
+class DumpWriter:
+    """
+    Пишет каждый чанк отдельным CSV-файлом в каталог таблицы:
+    ``<каталог>/<таблица>/<номер чанка>.csv``. Файлы разных чанков
+    не пересекаются, поэтому воркеры пишут их параллельно.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, model, columns, rows, name):
+        directory = os.path.join(self.directory, model._meta.db_table)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{name}.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            writer = csv.writer(stream)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(
+                    value.isoformat() if isinstance(value, datetime)
+                    else value
+                    for value in row
+                )
+        return len(rows)
+
+    def write_chunk(self, chunk, rows):
+        return {
+            model: self.write(model, columns, rows[model], f'{chunk:06d}')
+            for model, columns in TABLES if rows.get(model)
+        }
+
+
+def dump_chunk(plan, chunk, first_post_id, total_posts, directory):
+    """Точка входа воркера в режиме дампа: генерирует и сразу пишет."""
+    rows = generate_authors(plan, chunk, first_post_id)
+    rows.update(generate_links(plan, chunk, total_posts))
+    counts = DumpWriter(directory).write_chunk(chunk, rows)
+    return {model._meta.label: count for model, count in counts.items()}
+
+
+def next_id(model, using='default'):
+    last = model.objects.using(using).order_by('-pk').values_list(
+        'pk', flat=True
+    ).first()
+    return (last or 0) + 1
+
+
+def default_start():
+    return datetime(2020, 1, 1, tzinfo=timezone.utc)
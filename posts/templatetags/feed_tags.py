@@ -0,0 +1,48 @@
+import logging
+
+from avatar.conf import settings
+from django import template
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from posts.avatars import user_avatar_url
+from posts.thumbnails import ready_thumbnail, submit_thumbnail
+
+logger = logging.getLogger(__name__)
+register = template.Library()
+
+
+@register.simple_tag
+def feed_avatar(user, size=settings.AVATAR_DEFAULT_SIZE, **kwargs):
+    """
+    ``{% avatar %}`` с URL из ``posts.avatars``: для авторов страницы он
+    уже подготовлен, для остальных берётся из кэша.
+    """
+    kwargs.update({'alt': str(user)})
+    context = {
+        'user': user,
+        'url': user_avatar_url(user, size),
+        'size': size,
+        'kwargs': kwargs,
+    }
+    return render_to_string('avatar/avatar_tag.html', context)
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """
+    Миниатюра картинки поста, если она уже нарезана; иначе нарезка
+    уходит в фоновый пул, а вместо миниатюры отдаётся исходная картинка.
+    """
+    if not post.image:
+        return None
+    try:
+        thumbnail = ready_thumbnail(post.image)
+    except Exception:
+        logger.exception('Не удалось проверить миниатюру %s', post.image)
+        thumbnail = None
+    if thumbnail is not None:
+        return thumbnail
+    image_name, post_id = post.image.name, post.pk
+    transaction.on_commit(lambda: submit_thumbnail(image_name, post_id))
+    return post.image
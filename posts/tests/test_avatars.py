@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+
+from avatar.models import Avatar
+from avatar.signals import avatar_deleted, avatar_updated
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.avatars import attach_avatar_urls, avatar_urls
+from posts.models import Post
+from posts.tests.test_thumbnails import make_image
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AvatarUrlsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.with_avatar = User.objects.create(
+            username="Gleb", email="gleb@yatube.ru"
+        )
+        cls.without_avatar = User.objects.create(
+            username="Olga", email="olga@yatube.ru"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.avatar = self.upload(self.with_avatar, primary=True)
+
+    def upload(self, user, primary=False):
+        avatar = Avatar(user=user, primary=primary)
+        avatar.avatar.save("face.png", make_image("face.png"))
+        return avatar
+
+    def users(self):
+        return [self.with_avatar, self.without_avatar]
+
+    def test_page_is_resolved_once_then_cached(self):
+        with self.assertNumQueries(1):
+            urls = avatar_urls(self.users(), 80)
+        self.assertEqual(urls[self.with_avatar.pk], self.avatar.avatar_url(80))
+        self.assertTrue(self.avatar.thumbnail_exists(80))
+        # Пользователь без аватара получает URL остальных провайдеров.
+        self.assertTrue(urls[self.without_avatar.pk])
+        with self.assertNumQueries(0):
+            self.assertEqual(avatar_urls(self.users(), 80), urls)
+
+    def test_attached_urls_are_used_by_tag(self):
+        urls = avatar_urls(self.users())
+        with self.assertNumQueries(0):
+            attach_avatar_urls(self.users())
+        for user in self.users():
+            self.assertEqual(user.avatar_urls, {80: urls[user.pk]})
+        Post.objects.create(author=self.with_avatar, text="Текст")
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, urls[self.with_avatar.pk])
+
+    def test_avatar_signals_invalidate_url(self):
+        newer = self.upload(self.with_avatar)
+        old_url = avatar_urls([self.with_avatar], 80)[self.with_avatar.pk]
+        Avatar.objects.filter(pk=self.avatar.pk).update(primary=False)
+        Avatar.objects.filter(pk=newer.pk).update(primary=True)
+        # Изменение через update() видно только после сигнала вьюхи.
+        self.assertEqual(
+            avatar_urls([self.with_avatar], 80)[self.with_avatar.pk], old_url
+        )
+        avatar_updated.send(sender=Avatar, user=self.with_avatar,
+                            avatar=newer)
+        self.assertEqual(
+            avatar_urls([self.with_avatar], 80)[self.with_avatar.pk],
+            newer.avatar_url(80),
+        )
+        avatar_deleted.send(sender=Avatar, user=self.with_avatar,
+                            avatar=newer)
+        Avatar.objects.filter(user=self.with_avatar).delete()
+        self.assertNotEqual(
+            avatar_urls([self.with_avatar], 80)[self.with_avatar.pk],
+            newer.avatar_url(80),
+        )
+
+    def test_deleted_avatar_is_not_cached_after_signal(self):
+        # avatar_deleted приходит до удаления: URL, прочитанный между
+        # сигналом и удалением, не должен пережить само удаление.
+        avatar_deleted.send(sender=Avatar, user=self.with_avatar,
+                            avatar=self.avatar)
+        stale = avatar_urls([self.with_avatar], 80)[self.with_avatar.pk]
+        self.avatar.delete()
+        url = avatar_urls([self.with_avatar], 80)[self.with_avatar.pk]
+        self.assertEqual(stale, self.avatar.avatar_url(80))
+        self.assertNotEqual(url, stale)
@@ -0,0 +1,143 @@
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from yatube import metrics
+from yatube.backends.cache import LocalTier, TwoTierCache
+
+DIRECTORY = tempfile.mkdtemp(prefix="yatube-cache-test-")
+OPTIONS = {"LOCAL_MAX_ENTRIES": 3, "LOCAL_TIMEOUT": 60, "SYNC_INTERVAL": 0,
+           "JITTER": 0.5}
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "yatube.backends.cache.TwoTierCache",
+                "LOCATION": "shared", "OPTIONS": OPTIONS},
+    "shared": {"BACKEND":
+               "django.core.cache.backends.filebased.FileBasedCache",
+               "LOCATION": DIRECTORY},
+})
+class TwoTierCacheTest(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+    def setUp(self):
+        self.cache = self.worker()
+        self.cache.clear()
+
+    def worker(self):
+        """Кэш «другого процесса»: общее хранилище, свой LRU."""
+        cache = TwoTierCache("shared", {"OPTIONS": OPTIONS})
+        cache.local = LocalTier(OPTIONS["LOCAL_MAX_ENTRIES"])
+        return cache
+
+    def test_reads_are_served_by_local_tier(self):
+        self.cache.set("key", {"value": 1})
+        other = self.worker()
+        self.assertEqual(other.get("key"), {"value": 1})
+        self.assertEqual(other.get("key"), {"value": 1})
+        stats = other.tier_stats()
+        self.assertEqual(stats["local"]["hits"], 1)
+        self.assertEqual(stats["remote"]["hits"], 1)
+        self.assertEqual(stats["local"]["hit_rate"], 0.5)
+
+    def test_local_tier_is_bounded_lru(self):
+        for index in range(5):
+            self.cache.set(f"key{index}", index)
+        self.assertEqual(list(self.cache.local.entries),
+                         [self.cache.make_key(f"key{index}")
+                          for index in (2, 3, 4)])
+
+    def test_overwrite_invalidates_other_processes(self):
+        other = self.worker()
+        self.cache.set("key", "old")
+        self.assertEqual(other.get("key"), "old")
+        self.cache.set("key", "new")
+        self.assertEqual(other.get("key"), "new")
+        self.cache.delete("key")
+        self.assertIsNone(other.get("key"))
+
+    def test_overwrite_keeps_other_local_entries(self):
+        other = self.worker()
+        self.cache.set("version", 1)
+        self.cache.set("page", "html")
+        self.assertEqual(other.get("version"), 1)
+        self.assertEqual(other.get("page"), "html")
+        self.cache.set("version", 2)
+        self.assertEqual(other.get("version"), 2)
+        self.assertEqual(other.get("page"), "html")
+        stats = other.tier_stats()
+        # Заново из общего хранилища читается только изменённый ключ.
+        self.assertEqual(stats["remote"]["hits"], 3)
+        self.assertEqual(stats["local"]["hits"], 1)
+
+    def test_long_log_gap_drops_local_tier(self):
+        other = self.worker()
+        other.log_size = 1
+        self.cache.set("first", 1)
+        self.cache.set("second", 2)
+        other.get("first")
+        other.get("second")
+        self.cache.set("first", 10)
+        self.cache.set("second", 20)
+        other.get("third")
+        self.assertEqual(len(other.local.entries), 0)
+
+    def test_clear_resets_other_processes(self):
+        other = self.worker()
+        self.cache.set("key", "value")
+        self.assertEqual(other.get("key"), "value")
+        self.cache.clear()
+        self.assertIsNone(other.get("key"))
+
+    def test_get_or_set_coalesces_concurrent_misses(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "value"
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.cache.get_or_set("slow", compute)
+                )
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 8)
+
+    def test_get_or_set_waits_for_other_process(self):
+        other = self.worker()
+        other.lock_poll = 0.01
+        lock_key = "two_tier:lock:" + self.cache.make_key("slow")
+        caches["shared"].add(lock_key, 1)
+        threading.Timer(0.05, self.cache.set, ["slow", "ready"]).start()
+        self.assertEqual(other.get_or_set("slow", lambda: "own"), "ready")
+
+    def test_timeouts_are_jittered(self):
+        timeouts = {self.cache.jittered(100) for _ in range(20)}
+        self.assertGreater(len(timeouts), 1)
+        self.assertTrue(all(100 <= timeout <= 150 for timeout in timeouts))
+        self.assertIsNone(self.cache.jittered(None))
+
+    def test_metrics_expose_tier_counters(self):
+        caches["default"].get("missing")
+        body = metrics.exposition()
+        self.assertIn('yatube_cache_misses_total{cache="default",'
+                      'tier="remote"}', body)
+        self.assertIn('yatube_cache_hits_total{cache="default",'
+                      'tier="local"}', body)
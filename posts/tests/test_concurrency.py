@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+from django.test import Client, TransactionTestCase
+from django.urls import reverse
+
+from posts import concurrency
+from posts.concurrency import atomic_write
+from posts.models import Post
+
+
+class AtomicWriteTest(TransactionTestCase):
+    def test_locked_transaction_is_retried(self):
+        calls = []
+
+        @atomic_write
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return "saved"
+
+        with mock.patch.object(concurrency.time, "sleep"):
+            self.assertEqual(write(), "saved")
+        self.assertEqual(calls, [True, True])
+
+    def test_other_errors_are_not_retried(self):
+        write = mock.Mock(side_effect=OperationalError("no such table"))
+        with self.assertRaises(OperationalError):
+            atomic_write(write)()
+        self.assertEqual(write.call_count, 1)
+
+    def test_gives_up_after_last_attempt(self):
+        write = mock.Mock(side_effect=OperationalError("database is locked"))
+        with mock.patch.object(concurrency.time, "sleep"), \
+                self.assertRaises(OperationalError):
+            atomic_write(write)()
+        self.assertEqual(write.call_count, concurrency.WRITE_ATTEMPTS)
+
+
+class GatherQueriesTest(TransactionTestCase):
+    def test_wsgi_views_reuse_request_connection(self):
+        user = get_user_model().objects.create(username="Vera",
+                                               email="vera@yatube.ru")
+        post = Post.objects.create(author=user, text="Текст")
+        client = Client()
+        client.force_login(user)
+        urls = (reverse("profile", args=[user.username]),
+                reverse("post", args=[user.username, post.pk]))
+        for url in urls:
+            client.get(url)
+        created = []
+
+        def count(sender, connection, **kwargs):
+            created.append(connection.alias)
+
+        connection_created.connect(count)
+        self.addCleanup(connection_created.disconnect, count)
+        for url in urls:
+            self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(created, [])
+
+
+class SQLiteBackendTest(TransactionTestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.reader = User.objects.create(
+            username="Reader", email="reader@yatube.ru"
+        )
+        cls.group = Group.objects.create(
+            title="Заголовок",
+            description="Описание",
+            slug="Slug_test",
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+
+    def create_posts(self, count):
+        User = get_user_model()
+        for i in range(count):
+            author = User.objects.create(
+                username=f"Author_{i}", email=f"author_{i}@yatube.ru"
+            )
+            Follow.objects.create(user=self.reader, author=author)
+            post = Post.objects.create(
+                author=author, text=f"Тестовый текст {i}", group=self.group
+            )
+            Comment.objects.bulk_create(
+                [Comment(post=post, author=self.reader, text="Комментарий")
+                 for _ in range(i + 1)]
+            )
+
+    def count_queries(self, url):
+        # Холодный кэш: аватары авторов читаются из БД на каждой странице.
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        urls = (
+            reverse("index"),
+            reverse("group", kwargs={"slug": "Slug_test"}),
+            reverse("follow_index"),
+            reverse("profile", kwargs={"username": "Author_0"}),
+        )
+        self.create_posts(1)
+        small = {url: self.count_queries(url) for url in urls}
+        Post.objects.all().delete()
+        get_user_model().objects.exclude(pk=self.reader.pk).delete()
+        self.create_posts(10)
+        # В профиле тоже должна быть полная страница постов.
+        author = get_user_model().objects.get(username="Author_0")
+        for i in range(9):
+            post = Post.objects.create(
+                author=author, text=f"Ещё текст {i}", group=self.group
+            )
+            Comment.objects.create(post=post, author=self.reader,
+                                   text="Комментарий")
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+
+    def test_comment_count_is_annotated(self):
+        self.create_posts(3)
+        response = self.client.get(reverse("index"))
+        counts = {
+            post.text: post.comment_count for post in response.context["page"]
+        }
+        self.assertEqual(counts["Тестовый текст 2"], 3)
+        self.assertEqual(counts["Тестовый текст 0"], 1)
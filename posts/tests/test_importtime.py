@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from yatube.importtime import package_totals, parse_profile, profile_imports
+
+
+class ImportProfileTest(SimpleTestCase):
+    def test_parse_profile(self):
+        entries = parse_profile([
+            'import profile:b.c\t30\t30\tb\n',
+            'обычная строка stderr\n',
+            'import profile:b\t20\t50\ta\n',
+            'import profile:a\t10\t60\t\n',
+        ])
+        self.assertEqual(
+            [(entry.name, entry.parent) for entry in entries],
+            [('b.c', 'b'), ('b', 'a'), ('a', None)],
+        )
+        self.assertEqual(package_totals(entries), [('b', 50), ('a', 10)])
+
+    def test_importer_is_recorded(self):
+        entries = {
+            entry.name: entry for entry in profile_imports('yatube.routers')
+        }
+        routers = entries['yatube.routers']
+        self.assertGreaterEqual(routers.cumulative_us, routers.self_us)
+        # Первым django.db импортирует именно yatube.routers.
+        self.assertEqual(entries['django.db'].parent, 'yatube.routers')
+
+    def test_command_output(self):
+        out = StringIO()
+        call_command('profile_imports', target='yatube.routers', limit=5,
+                     packages=['yatube'], stdout=out)
+        output = out.getvalue()
+        self.assertIn('Импорт yatube.routers:', output)
+        self.assertIn('импортирован из', output)
+        self.assertIn('yatube.routers', output)
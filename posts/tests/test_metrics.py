@@ -0,0 +1,83 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube import metrics
+
+
+class MetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(
+            username="metrics", email="metrics@yatube.ru"
+        )
+        Post.objects.create(author=cls.user, heading="Пост", text="Текст")
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def scrape(self):
+        response = Client().get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_view_is_measured(self):
+        Client().get(reverse("index"))
+        Client().get(reverse("about:author"))
+        body = self.scrape()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts.views.index"} 1',
+            body,
+        )
+        self.assertIn(
+            'yatube_request_queries_count'
+            '{view="about.views.AboutAuthorView"} 1',
+            body,
+        )
+        queries = [
+            line for line in body.splitlines()
+            if line.startswith('yatube_request_queries_sum'
+                               '{view="posts.views.index"}')
+        ]
+        self.assertGreater(float(queries[0].split()[-1]), 0)
+
+    def test_metrics_endpoint_is_not_measured(self):
+        self.scrape()
+        self.assertNotIn("metrics_view", self.scrape())
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_endpoint_is_private(self):
+        response = Client().get(reverse("metrics"))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0,
+                       METRICS_SLOW_SAMPLE_RATE=1)
+    def test_slow_request_logs_sql(self):
+        with self.assertLogs("yatube.slow_requests", "WARNING") as logs:
+            Client().get(reverse("index"))
+        self.assertIn("posts.views.index", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+
+class CollectorTest(SimpleTestCase):
+    def test_queries_from_worker_threads_are_all_counted(self):
+        collector = metrics.Collector(capture_sql=True)
+
+        def run():
+            for _ in range(1000):
+                collector.add_query(0.001, "SELECT 1", ())
+
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(collector.queries, 8000)
+        self.assertEqual(len(collector.statements), 8000)
+        self.assertAlmostEqual(collector.db_time, 8.0)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(
+            username="Rita", email="rita@yatube.ru"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, heading="Заголовок", text="Первый текст"
+        )
+        self.urls = [
+            reverse("index"),
+            reverse("groups"),
+            reverse("profile", args=[self.user.username]),
+            reverse("post", args=[self.user.username, self.post.id]),
+        ]
+
+    def test_second_anonymous_request_is_served_from_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = Client().get(url)
+                self.assertNotIn("X-Page-Cache", first)
+                with self.assertNumQueries(0):
+                    second = Client().get(url)
+                self.assertEqual(second["X-Page-Cache"], "hit")
+                self.assertEqual(first.content, second.content)
+                self.assertIn("Cookie", second["Vary"])
+
+    def test_conditional_get_returns_304(self):
+        url = reverse("index")
+        first = Client().get(url)
+        response = Client().get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = Client().get(
+            url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_invalidate_pages(self):
+        url = reverse("post", args=[self.user.username, self.post.id])
+        first = Client().get(url)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text="Свежий комментарий")
+        response = Client().get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Свежий комментарий")
+
+    def test_logged_in_users_bypass_cache(self):
+        Client().get(reverse("index"))
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse("index"))
+        self.assertNotIn("X-Page-Cache", response)
+        self.assertContains(response, "Новая запись")
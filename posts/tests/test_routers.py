@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.routers import ReplicaRouter, RoutingState, routing_state
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTest(TestCase):
+    def route(self, state, model=Post):
+        token = routing_state.set(state)
+        try:
+            return router.db_for_read(model)
+        finally:
+            routing_state.reset(token)
+
+    def test_safe_feed_reads_go_to_replica(self):
+        state = RoutingState()
+        state.use_replica = True
+        self.assertEqual(self.route(state), "replica")
+
+    def test_outside_feed_views_reads_go_to_primary(self):
+        self.assertEqual(self.route(RoutingState()), "default")
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_sticky_and_written_requests_read_primary(self):
+        sticky = RoutingState(sticky=True)
+        sticky.use_replica = True
+        self.assertEqual(self.route(sticky), "default")
+        wrote = RoutingState()
+        wrote.use_replica = True
+        token = routing_state.set(wrote)
+        try:
+            ReplicaRouter().db_for_write(Post)
+        finally:
+            routing_state.reset(token)
+        self.assertEqual(self.route(wrote), "default")
+
+    def test_sessions_always_read_primary(self):
+        from django.contrib.sessions.models import Session
+        state = RoutingState()
+        state.use_replica = True
+        self.assertEqual(self.route(state, Session), "default")
+
+
+class StickyPrimaryCookieTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(
+            username="sticky", email="sticky@yatube.ru"
+        )
+        cls.post = Post.objects.create(author=cls.user, heading="Пост",
+                                       text="Текст")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_comment_sets_sticky_cookie(self):
+        response = self.client.post(
+            reverse("add_comment", args=[self.user.username, self.post.pk]),
+            {"text": "Комментарий"},
+        )
+        self.assertIn("use_primary", response.cookies)
+
+    def test_plain_read_does_not_set_cookie(self):
+        response = self.client.get(reverse("index"))
+        self.assertNotIn("use_primary", response.cookies)
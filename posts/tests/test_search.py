@@ -0,0 +1,103 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts import search
+from posts.search import SEARCH_TABLE, SearchPaginator
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(
+            username="Lena", email="lena@yatube.ru"
+        )
+
+    def search(self, query, querystring=""):
+        response = Client().get(
+            reverse("search") + f"?q={query}" + querystring
+        )
+        return response.context["page"]
+
+    def test_heading_ranks_above_text(self):
+        in_text = Post.objects.create(
+            author=self.user, heading="Прогулка", text="Видели кошку"
+        )
+        in_heading = Post.objects.create(
+            author=self.user, heading="Кошку", text="Гуляли по парку"
+        )
+        Post.objects.create(author=self.user, heading="Собака", text="Лай")
+        self.assertListEqual(
+            list(self.search("кошку")), [in_heading, in_text]
+        )
+
+    def test_comments_find_their_post(self):
+        post = Post.objects.create(author=self.user, heading="Пост",
+                                   text="Текст")
+        Comment.objects.create(post=post, author=self.user,
+                               text="Отличный велосипед")
+        self.assertListEqual(list(self.search("велосипед")), [post])
+
+    def test_edit_and_delete_update_index(self):
+        post = Post.objects.create(author=self.user, heading="Пост",
+                                   text="Старый")
+        post.text = "Новый"
+        post.save()
+        self.assertListEqual(list(self.search("Старый")), [])
+        self.assertListEqual(list(self.search("Новый")), [post])
+        post.delete()
+        self.assertListEqual(list(self.search("Новый")), [])
+
+    def test_results_are_paginated_by_cursor(self):
+        Post.objects.bulk_create(
+            [Post(author=self.user, heading="Пост", text=f"Море {i}")
+             for i in range(13)]
+        )
+        call_command("rebuild_search_index", stdout=StringIO())
+        first_page = self.search("море")
+        self.assertEqual(len(first_page), 10)
+        second_page = self.search("море", "&" + first_page.next_querystring)
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(
+            set(first_page.object_list) & set(second_page.object_list)
+        )
+
+    def test_rebuild_restores_index(self):
+        post = Post.objects.create(author=self.user, heading="Пост",
+                                   text="Горы")
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertListEqual(list(self.search("горы")), [post])
+
+    def test_admin_search_uses_index(self):
+        admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="pass"
+        )
+        post = Post.objects.create(author=self.user, heading="Пост",
+                                   text="Река")
+        Post.objects.create(author=self.user, heading="Пост", text="Озеро")
+        client = Client()
+        client.force_login(admin)
+        response = client.get("/adminmysite/posts/post/?q=река")
+        self.assertListEqual(
+            list(response.context["cl"].result_list), [post]
+        )
+
+    def test_fts_syntax_error_is_an_empty_result(self):
+        Post.objects.create(author=self.user, text="Кошка")
+        paginator = SearchPaginator("кошка")
+        paginator.expression = '"кошка" AND'
+        self.assertEqual(len(paginator.page()), 0)
+
+    def test_other_database_errors_are_raised(self):
+        with mock.patch.object(search, "SEARCH_TABLE", "posts_missing"), \
+                self.assertRaises(OperationalError):
+            SearchPaginator("кошка").page()
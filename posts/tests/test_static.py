@@ -0,0 +1,120 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from yatube.settings import base, development
+from yatube.static import ManifestStorage, serve_media, serve_static
+
+PRODUCTION_ENV = {
+    'DJANGO_SECRET_KEY': 'production-secret',
+    'DJANGO_ALLOWED_HOSTS': 'yatube.example, www.yatube.example',
+}
+
+
+def load_production(env):
+    """Заново загружает боевой профиль с переменными окружения ``env``."""
+    with mock.patch.dict(os.environ, env):
+        for name in PRODUCTION_ENV:
+            if name not in env:
+                os.environ.pop(name, None)
+        sys.modules.pop('yatube.settings.production', None)
+        return importlib.import_module('yatube.settings.production')
+
+
+class SettingsProfilesTest(SimpleTestCase):
+    def test_production_requires_secret_key_and_hosts(self):
+        for missing in PRODUCTION_ENV:
+            with self.subTest(missing=missing):
+                env = {name: value for name, value in PRODUCTION_ENV.items()
+                       if name != missing}
+                with self.assertRaises(ImproperlyConfigured):
+                    load_production(env)
+
+    def test_production_takes_secrets_from_environment(self):
+        production = load_production(PRODUCTION_ENV)
+        self.assertEqual(production.SECRET_KEY, 'production-secret')
+        self.assertEqual(production.ALLOWED_HOSTS,
+                         ['yatube.example', 'www.yatube.example'])
+        self.assertNotEqual(production.SECRET_KEY, development.SECRET_KEY)
+        self.assertFalse(hasattr(base, 'SECRET_KEY'))
+
+    def test_two_tier_cache_is_production_only(self):
+        production = load_production(PRODUCTION_ENV)
+        self.assertEqual(production.CACHES['default']['BACKEND'],
+                         'yatube.backends.cache.TwoTierCache')
+        self.assertEqual(development.CACHES['default']['BACKEND'],
+                         'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_production_has_no_debug_tooling(self):
+        production = load_production(PRODUCTION_ENV)
+        self.assertFalse(production.DEBUG)
+        self.assertNotIn('debug_toolbar', production.INSTALLED_APPS)
+        self.assertNotIn('debug_toolbar.middleware.DebugToolbarMiddleware',
+                         production.MIDDLEWARE)
+        self.assertNotIn('django.template.context_processors.debug',
+                         production.TEMPLATES[0]['OPTIONS'][
+                             'context_processors'
+                         ])
+        self.assertEqual(production.STATICFILES_STORAGE,
+                         'yatube.static.ManifestStorage')
+
+    def test_production_drops_replica_routing_without_replicas(self):
+        production = load_production(PRODUCTION_ENV)
+        self.assertEqual(production.DATABASE_REPLICAS, [])
+        self.assertEqual(production.DATABASE_ROUTERS, [])
+        self.assertNotIn('yatube.middleware.ReplicaMiddleware',
+                         production.MIDDLEWARE)
+
+    def test_development_keeps_toolbar(self):
+        self.assertTrue(development.DEBUG)
+        self.assertIn('debug_toolbar', development.INSTALLED_APPS)
+        self.assertEqual(development.MIDDLEWARE[-1],
+                         'debug_toolbar.middleware.DebugToolbarMiddleware')
+
+
+class StaticServeTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        os.makedirs(os.path.join(self.directory, 'css'))
+        for name in ('site.0123456789ab.css', 'site.css'):
+            with open(os.path.join(self.directory, 'css', name), 'w') as file:
+                file.write('body {}')
+        self.factory = RequestFactory()
+
+    def serve(self, view, path):
+        with override_settings(STATIC_ROOT=self.directory,
+                               MEDIA_ROOT=self.directory):
+            response = view(self.factory.get(path), path)
+        self.assertEqual(response.status_code, 200)
+        return response['Cache-Control']
+
+    def test_hashed_file_is_immutable(self):
+        cache_control = self.serve(serve_static, 'css/site.0123456789ab.css')
+        self.assertIn('immutable', cache_control)
+        self.assertIn('max-age=31536000', cache_control)
+
+    def test_plain_file_is_cached_briefly(self):
+        for view in (serve_static, serve_media):
+            cache_control = self.serve(view, 'css/site.css')
+            self.assertNotIn('immutable', cache_control)
+            self.assertIn('max-age=3600', cache_control)
+
+    def test_manifest_storage_hashes_collected_files(self):
+        with open(os.path.join(self.directory, 'staticfiles.json'),
+                  'w') as manifest:
+            manifest.write('{"paths": {"css/site.css": '
+                           '"css/site.0123456789ab.css"}, "version": "1.0"}')
+        storage = ManifestStorage(location=self.directory,
+                                  base_url='/static/')
+        self.assertEqual(storage.url('css/site.css'),
+                         '/static/css/site.0123456789ab.css')
+        # Несобранный файл остаётся без хеша, а не роняет страницу.
+        self.assertEqual(storage.url('bootstrap/bootstrap.min.css'),
+                         '/static/bootstrap/bootstrap.min.css')
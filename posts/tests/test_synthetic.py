@@ -0,0 +1,43 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post
+from users.models import CustomUser
+
+
+class GenerateDataTest(TestCase):
+    def generate(self, **options):
+        options.setdefault("users", 60)
+        options.setdefault("chunk_size", 20)
+        options.setdefault("workers", 2)
+        call_command("generate_data", stdout=StringIO(), **options)
+
+    def test_loads_consistent_rows(self):
+        self.generate(seed=1)
+        self.assertEqual(CustomUser.objects.count(), 60)
+        self.assertTrue(Post.objects.exists())
+        self.assertTrue(Comment.objects.exists())
+        self.assertFalse(
+            Follow.objects.filter(user_id=F("author_id")).exists()
+        )
+        popular = CustomUser.objects.order_by("-followers_count").first()
+        self.assertEqual(
+            popular.followers_count,
+            Follow.objects.filter(author=popular).count(),
+        )
+
+    def test_same_seed_same_dump(self):
+        with tempfile.TemporaryDirectory() as first, \
+                tempfile.TemporaryDirectory() as second:
+            self.generate(seed=3, workers=1, dump=first)
+            self.generate(seed=3, workers=3, dump=second)
+            for table in os.listdir(first):
+                for name in os.listdir(os.path.join(first, table)):
+                    with open(os.path.join(first, table, name)) as a, \
+                            open(os.path.join(second, table, name)) as b:
+                        self.assertEqual(a.read(), b.read())
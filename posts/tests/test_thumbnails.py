@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.models import Post
+from posts.thumbnails import generate_thumbnail, ready_thumbnail
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class InlineExecutor:
+    """
+    ``ProcessPoolExecutor`` без процессов. Как и у настоящего дочернего
+    процесса с ``LocMemCache``, записи ``posts.thumbnails`` в кэш до
+    родителя не доходят.
+    """
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, func, iterable):
+        with mock.patch("posts.thumbnails.cache"):
+            return list(map(func, iterable))
+
+
+def make_image(name="small.png"):
+    content = BytesIO()
+    Image.new("RGB", (40, 20), "red").save(content, "PNG")
+    return SimpleUploadedFile(name, content.getvalue(),
+                              content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = get_user_model().objects.create(
+            username="Gleb", email="gleb@yatube.ru"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_new_post_queues_thumbnail(self):
+        with mock.patch("posts.thumbnails.submit_thumbnail") as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("new_post"), {
+                    "heading": "Заголовок",
+                    "text": "Текст",
+                    "image": make_image(),
+                })
+        post = Post.objects.get(author=self.user)
+        submit.assert_called_once_with(post.image.name, post.pk)
+
+    def test_original_is_shown_until_thumbnail_is_ready(self):
+        post = Post.objects.create(author=self.user, text="Текст",
+                                   image=make_image())
+        self.assertIsNone(ready_thumbnail(post.image))
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, post.image.url)
+
+        self.assertTrue(generate_thumbnail(post.image.name, post.pk))
+        thumbnail = ready_thumbnail(post.image)
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, thumbnail.url)
+
+    def test_pregenerate_records_thumbnails_in_parent(self):
+        post = Post.objects.create(author=self.user, text="Текст",
+                                   image=make_image())
+        version = Post.objects.get(pk=post.pk).card_version
+        with mock.patch("posts.management.commands.pregenerate_thumbnails"
+                        ".ProcessPoolExecutor", InlineExecutor):
+            call_command("pregenerate_thumbnails", stdout=StringIO())
+        self.assertIsNotNone(ready_thumbnail(post.image))
+        self.assertNotEqual(Post.objects.get(pk=post.pk).card_version,
+                            version)
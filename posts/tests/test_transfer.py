@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username="writer",
+                                         email="writer@yatube.ru")
+        cls.reader = User.objects.create(username="reader",
+                                         email="reader@yatube.ru")
+        cls.group = Group.objects.create(title="Группа", slug="transfer",
+                                         description="Описание")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.post = Post.objects.create(author=self.author, group=self.group,
+                                        heading="Заголовок", text="Пост")
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text="Комментарий")
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def run_command(self, name, *args):
+        out, err = StringIO(), StringIO()
+        call_command(name, self.directory, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_round_trip_remaps_foreign_keys(self):
+        for fmt in ("jsonl", "csv"):
+            with self.subTest(format=fmt):
+                Post.objects.exclude(pk=self.post.pk).delete()
+                self.run_command("export_content", "--format", fmt)
+                out, _ = self.run_command("import_content", "--format", fmt)
+                self.assertIn("users: загружено 0, уже были в базе 2", out)
+                self.assertIn("follows: загружено 0", out)
+                copy = Post.objects.exclude(pk=self.post.pk).get()
+                self.assertEqual(copy.author, self.author)
+                self.assertEqual(copy.group, self.group)
+                self.assertEqual(copy.pub_date, self.post.pub_date)
+                comment = copy.comments.get()
+                self.assertEqual(comment.author, self.reader)
+                self.assertEqual(comment.text, "Комментарий")
+
+    def test_invalid_rows_and_their_dependants_are_skipped(self):
+        self.run_command("export_content")
+        path = os.path.join(self.directory, "users.jsonl")
+        with open(path, "a", encoding="utf-8") as stream:
+            stream.write(json.dumps({
+                "id": 100, "password": "", "last_login": None,
+                "is_superuser": False, "username": "broken",
+                "first_name": "", "last_name": "", "email": "не почта",
+                "is_staff": False, "is_active": True,
+                "date_joined": "2021-01-01T00:00:00+00:00", "role": "user",
+                "posts_count": 0, "followers_count": 0, "follows_count": 0,
+            }) + "\n")
+        path = os.path.join(self.directory, "posts.jsonl")
+        with open(path, "a", encoding="utf-8") as stream:
+            stream.write(json.dumps({
+                "id": 100, "heading": "Сирота", "text": "Пост",
+                "pub_date": "2021-01-01T00:00:00+00:00", "author_id": 100,
+                "group_id": None, "image": None,
+            }) + "\n")
+        out, err = self.run_command("import_content")
+        self.assertIn("users: загружено 0, уже были в базе 2, с ошибками 1",
+                      out)
+        self.assertIn("posts: загружено 1, уже были в базе 0, с ошибками 1",
+                      out)
+        self.assertIn("email", err)
+        self.assertIn("ссылка на пропущенную строку 100", err)
+        self.assertFalse(Post.objects.filter(heading="Сирота").exists())
+
+    def test_duplicates_within_one_batch(self):
+        self.run_command("export_content")
+        user = {
+            "password": "!", "last_login": None, "is_superuser": False,
+            "first_name": "", "last_name": "", "is_staff": False,
+            "is_active": True, "date_joined": "2021-01-01T00:00:00+00:00",
+            "role": "user", "posts_count": 0, "followers_count": 0,
+            "follows_count": 0,
+        }
+        path = os.path.join(self.directory, "users.jsonl")
+        with open(path, "a", encoding="utf-8") as stream:
+            for id, username, email in ((200, "twin", "twin@yatube.ru"),
+                                        (201, "twin", "twin2@yatube.ru"),
+                                        (202, "other", "twin@yatube.ru")):
+                stream.write(json.dumps(dict(
+                    user, id=id, username=username, email=email,
+                )) + "\n")
+        path = os.path.join(self.directory, "posts.jsonl")
+        with open(path, "a", encoding="utf-8") as stream:
+            stream.write(json.dumps({
+                "id": 200, "heading": "Двойник", "text": "Пост",
+                "pub_date": "2021-01-01T00:00:00+00:00", "author_id": 201,
+                "group_id": None, "image": None,
+            }) + "\n")
+        out, err = self.run_command("import_content")
+        self.assertIn("users: загружено 1, уже были в базе 3, с ошибками 1",
+                      out)
+        self.assertIn("email", err)
+        User = get_user_model()
+        twin = User.objects.get(username="twin")
+        self.assertEqual(twin.email, "twin@yatube.ru")
+        self.assertFalse(User.objects.filter(username="other").exists())
+        self.assertEqual(Post.objects.get(heading="Двойник").author, twin)
@@ -0,0 +1,101 @@
+import math
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, Group, Post, TrendingScore
+
+
+class TrendingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(username="Trend",
+                                         email="trend@yatube.ru")
+        cls.reader = User.objects.create(username="Reader",
+                                         email="reader@yatube.ru")
+        cls.quiet = Group.objects.create(title="Тихая", slug="quiet")
+        cls.busy = Group.objects.create(title="Шумная", slug="busy")
+
+    def setUp(self):
+        cache.clear()
+        self.old = Post.objects.create(author=self.author, heading="Старый",
+                                       text="Старый пост", group=self.quiet)
+        self.new = Post.objects.create(author=self.author, heading="Новый",
+                                       text="Новый пост", group=self.busy)
+
+    def scores(self, kind):
+        return dict(TrendingScore.objects.filter(kind=kind)
+                    .values_list("object_id", "score"))
+
+    def test_events_update_scores_incrementally(self):
+        before = self.scores(TrendingScore.POST)
+        self.assertEqual(set(before), {self.old.pk, self.new.pk})
+        Comment.objects.create(post=self.old, author=self.reader,
+                               text="Комментарий")
+        after = self.scores(TrendingScore.POST)
+        self.assertGreater(after[self.old.pk], before[self.old.pk])
+        self.assertEqual(after[self.new.pk], before[self.new.pk])
+        self.assertEqual(
+            [post.pk for post in trending.trending_posts()],
+            [self.old.pk, self.new.pk],
+        )
+
+    def test_scores_decay_with_event_age(self):
+        now = timezone.now()
+        fresh = trending.event_score(1.0, now)
+        day_old = trending.event_score(1.0, now - timedelta(
+            seconds=trending.HALF_LIFE))
+        # Событие возрастом в период полураспада весит вдвое меньше.
+        self.assertAlmostEqual(fresh - day_old, math.log(2))
+
+    def test_groups_are_ordered_by_activity(self):
+        empty = Group.objects.create(title="Пустая", slug="empty")
+        for _ in range(2):
+            Comment.objects.create(post=self.old, author=self.reader,
+                                   text="Комментарий")
+        self.assertEqual(trending.trending_groups(3),
+                         [self.quiet, self.busy, empty])
+        response = Client().get(reverse("groups"))
+        self.assertEqual(list(response.context["groups"]),
+                         [self.quiet, self.busy, empty])
+
+    def test_follow_promotes_latest_post(self):
+        before = self.scores(TrendingScore.POST)[self.new.pk]
+        client = Client()
+        client.force_login(self.reader)
+        client.get(reverse("profile_follow", args=[self.author.username]))
+        self.assertGreater(self.scores(TrendingScore.POST)[self.new.pk],
+                           before)
+
+    def test_recompute_rebuilds_window(self):
+        Comment.objects.create(post=self.old, author=self.reader,
+                               text="Комментарий")
+        expected = self.scores(TrendingScore.POST)
+        Post.objects.filter(pk=self.new.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        TrendingScore.objects.create(kind=TrendingScore.GROUP,
+                                     object_id=999, score=1.0)
+        call_command("recompute_trending", "--days", "7", stdout=StringIO())
+        scores = self.scores(TrendingScore.POST)
+        self.assertEqual(set(scores), {self.old.pk})
+        self.assertAlmostEqual(scores[self.old.pk], expected[self.old.pk])
+        self.assertNotIn(999, self.scores(TrendingScore.GROUP))
+
+    def test_trending_page(self):
+        Comment.objects.create(post=self.old, author=self.reader,
+                               text="Комментарий")
+        response = Client().get(reverse("trending"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["posts"]),
+                         [self.old, self.new])
+        self.assertContains(response, "Старый пост")
@@ -1,9 +1,21 @@
+from io import StringIO
+from unittest import mock
+
+from avatar.signals import avatar_updated
 from django import forms
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, router
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import urlencode
 
-from posts.models import Comment, Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginators import CursorPaginator
+from posts.timeline import TimelinePaginator
+from yatube.routers import RoutingState, routing_state
 
 
 class PostPagesTests(TestCase):
@@ -191,10 +203,420 @@ class PaginatorViewsTest(TestCase):
             [Post(author=cls.user, text="Тестовый текст") for i in range(13)]
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_page_containse_ten_records(self):
         response = self.client.get(reverse("index"))
         self.assertEqual(len(response.context.get("page").object_list), 10)
 
     def test_second_page_containse_three_records(self):
-        response = self.client.get(reverse("index") + "?page=2")
+        first_page = self.client.get(reverse("index")).context.get("page")
+        response = self.client.get(
+            reverse("index") + "?" + first_page.next_querystring
+        )
         self.assertEqual(len(response.context.get("page").object_list), 3)
+        self.assertFalse(response.context.get("page").has_next())
+
+    def test_previous_page_returns_first_records(self):
+        first_page = self.client.get(reverse("index")).context.get("page")
+        second_page = self.client.get(
+            reverse("index") + "?" + first_page.next_querystring
+        ).context.get("page")
+        response = self.client.get(
+            reverse("index") + "?" + second_page.previous_querystring
+        )
+        self.assertListEqual(
+            list(response.context.get("page").object_list),
+            list(first_page.object_list),
+        )
+        self.assertFalse(response.context.get("page").has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(reverse("index") + "?after=broken")
+        self.assertEqual(len(response.context.get("page").object_list), 10)
+
+    def test_cursor_with_wrong_value_types_returns_first_page(self):
+        for values in ([{}, 1], [None, "x"], ["2020-01-01T00:00:00", [1]]):
+            with self.subTest(values=values):
+                cursor = CursorPaginator.encode_values(values)
+                response = self.client.get(
+                    reverse("index") + "?" + urlencode({"before": cursor})
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    len(response.context.get("page").object_list), 10
+                )
+
+
+class CountersViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username="Olga", email="olga@yatube.ru")
+        cls.author = User.objects.create(
+            username="Pavel", email="pavel@yatube.ru"
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_and_unfollow_update_counters(self):
+        url = reverse("profile_follow", kwargs={"username": "Pavel"})
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+        self.user.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.user.follows_count, 1)
+        self.assertEqual(self.author.followers_count, 1)
+
+        self.authorized_client.get(
+            reverse("profile_unfollow", kwargs={"username": "Pavel"})
+        )
+        self.user.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.user.follows_count, 0)
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_new_post_and_delete_update_posts_count(self):
+        self.authorized_client.post(
+            reverse("new_post"), {"heading": "Заголовок", "text": "Текст"}
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.posts_count, 1)
+
+        post = Post.objects.get(author=self.user)
+        self.authorized_client.get(
+            reverse("post_delete", args=[self.user.username, post.id]),
+            HTTP_REFERER=reverse("index"),
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.posts_count, 0)
+
+    def test_unfollow_with_zero_counters(self):
+        # Подписка мимо представлений: счётчики остались нулевыми.
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(
+            reverse("profile_unfollow", kwargs={"username": "Pavel"})
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.user.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.user.follows_count, 0)
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_repair_counters_fixes_drift(self):
+        Post.objects.create(author=self.author, text="Текст")
+        Follow.objects.create(user=self.user, author=self.author)
+        call_command("repair_counters", stdout=StringIO())
+        self.author.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.author.posts_count, 1)
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.user.follows_count, 1)
+
+
+class TimelineViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username="Anna", email="anna@yatube.ru")
+        cls.author = User.objects.create(
+            username="Petr", email="petr@yatube.ru"
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow_page(self):
+        response = self.authorized_client.get(reverse("follow_index"))
+        return list(response.context.get("page").object_list)
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        old_post = Post.objects.create(author=self.author, text="Старый")
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "Petr"})
+        )
+        new_post = Post.objects.create(author=self.author, text="Новый")
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2
+        )
+        self.assertListEqual(self.follow_page(), [new_post, old_post])
+
+    def test_unfollow_clears_timeline(self):
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "Petr"})
+        )
+        Post.objects.create(author=self.author, text="Текст")
+        self.authorized_client.get(
+            reverse("profile_unfollow", kwargs={"username": "Petr"})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertListEqual(self.follow_page(), [])
+
+    def test_timeline_is_capped(self):
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "Petr"})
+        )
+        with mock.patch("posts.timeline.TIMELINE_MAX_LENGTH", 3):
+            for i in range(5):
+                Post.objects.create(author=self.author, text=f"Текст {i}")
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 3
+        )
+
+    def test_popular_author_is_merged_on_read(self):
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 0):
+            self.authorized_client.get(
+                reverse("profile_follow", kwargs={"username": "Petr"})
+            )
+            post = Post.objects.create(author=self.author, text="Текст")
+            self.assertFalse(
+                TimelineEntry.objects.filter(user=self.user).exists()
+            )
+            self.assertListEqual(self.follow_page(), [post])
+
+    def test_timeline_page_is_an_index_range_scan(self):
+        paginator = TimelinePaginator(self.user)
+        self.assertIsInstance(paginator, CursorPaginator)
+        self.assertIs(paginator.object_list.model, TimelineEntry)
+        plan = (
+            paginator.object_list.order_by(*paginator.ordering)[:11]
+            .explain()
+        )
+        self.assertIn("timeline_user_pub_date", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_fanned_out_posts_survive_crossing_fanout_limit(self):
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "Petr"})
+        )
+        old_post = Post.objects.create(author=self.author, text="Старый")
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 0):
+            new_post = Post.objects.create(author=self.author, text="Новый")
+            self.assertListEqual(self.follow_page(), [new_post, old_post])
+
+    def test_cursor_walks_merged_timeline(self):
+        User = get_user_model()
+        popular = User.objects.create(username="Popular",
+                                      email="popular@yatube.ru")
+        for author in (self.author, popular):
+            self.authorized_client.get(
+                reverse("profile_follow", kwargs={"username": author.username})
+            )
+        User.objects.filter(pk=popular.pk).update(followers_count=5)
+        with mock.patch("posts.timeline.TIMELINE_FANOUT_LIMIT", 1):
+            for i in range(3):
+                Post.objects.create(author=popular, text=f"Популярный {i}")
+                Post.objects.create(author=self.author, text=f"Текст {i}")
+            self.assertEqual(
+                TimelineEntry.objects.filter(user=self.user).count(), 3
+            )
+            expected = list(Post.objects.order_by("-pub_date", "-id"))
+            paginator = TimelinePaginator(self.user, per_page=4)
+            first = paginator.page()
+            second = paginator.page(after=first.next_cursor)
+            back = paginator.page(before=second.previous_cursor)
+        self.assertListEqual(list(first) + list(second), expected)
+        self.assertFalse(second.has_next())
+        self.assertListEqual(list(back), list(first))
+
+    def test_rebuild_clears_users_without_follows(self):
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "Petr"})
+        )
+        Post.objects.create(author=self.author, text="Текст")
+        Follow.objects.filter(user=self.user).delete()
+        call_command("rebuild_timelines", stdout=StringIO())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+
+class FollowConstraintTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(username="Igor", email="igor@yatube.ru")
+        cls.author = User.objects.create(
+            username="Vera", email="vera@yatube.ru"
+        )
+
+    def test_follow_is_idempotent(self):
+        self.assertTrue(Follow.objects.follow(self.user, self.author))
+        self.assertFalse(Follow.objects.follow(self.user, self.author))
+        self.assertEqual(Follow.objects.count(), 1)
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_follow_writes_to_primary_during_replica_reads(self):
+        state = RoutingState()
+        state.use_replica = True
+        token = routing_state.set(state)
+        try:
+            self.assertEqual(router.db_for_read(Follow), "replica")
+            self.assertTrue(Follow.objects.follow(self.user, self.author))
+        finally:
+            routing_state.reset(token)
+        self.assertTrue(state.wrote)
+        self.assertTrue(Follow.objects.filter(user=self.user).exists())
+
+    def test_unfollow_is_idempotent(self):
+        Follow.objects.follow(self.user, self.author)
+        self.assertEqual(Follow.objects.unfollow(self.user, self.author), 1)
+        self.assertEqual(Follow.objects.unfollow(self.user, self.author), 0)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(
+            username="Nina", email="nina@yatube.ru"
+        )
+        cls.reader = User.objects.create(
+            username="Oleg", email="oleg@yatube.ru"
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, heading="Заголовок", text="Исходный текст"
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_edit_invalidates_card(self):
+        self.reader_client.get(reverse("index"))
+        self.author_client.post(
+            reverse("post_edit", args=[self.author.username, self.post.id]),
+            {"heading": "Заголовок", "text": "Новый текст"},
+        )
+        response = self.reader_client.get(reverse("index"))
+        self.assertContains(response, "Новый текст")
+        self.assertNotContains(response, "Исходный текст")
+
+    def test_comment_invalidates_card(self):
+        self.reader_client.get(reverse("index"))
+        self.reader_client.post(
+            reverse("add_comment", args=[self.author.username, self.post.id]),
+            {"text": "Комментарий"},
+        )
+        response = self.reader_client.get(reverse("index"))
+        self.assertContains(response, "Комментариев")
+
+    def test_owner_buttons_are_not_shared(self):
+        edit_url = reverse(
+            "post_edit", args=[self.author.username, self.post.id]
+        )
+        self.assertContains(self.author_client.get(reverse("index")),
+                            edit_url)
+        self.assertNotContains(self.reader_client.get(reverse("index")),
+                               edit_url)
+
+    def test_writes_outside_views_invalidate_card(self):
+        group = Group.objects.create(title="Старая группа", slug="cards")
+        self.post.group = group
+        self.post.save()
+        comment = Comment.objects.create(post=self.post, author=self.reader,
+                                         text="Комментарий")
+        self.assertContains(self.reader_client.get(reverse("index")),
+                            "Старая группа")
+
+        self.post.text = "Текст из админки"
+        self.post.save()
+        group.title = "Новая группа"
+        group.save()
+        response = self.reader_client.get(reverse("index"))
+        self.assertContains(response, "Текст из админки")
+        self.assertContains(response, "Новая группа")
+
+        version = Post.objects.get(pk=self.post.pk).card_version
+        comment.delete()
+        self.assertNotEqual(
+            Post.objects.get(pk=self.post.pk).card_version, version
+        )
+
+    def test_avatar_change_bumps_author_version(self):
+        version = Post.objects.get(pk=self.post.pk).card_version
+        avatar_updated.send(sender=None, user=self.author, avatar=None)
+        self.assertNotEqual(
+            Post.objects.get(pk=self.post.pk).card_version, version
+        )
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.author = User.objects.create(
+            username="Pavel", email="pavel@yatube.ru"
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, heading="Заголовок", text="Пост"
+        )
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.author, text=f"Комментарий {i}")
+            for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.url = reverse("post", args=[self.author.username, self.post.id])
+        self.more_url = reverse(
+            "post_comments", args=[self.author.username, self.post.id]
+        )
+
+    def test_first_page_rendered_once(self):
+        response = self.client.get(self.url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), 20)
+        self.assertTrue(comments.has_next())
+        newest = comments[0]
+        self.assertContains(
+            response, f'name="comment_{newest.id}"', count=1
+        )
+
+    def test_comments_are_loaded_once(self):
+        # Страница комментариев из gather_queries уходит в шаблон как есть.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        comment_queries = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith('SELECT "posts_comment"')
+        ]
+        self.assertEqual(len(comment_queries), 1)
+
+    def test_comment_authors_are_joined(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.more_url)
+            self.assertEqual(len(response.context["comments"]), 20)
+
+    def test_json_load_more(self):
+        first = self.client.get(self.more_url, {"format": "json"}).json()
+        self.assertEqual(len(first["comments"]), 20)
+        second = self.client.get(
+            self.more_url, {"format": "json", "after": first["next"]}
+        ).json()
+        self.assertEqual(len(second["comments"]), 5)
+        self.assertIsNone(second["next"])
+        ids = [item["id"] for item in first["comments"] + second["comments"]]
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_html_load_more(self):
+        page = self.client.get(self.url).context["comments"]
+        response = self.client.get(self.more_url + "?" + page.next_querystring)
+        self.assertEqual(len(response.context["comments"]), 5)
+        self.assertNotContains(response, "Показать ещё")
@@ -0,0 +1,108 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from yatube.warmup import preload, warm_templates, warm_up
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def cached_templates(extra_dirs=()):
+    engine = settings.TEMPLATES[0]
+    return [{
+        **engine,
+        'DIRS': [*engine['DIRS'], *extra_dirs],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **engine['OPTIONS'],
+            'loaders': [('django.template.loaders.cached.Loader', LOADERS)],
+        },
+    }]
+
+
+class WarmTemplatesTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, text):
+        with open(os.path.join(self.directory, name), 'w') as template:
+            template.write(text)
+
+    def cached(self):
+        loader = engines['django'].engine.template_loaders[0]
+        return loader.get_template_cache
+
+    def test_feed_templates_are_compiled(self):
+        with override_settings(TEMPLATES=cached_templates()):
+            compiled, errors = warm_templates()
+            cached = self.cached()
+        self.assertEqual(errors, [])
+        self.assertEqual(compiled, len(cached))
+        for name in ('base.html', 'nav.html', 'paginator.html',
+                     'posts/menu.html', 'posts/post_item.html',
+                     'avatar/avatar_tag.html'):
+            self.assertIn(name, cached)
+        # Шаблоны самой админки не прогреваются.
+        self.assertNotIn('admin/base.html', cached)
+
+    def test_warm_render_does_not_read_files(self):
+        with override_settings(TEMPLATES=cached_templates()):
+            warm_templates()
+            with mock.patch(
+                'django.template.loaders.filesystem.Loader.get_contents',
+                side_effect=AssertionError('шаблон читается с диска'),
+            ):
+                engines['django'].get_template('nav.html')
+                engines['django'].get_template('posts/post_item.html')
+
+    def test_broken_template_is_reported(self):
+        self.write('broken.html', '{% if %}')
+        self.write('fine.html', 'ok')
+        with override_settings(TEMPLATES=cached_templates([self.directory])):
+            with self.assertLogs('yatube.warmup', 'WARNING'):
+                compiled, errors = warm_templates()
+            cached = self.cached()
+        self.assertEqual([name for name, _ in errors], ['broken.html'])
+        self.assertIn('fine.html', cached)
+
+    def test_warm_up_follows_setting(self):
+        with mock.patch('yatube.warmup.warm_templates') as warm:
+            with override_settings(TEMPLATE_WARMUP=False):
+                warm_up()
+            warm.assert_not_called()
+            with override_settings(TEMPLATE_WARMUP=True):
+                warm_up()
+            warm.assert_called_once_with()
+
+    def test_warm_up_preloads_when_enabled(self):
+        with mock.patch('yatube.warmup.preload') as preload_mock, \
+                mock.patch('yatube.warmup.warm_templates') as warm:
+            with override_settings(PRELOAD=True, TEMPLATE_WARMUP=True):
+                warm_up()
+        preload_mock.assert_called_once_with()
+        warm.assert_not_called()
+
+
+class PreloadTest(SimpleTestCase):
+    @mock.patch('yatube.warmup.connections')
+    @mock.patch('yatube.warmup.gc')
+    def test_preload_loads_everything_before_fork(self, gc, connections):
+        with override_settings(TEMPLATES=cached_templates()):
+            preload()
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertIn('posts/post_item.html', loader.get_template_cache)
+        self.assertIn('posts.views', sys.modules)
+        self.assertIn('sorl.thumbnail.engines.pil_engine', sys.modules)
+        self.assertIn('PIL.JpegImagePlugin', sys.modules)
+        connections.close_all.assert_called_once_with()
+        gc.freeze.assert_called_once_with()
@@ -0,0 +1,108 @@
+"""
+Фоновая нарезка миниатюр для картинок постов.
+
+Раньше ``{% thumbnail %}`` в карточке поста резал картинку прямо в
+запросе, который первым её показал. Теперь загрузка через ``PostForm``
+ставит нарезку в локальный пул потоков, а шаблон до готовности миниатюры
+показывает исходную картинку. Имя готовой миниатюры воркер кладёт в
+кэш: по нему карточка и узнаёт, что миниатюра нарезана.
+"""
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .cards import bump_post
+
+logger = logging.getLogger(__name__)
+
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WORKERS = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+THUMBNAIL_KEY = 'thumbnail:{}'
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _thumbnail_key(image_name):
+    source = f'{POST_THUMBNAIL_GEOMETRY}:{image_name}'.encode()
+    return THUMBNAIL_KEY.format(hashlib.md5(source).hexdigest())
+
+
+def ready_thumbnail(image):
+    """Готовая миниатюра картинки поста или ``None``, ничего не нарезая."""
+    name = cache.get(_thumbnail_key(getattr(image, 'name', image)))
+    if name is None:
+        return None
+    return ImageFile(name, default.storage)
+
+
+def cut_thumbnail(image_name):
+    """Нарезает миниатюру; возвращает её имя или ``None`` при ошибке."""
+    try:
+        thumbnail = get_thumbnail(image_name, POST_THUMBNAIL_GEOMETRY,
+                                  **POST_THUMBNAIL_OPTIONS)
+    except Exception:
+        logger.exception('Не удалось нарезать миниатюру %s', image_name)
+        return None
+    return thumbnail.name
+
+
+def remember_thumbnail(image_name, thumbnail_name, post_id=None):
+    """Отмечает миниатюру готовой и сбрасывает карточку поста."""
+    cache.set(_thumbnail_key(image_name), thumbnail_name, timeout=None)
+    if post_id is not None:
+        bump_post(post_id)
+
+
+def generate_thumbnail(image_name, post_id=None):
+    thumbnail_name = cut_thumbnail(image_name)
+    if thumbnail_name is None:
+        return False
+    remember_thumbnail(image_name, thumbnail_name, post_id)
+    return True
+
+
+def _generate_in_worker(image_name, post_id):
+    close_old_connections()
+    try:
+        return generate_thumbnail(image_name, post_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(image_name)
+        connections.close_all()
+
+
+def submit_thumbnail(image_name, post_id=None):
+    """Отдаёт нарезку в пул, если эта картинка ещё не в очереди."""
+    with _pending_lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    get_executor().submit(_generate_in_worker, image_name, post_id)
+
+
+def queue_thumbnail(post):
+    """Ставит нарезку миниатюры в пул после коммита транзакции."""
+    if not post.image:
+        return
+    image_name, post_id = post.image.name, post.pk
+    transaction.on_commit(lambda: submit_thumbnail(image_name, post_id))
@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.db import connection
+
+from users.models import CustomUser
+
+from .feeds import (POSTS_PER_PAGE, build_feed, comment_count_subquery,
+                    prepare_cards)
+from .models import Follow, Post, TimelineEntry
+from .paginators import CursorPage, CursorPaginator
+
+# Сколько записей хранить в ленте подписок одного пользователя.
+TIMELINE_MAX_LENGTH = getattr(settings, 'TIMELINE_MAX_LENGTH', 800)
+# Посты авторов с большим числом подписчиков не раскладываются по лентам,
+# а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 10000)
+FANOUT_BATCH_SIZE = 500
+
+
+def trim_timelines(user_ids):
+    """Обрезает ленты пользователей до ``TIMELINE_MAX_LENGTH`` записей."""
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    sql = (
+        f'DELETE FROM {table} WHERE id IN ('
+        f'SELECT id FROM ('
+        f'SELECT id, ROW_NUMBER() OVER ('
+        f'PARTITION BY user_id ORDER BY pub_date DESC, post_id DESC'
+        f') AS position FROM {table} WHERE user_id IN ({placeholders})'
+        f') AS ranked WHERE position > %s)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*user_ids, TIMELINE_MAX_LENGTH])
+
+
+def is_fanout_author(author_id):
+    followers_count = (
+        CustomUser.objects.filter(pk=author_id)
+        .values_list('followers_count', flat=True)
+        .first()
+    )
+    return (followers_count or 0) <= TIMELINE_FANOUT_LIMIT
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    for start in range(0, len(follower_ids), FANOUT_BATCH_SIZE):
+        batch = follower_ids[start:start + FANOUT_BATCH_SIZE]
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+             for user_id in batch],
+            ignore_conflicts=True,
+        )
+        trim_timelines(batch)
+
+
+def backfill_timeline(user, author):
+    """Добавляет в ленту подписчика последние посты нового автора."""
+    if not is_fanout_author(author.pk):
+        return
+    posts = (
+        Post.objects.filter(author=author)
+        .values_list('pk', 'pub_date')[:TIMELINE_MAX_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True,
+    )
+    trim_timelines([user.pk])
+
+
+def remove_from_timeline(user, author):
+    TimelineEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild_timeline(user):
+    TimelineEntry.objects.filter(user=user).delete()
+    authors = CustomUser.objects.filter(
+        following__user=user, followers_count__lte=TIMELINE_FANOUT_LIMIT
+    )
+    posts = (
+        Post.objects.filter(author__in=authors)
+        .values_list('pk', 'pub_date')[:TIMELINE_MAX_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user=user, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        batch_size=FANOUT_BATCH_SIZE,
+    )
+
+
+class TimelinePaginator(CursorPaginator):
+    """
+    Лента подписок: страница материализованной ленты читается одним
+    проходом по индексу ``(user, -pub_date, -post)`` с курсором по
+    ``(pub_date, post)`` записи, а посты авторов, которых не раскладывают,
+    подмешиваются в том же порядке. Курсор общий: у записи и у поста
+    это одни и те же значения ``(pub_date, id поста)``, а на странице
+    лежат посты, как у обычного ``CursorPaginator``.
+    """
+
+    def __init__(self, user, per_page=POSTS_PER_PAGE):
+        super().__init__(
+            TimelineEntry.objects.filter(user=user)
+            .select_related('post__author', 'post__group')
+            .annotate(comment_count=comment_count_subquery('post')),
+            per_page, ordering=('-pub_date', '-post_id'),
+        )
+        pulled_authors = list(
+            Follow.objects.filter(
+                user=user, author__followers_count__gt=TIMELINE_FANOUT_LIMIT
+            ).values_list('author_id', flat=True)
+        )
+        self.pulled = None
+        if pulled_authors:
+            # Посты, разложенные до того, как автор перешёл порог, есть и
+            # в ленте, и здесь; дубли убираются при слиянии.
+            self.pulled = CursorPaginator(
+                build_feed(Post.objects.filter(author_id__in=pulled_authors)),
+                per_page,
+            )
+
+    @staticmethod
+    def _entry_post(entry):
+        post = entry.post
+        post.comment_count = entry.comment_count
+        return post
+
+    def encode_cursor(self, post):
+        return self.encode_values([
+            Post._meta.get_field('pub_date').value_to_string(post),
+            str(post.pk),
+        ])
+
+    def page(self, after=None, before=None, params=None):
+        params = params if params is not None else {}
+        forward = not before
+        cursor = before or after
+        values = self.decode_cursor(cursor) if cursor else None
+        posts = {}
+        for entry in self.rows(values, forward):
+            posts[entry.post_id] = self._entry_post(entry)
+        if self.pulled is not None:
+            for post in self.pulled.rows(values, forward):
+                posts.setdefault(post.pk, post)
+        rows = sorted(posts.values(), reverse=forward,
+                      key=lambda post: (post.pub_date, post.pk))
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forward:
+            has_next, has_previous = more, bool(after)
+        else:
+            rows.reverse()
+            has_next, has_previous = True, more
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0])
+        return CursorPage(rows, self, params, next_cursor, previous_cursor)
+
+
+def timeline_page(request, per_page=POSTS_PER_PAGE):
+    """Страница ленты подписок ``request.user`` для ``post_item.html``."""
+    paginator = TimelinePaginator(request.user, per_page)
+    page = paginator.get_page(request.GET)
+    prepare_cards(page.object_list)
+    return paginator, page
@@ -0,0 +1,291 @@
+"""
+Потоковые выгрузка и загрузка контента: пользователи, группы, посты,
+комментарии и подписки в JSON Lines или CSV.
+
+Выгрузка читает таблицу через ``iterator(chunk_size=...)`` (на
+PostgreSQL это серверный курсор, на SQLite — выборка частями) и сразу
+пишет строки в ``<каталог>/<таблица>.<формат>``, поэтому память не
+зависит от размера таблицы.
+
+Загрузка читает файл построчно, проверяет строку ``clean_fields``
+модели и пишет пачками по ``batch_size`` строк, каждую пачку в своей
+транзакции. Чтобы не пересечься с тем, что уже лежит в базе, id
+пересчитываются (см. ``Remap``): пользователь с тем же именем и группа с
+тем же slug считаются уже существующими (в том числе если они встретились
+раньше в том же файле), остальные строки получают id со сдвигом. Строки,
+не прошедшие проверку или ссылающиеся на пропущенные, не загружаются.
+
+Таблицы грузятся стадиями (``STAGES``): внутри стадии они друг от друга
+не зависят, и каждую может грузить свой процесс.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from users.models import CustomUser
+
+from .models import Comment, Follow, Group, Post
+from .synthetic import (COMMENT_COLUMNS, FOLLOW_COLUMNS, GROUP_COLUMNS,
+                        POST_COLUMNS, USER_COLUMNS, DatabaseWriter, next_id)
+
+FORMATS = ('jsonl', 'csv')
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 1000
+# Сколько ошибок проверки показывать по каждой таблице.
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass(frozen=True)
+class Table:
+    name: str
+    model: type
+    columns: tuple
+    # Колонка внешнего ключа -> имя таблицы, на которую она ссылается.
+    references: dict = field(default_factory=dict)
+    # Строка с тем же значением уже есть в базе — это та же строка.
+    natural_key: str = None
+    # Строка с тем же значением уже есть в базе — это ошибка.
+    unique: tuple = ()
+    ignore_conflicts: bool = False
+
+    @property
+    def has_ids(self):
+        return 'id' in self.columns
+
+
+TABLES = {table.name: table for table in (
+    Table('users', CustomUser, USER_COLUMNS,
+          natural_key='username', unique=('email',)),
+    Table('groups', Group, GROUP_COLUMNS, natural_key='slug'),
+    Table('posts', Post, POST_COLUMNS,
+          references={'author_id': 'users', 'group_id': 'groups'}),
+    Table('comments', Comment, COMMENT_COLUMNS,
+          references={'post_id': 'posts', 'author_id': 'users'}),
+    Table('follows', Follow, FOLLOW_COLUMNS,
+          references={'user_id': 'users', 'author_id': 'users'},
+          ignore_conflicts=True),
+)}
+# Таблицы стадии ссылаются только на таблицы предыдущих стадий.
+STAGES = (('users', 'groups'), ('posts',), ('comments', 'follows'))
+
+
+def table_path(directory, name, fmt):
+    return os.path.join(directory, f'{name}.{fmt}')
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_table(name, directory, fmt, using='default',
+                 chunk_size=EXPORT_CHUNK_SIZE):
+    """Выгружает таблицу в файл; возвращает число строк."""
+    table = TABLES[name]
+    rows = (
+        table.model.objects.using(using).order_by('pk')
+        .values_list(*table.columns).iterator(chunk_size=chunk_size)
+    )
+    count = 0
+    path = table_path(directory, name, fmt)
+    with open(path, 'w', newline='', encoding='utf-8') as stream:
+        if fmt == 'csv':
+            writer = csv.writer(stream)
+            writer.writerow(table.columns)
+            for row in rows:
+                writer.writerow(_plain(value) for value in row)
+                count += 1
+        else:
+            for row in rows:
+                stream.write(json.dumps(
+                    dict(zip(table.columns, map(_plain, row))),
+                    ensure_ascii=False,
+                ))
+                stream.write('\n')
+                count += 1
+    return count
+
+
+def read_records(path, fmt):
+    """Строки файла словарями ``колонка -> значение`` с номером строки."""
+    with open(path, newline='', encoding='utf-8') as stream:
+        if fmt == 'csv':
+            # Номер 1 — заголовок.
+            yield from enumerate(csv.DictReader(stream), start=2)
+        else:
+            for line, text in enumerate(stream, start=1):
+                if text.strip():
+                    yield line, json.loads(text)
+
+
+class Remap:
+    """
+    Старые id таблицы -> новые. По умолчанию строка получает
+    ``id + offset``; совпавшая по естественному ключу — id уже
+    существующей строки. Ссылка на пропущенную строку — ``LookupError``.
+    """
+
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.existing = {}
+        self.skipped = set()
+
+    def __call__(self, old_id):
+        if old_id in (None, ''):
+            return None
+        old_id = int(old_id)
+        if old_id in self.skipped:
+            raise LookupError(old_id)
+        return self.existing.get(old_id, old_id + self.offset)
+
+
+def make_remaps(using='default'):
+    return {
+        name: Remap(next_id(table.model, using) - 1)
+        for name, table in TABLES.items() if table.has_ids
+    }
+
+
+class TableImport:
+    """Загрузка одной таблицы из файла."""
+
+    def __init__(self, name, remaps, using='default',
+                 batch_size=IMPORT_BATCH_SIZE):
+        self.table = TABLES[name]
+        self.remaps = remaps
+        self.remap = remaps.get(name)
+        self.using = using
+        self.batch_size = batch_size
+        self.writer = DatabaseWriter(using, batch_size)
+        self.model = self.table.model
+        # Внешние ключи проверяются через Remap, а не запросом на строку.
+        self.exclude = [
+            self.model._meta.get_field(column).name
+            for column in self.table.references
+        ]
+        self.fields = [self.model._meta.get_field(column)
+                       for column in self.table.columns]
+        self.nullable = {
+            column for column, model_field in zip(self.table.columns,
+                                                   self.fields)
+            if model_field.null
+        }
+        self.imported = self.merged = self.invalid = 0
+        self.errors = []
+
+    def run(self, path, fmt):
+        records = read_records(path, fmt)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self.load_batch(batch, fmt)
+        self.reset_sequence()
+        return self
+
+    def existing(self, column, batch):
+        values = {record.get(column) for _, record in batch}
+        return dict(
+            self.model.objects.using(self.using)
+            .filter(**{f'{column}__in': values})
+            .values_list(column, 'pk')
+        )
+
+    def load_batch(self, batch, fmt):
+        table = self.table
+        known = {}
+        if table.natural_key:
+            known = self.existing(table.natural_key, batch)
+        taken = {column: self.existing(column, batch)
+                 for column in table.unique}
+        rows = []
+        for line, record in batch:
+            try:
+                key = record.get(table.natural_key)
+                if key in known:
+                    self.remap.existing[int(record['id'])] = known[key]
+                    self.merged += 1
+                    continue
+                for column, values in taken.items():
+                    if record.get(column) in values:
+                        raise ValidationError(
+                            {column: 'Такое значение уже есть в базе.'}
+                        )
+                rows.append(self.prepare(record, fmt))
+                # Повтор в той же пачке — та же строка или конфликт.
+                if table.natural_key:
+                    known[key] = self.remap(record['id'])
+                for column, values in taken.items():
+                    values[record.get(column)] = None
+            except (ValidationError, LookupError, ValueError,
+                    TypeError) as exc:
+                self.reject(line, record, exc)
+        if rows:
+            with transaction.atomic(using=self.using):
+                self.imported += self.writer.write(
+                    self.model, table.columns, rows,
+                    ignore_conflicts=table.ignore_conflicts,
+                )
+
+    def prepare(self, record, fmt):
+        values = {}
+        for column in self.table.columns:
+            value = record[column]
+            if fmt == 'csv' and value == '' and column in self.nullable:
+                value = None
+            if column == 'id':
+                value = self.remap(value)
+            elif column in self.table.references:
+                value = self.remaps[self.table.references[column]](value)
+            values[column] = value
+        instance = self.model(**values)
+        instance.clean_fields(exclude=self.exclude)
+        return tuple(
+            model_field.get_prep_value(getattr(instance, column))
+            for column, model_field in zip(self.table.columns, self.fields)
+        )
+
+    def reject(self, line, record, exc):
+        self.invalid += 1
+        if self.remap is not None and record.get('id') not in (None, ''):
+            try:
+                self.remap.skipped.add(int(record['id']))
+            except ValueError:
+                pass
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            if isinstance(exc, LookupError):
+                exc = f'ссылка на пропущенную строку {exc.args[0]}'
+            self.errors.append(f'{self.table.name}:{line}: {exc}')
+
+    def reset_sequence(self):
+        """Явные id сдвигают счётчик последовательности (PostgreSQL)."""
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(),
+                                                       [self.model])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def import_table(name, path, fmt, remaps, using='default',
+                 batch_size=IMPORT_BATCH_SIZE):
+    """
+    Загружает таблицу из файла. Возвращает счётчики, ошибки и
+    ``Remap`` таблицы — по нему следующие стадии пересчитывают ссылки.
+    """
+    loader = TableImport(name, remaps, using, batch_size).run(path, fmt)
+    return {
+        'name': name,
+        'imported': loader.imported,
+        'merged': loader.merged,
+        'invalid': loader.invalid,
+        'errors': loader.errors,
+        'remap': loader.remap,
+    }
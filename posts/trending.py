@@ -0,0 +1,161 @@
+"""
+Популярные посты и группы.
+
+Каждое событие (новый пост, комментарий, подписка на автора) добавляет
+посту и его группе вес, который затухает вдвое за
+``TRENDING_HALF_LIFE_HOURS``. Сумма затухающих весов в момент ``t``
+равна ``exp(-λt) · Σ wᵢ·exp(λtᵢ)``: общий множитель одинаков для всех
+строк, поэтому порядок задаёт одна величина
+``score = ln Σ wᵢ·exp(λtᵢ)``. Она не меняется со временем, хранится в
+``TrendingScore`` с индексом ``(kind, -score)`` и обновляется одним
+UPSERT на событие (строки поста и группы в одном запросе):
+``score = logaddexp(score, ln w + λt)``.
+
+Команда ``recompute_trending`` периодически пересобирает таблицу из
+постов и комментариев за последние ``TRENDING_WINDOW_DAYS`` и выкидывает
+остывшие строки. Подписки не хранят даты, поэтому их вклад живёт только
+до очередного пересчёта.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .feeds import build_feed, prepare_cards
+from .models import Comment, Group, Post, TrendingScore
+
+HALF_LIFE = getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24) * 3600
+DECAY = math.log(2) / HALF_LIFE
+WINDOW_DAYS = getattr(settings, 'TRENDING_WINDOW_DAYS', 7)
+TRENDING_POSTS = 20
+
+POST_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+FOLLOW_WEIGHT = 0.5
+
+
+def event_score(weight, moment):
+    return math.log(weight) + DECAY * moment.timestamp()
+
+
+def _logaddexp_sql(table):
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    return (
+        f'{greatest}({table}.score, excluded.score) + '
+        f'LN(1 + EXP(-ABS({table}.score - excluded.score)))'
+    )
+
+
+def add_activity(weight, post_id, group_id=None, moment=None):
+    """Одним UPSERT добавляет вес событию поста и его группы."""
+    value = event_score(weight, moment or timezone.now())
+    rows = [(TrendingScore.POST, post_id, value)]
+    if group_id is not None:
+        rows.append((TrendingScore.GROUP, group_id, value))
+    table = connection.ops.quote_name(TrendingScore._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} (kind, object_id, score) VALUES '
+        + ', '.join(['(%s, %s, %s)'] * len(rows))
+        + f' ON CONFLICT (kind, object_id) DO UPDATE '
+        f'SET score = {_logaddexp_sql(table)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [param for row in rows for param in row])
+
+
+def record_post(post):
+    add_activity(POST_WEIGHT, post.pk, post.group_id, post.pub_date)
+
+
+def record_comment(comment):
+    if Comment.post.is_cached(comment):
+        group_id = comment.post.group_id
+    else:
+        group_id = Post.objects.filter(pk=comment.post_id).values_list(
+            'group_id', flat=True
+        ).first()
+    add_activity(COMMENT_WEIGHT, comment.post_id, group_id, comment.created)
+
+
+def record_follow(author):
+    """Подписка поднимает свежий пост автора и его группу."""
+    latest = Post.objects.filter(author=author).order_by(
+        '-pub_date'
+    ).values_list('pk', 'group_id').first()
+    if latest is not None:
+        add_activity(FOLLOW_WEIGHT, *latest)
+
+
+def _logsumexp(values):
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def recompute_trending(days=WINDOW_DAYS, batch_size=500):
+    """Пересобирает таблицу из постов и комментариев за ``days`` дней."""
+    since = timezone.now() - timedelta(days=days)
+    events = {TrendingScore.POST: defaultdict(list),
+              TrendingScore.GROUP: defaultdict(list)}
+
+    def collect(post_id, group_id, weight, moment):
+        value = event_score(weight, moment)
+        events[TrendingScore.POST][post_id].append(value)
+        if group_id is not None:
+            events[TrendingScore.GROUP][group_id].append(value)
+
+    posts = Post.objects.filter(pub_date__gte=since).values_list(
+        'pk', 'group_id', 'pub_date'
+    )
+    for post_id, group_id, moment in posts.iterator():
+        collect(post_id, group_id, POST_WEIGHT, moment)
+    comments = Comment.objects.filter(created__gte=since).values_list(
+        'post_id', 'post__group_id', 'created'
+    )
+    for post_id, group_id, moment in comments.iterator():
+        collect(post_id, group_id, COMMENT_WEIGHT, moment)
+    rows = [
+        TrendingScore(kind=kind, object_id=object_id,
+                      score=_logsumexp(values))
+        for kind, scores in events.items()
+        for object_id, values in scores.items()
+    ]
+    with transaction.atomic():
+        TrendingScore.objects.all().delete()
+        TrendingScore.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def _top_ids(kind, limit):
+    return list(
+        TrendingScore.objects.filter(kind=kind).order_by('-score')
+        .values_list('object_id', flat=True)[:limit]
+    )
+
+
+def trending_posts(limit=TRENDING_POSTS):
+    """Самые активные посты, уже подготовленные для ``post_item.html``."""
+    ids = _top_ids(TrendingScore.POST, limit)
+    posts = {post.pk: post
+             for post in build_feed(Post.objects.filter(pk__in=ids))}
+    posts = [posts[post_id] for post_id in ids if post_id in posts]
+    prepare_cards(posts)
+    return posts
+
+
+def trending_groups(limit):
+    """
+    Группы по убыванию активности; если активных меньше ``limit``,
+    остаток добирается остальными группами по названию.
+    """
+    ids = _top_ids(TrendingScore.GROUP, limit)
+    active = Group.objects.in_bulk(ids)
+    groups = [active[group_id] for group_id in ids if group_id in active]
+    if len(groups) < limit:
+        groups += list(
+            Group.objects.exclude(pk__in=[group.pk for group in groups])
+            .order_by('title')[:limit - len(groups)]
+        )
+    return groups
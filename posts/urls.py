@@ -11,6 +11,8 @@ urlpatterns = [
     path('500/', views.server_error, name='500'),
     path('404/', views.page_not_found, name='404'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path(
@@ -23,6 +25,11 @@ urlpatterns = [
         views.post_delete,
         name='post_delete'
         ),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+        ),
     path(
         '<username>/<int:post_id>/comment/',
         views.add_comment,
@@ -1,20 +1,37 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from .concurrency import atomic_write, gather_queries, runs_under_asgi
+from .feeds import build_feed, comment_page, paginate_feed
 from .forms import CommentForm, PostForm, GroupForm
 from .models import Follow, Group, Post
-from users.models import CustomUser
+from .pagecache import anonymous_page_cache, bump_pages
+from .recommendations import (apply_follow, apply_unfollow,
+                              recommended_authors)
+from .search import search_feed
+from .thumbnails import queue_thumbnail
+from .timeline import backfill_timeline, remove_from_timeline, timeline_page
+from .trending import record_follow, trending_groups, trending_posts
+from users.models import CustomUser, change_counters
 
 
+@anonymous_page_cache
 def index(request):
-    post_list = Post.objects.select_related('group')
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.all()
+    paginator, page = paginate_feed(request, post_list)
     context = {'page': page, 'paginator': paginator, 'post_list': post_list,}
     return render(request, 'posts/index.html', context)
 
 
+@anonymous_page_cache
+def trending(request):
+    context = {'posts': trending_posts()}
+    return render(request, 'posts/trending.html', context)
+
+
 @login_required
 def new_group(request):
     if request.method == 'POST':
@@ -29,8 +46,9 @@ def new_group(request):
     return render(request, 'posts/new_group.html', {'form': form})
 
 
+@anonymous_page_cache
 def groups(request):
-    groups = Group.objects.all()[:11]
+    groups = trending_groups(11)
     paginator = Paginator(groups, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
@@ -38,62 +56,111 @@ def groups(request):
                'paginator': paginator,}
     return render(request, 'posts/groups.html', context)
 
+
+@anonymous_page_cache
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = group.group_posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    paginator, page = paginate_feed(request, posts)
     context = {'group': group, 'page': page,
                'paginator': paginator, 'posts': posts}
     return render(request, 'posts/group.html', context)
 
 
-def profile(request, username):
-    author = get_object_or_404(CustomUser, username=username)
-    post_list = author.author_posts.all()
-    post_count = post_list.count()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    followers_count = author.following.count()
-    follows_count = author.follower.count()
-    following = (
-        request.user.is_authenticated and
-        author.following.filter(user=request.user, author=author).exists()
+@anonymous_page_cache
+async def profile(request, username):
+    post_list = Post.objects.filter(author__username=username)
+
+    def load_following():
+        user = request.user
+        return user.is_authenticated and Follow.objects.filter(
+            user=user, author__username=username
+        ).exists()
+
+    author, (paginator, page), following, recommended = await gather_queries(
+        lambda: get_object_or_404(CustomUser, username=username),
+        lambda: paginate_feed(request, post_list),
+        load_following,
+        lambda: recommended_authors(request.user, exclude=username),
+        parallel=runs_under_asgi(request),
     )
     context = {
         'page': page,
         'profile': author,
-        'followers_count': followers_count,
-        'follows_count': follows_count,
-        'post_count': post_count,
+        'followers_count': author.followers_count,
+        'follows_count': author.follows_count,
+        'post_count': author.posts_count,
         'post_list': post_list,
         'following': following,
         'paginator': paginator,
+        'recommended': recommended,
     }
-    return render(request, 'posts/profile.html', context)
+    return await sync_to_async(render)(request, 'posts/profile.html', context)
 
 
-def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    post_list = post.author.author_posts.all()
-    post_count = post_list.count()
-    comments = post.comments.all()
+@anonymous_page_cache
+async def post_view(request, username, post_id):
+    # Страница комментариев и request.user загружаются заранее, чтобы
+    # шаблон не ходил за ними в БД при отрисовке.
+    post, comments, _ = await gather_queries(
+        lambda: get_object_or_404(
+            build_feed(), author__username=username, id=post_id
+        ),
+        lambda: comment_page(post_id, request.GET),
+        lambda: request.user.is_authenticated,
+        parallel=runs_under_asgi(request),
+    )
     form = CommentForm()
-    followers_count = post.author.following.count()
-    follows_count = post.author.follower.count()
     context = {
         'author': post.author,
         'post': post,
         'profile': post.author,
-        'post_count': post_count,
+        'post_count': post.author.posts_count,
         'comments': comments,
-        'followers_count': followers_count,
-        'follows_count': follows_count,
+        'followers_count': post.author.followers_count,
+        'follows_count': post.author.follows_count,
         'form': form,
     }
-    return render(request, 'posts/post.html', context)
+    return await sync_to_async(render)(request, 'posts/post.html', context)
+
+
+def post_comments(request, username, post_id):
+    """
+    Следующая страница комментариев для кнопки «Показать ещё»:
+    HTML-фрагмент или JSON при ``?format=json``.
+    """
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             author__username=username, id=post_id)
+    comments = comment_page(post.pk, request.GET)
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/comment_list.html',
+                      {'post': post, 'comments': comments})
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': comments.next_cursor,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator, page = search_feed(request, query)
+    context = {'query': query, 'page': page, 'paginator': paginator}
+    return render(request, 'posts/search.html', context)
+
+
+@atomic_write
+def _save_new_post(form, post):
+    form.save()
+    change_counters(post.author_id, posts_count=1)
+    queue_thumbnail(post)
 
 
 @login_required
@@ -103,7 +170,7 @@ def new_post(request):
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
-            form.save()
+            _save_new_post(form, post)
             return redirect('index')
         return render(request, 'posts/post_edit.html', {'form': form})
     form = PostForm()
@@ -120,6 +187,8 @@ def post_edit(request, username, post_id):
 
     if request.method == 'POST' and form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            queue_thumbnail(post)
         return redirect('post', username=request.user.username,
                         post_id=post_id)
     return render(
@@ -133,7 +202,9 @@ def post_delete(request, username, post_id):
     post = get_object_or_404(Post, pk=post_id, author__username=username)
     if request.user != post.author:
         return redirect('post', username=username, post_id=post_id)
-    post.delete()
+    with transaction.atomic():
+        post.delete()
+        change_counters(post.author_id, posts_count=-1)
     return redirect(request.META.get('HTTP_REFERER'))
 
 
@@ -146,34 +217,46 @@ def add_comment(request, username, post_id):
     comment = form.save(commit=False)
     comment.author = request.user
     comment.post = post
-    form.save()
+    atomic_write(form.save)()
     return redirect('post', username=username, post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.select_related('group').filter(
-        author__following__user=request.user
-    )
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'posts/follow.html', {'page': page,
-                                                 'paginator': paginator})
+    paginator, page = timeline_page(request)
+    return render(request, 'posts/follow.html', {
+        'page': page,
+        'paginator': paginator,
+        'recommended': recommended_authors(request.user),
+    })
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(CustomUser, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        with transaction.atomic():
+            if Follow.objects.follow(request.user, author):
+                change_counters(request.user.pk, follows_count=1)
+                change_counters(author.pk, followers_count=1)
+                backfill_timeline(request.user, author)
+                record_follow(author)
+                apply_follow(request.user, author)
+        bump_pages()
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(CustomUser, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    with transaction.atomic():
+        deleted = Follow.objects.unfollow(request.user, author)
+        if deleted:
+            change_counters(request.user.pk, follows_count=-deleted)
+            change_counters(author.pk, followers_count=-deleted)
+            remove_from_timeline(request.user, author)
+            apply_unfollow(request.user, author)
+    bump_pages()
     return redirect('profile', username=username)
 
 
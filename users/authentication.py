@@ -1,14 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+
 from .models import CustomUser
 
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix='rehash')
+    return _executor
+
+
+def rehash_password(user_id, raw_password, old_encoded):
+    """
+    Перехеширует пароль текущим хешером. Обновление условное: если
+    пароль успели сменить, новый хеш старого пароля не запишется.
+    """
+    CustomUser.objects.filter(pk=user_id, password=old_encoded).update(
+        password=make_password(raw_password)
+    )
+
+
+def _rehash_in_worker(user_id, raw_password, old_encoded):
+    close_old_connections()
+    try:
+        rehash_password(user_id, raw_password, old_encoded)
+    finally:
+        connection.close()
+
+
+def schedule_rehash(user, raw_password):
+    """
+    Отдаёт перехеширование устаревшего хеша в фоновый поток, чтобы вход
+    не платил за второй расчёт хеша. Внутри транзакции (например, в
+    ``TestCase``) другое соединение не увидит пользователя, поэтому
+    там хеш обновляется сразу.
+    """
+    if connection.in_atomic_block:
+        rehash_password(user.pk, raw_password, user.password)
+        return
+    get_executor().submit(_rehash_in_worker, user.pk, raw_password,
+                          user.password)
+
 
 class CustomBackend(ModelBackend):
-	def authenticate(self, request, username=None, password=None, **kwargs):
-		try:
-			user = CustomUser.objects.get(email=username)
-		except CustomUser.DoesNotExist:
-			return None
-		else:
-			if user.check_password(password) and self.user_can_authenticate(user):
-				return user
-		return None
+    """
+    Вход по имени пользователя или email одним запросом по индексам
+    ``LOWER(username)`` и ``LOWER(email)``, без учёта регистра.
+
+    Если пользователь не найден, пароль всё равно хешируется, чтобы по
+    времени ответа нельзя было понять, существует ли логин.
+    """
+
+    def get_candidates(self, login):
+        value = login.strip().lower()
+        return list(
+            CustomUser.objects.alias(
+                username_lower=Lower('username'), email_lower=Lower('email'),
+            ).filter(
+                Q(username_lower=value) | Q(email_lower=value)
+            )[:3]
+        )
+
+    def pick_user(self, login, candidates):
+        """
+        Точное совпадение имени важнее совпадения email; из нескольких
+        совпадений без учёта регистра выбрать нельзя.
+        """
+        for user in candidates:
+            if user.username == login:
+                return user
+        if len(candidates) == 1:
+            return candidates[0]
+        return None
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(CustomUser.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        user = self.pick_user(username.strip(),
+                              self.get_candidates(username))
+        if user is None:
+            # Как ModelBackend: один расчёт хеша, как и при входе.
+            CustomUser().set_password(password)
+            return None
+        valid = check_password(
+            password, user.password,
+            setter=lambda raw: schedule_rehash(user, raw),
+        )
+        if valid and self.user_can_authenticate(user):
+            return user
+        return None
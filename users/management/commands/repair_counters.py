@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Follow, Post
+from users.models import CustomUser
+
+BATCH_SIZE = 500
+
+
+def count_subquery(queryset, field):
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает posts_count, followers_count и follows_count '
+        'пользователей и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько пользователей с расхождениями.',
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Алиас базы, в которой чинить счётчики.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        actual = {
+            'posts_count': count_subquery(Post.objects.all(), 'author'),
+            'followers_count': count_subquery(Follow.objects.all(), 'author'),
+            'follows_count': count_subquery(Follow.objects.all(), 'user'),
+        }
+        drift = Q()
+        for field in actual:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        with transaction.atomic(using=using):
+            broken = CustomUser.objects.using(using).annotate(
+                **{f'actual_{field}': value for field, value in actual.items()}
+            ).filter(drift)
+            broken_ids = list(broken.values_list('pk', flat=True))
+            if not options['dry_run']:
+                for start in range(0, len(broken_ids), BATCH_SIZE):
+                    batch = broken_ids[start:start + BATCH_SIZE]
+                    CustomUser.objects.using(using).filter(
+                        pk__in=batch
+                    ).update(**actual)
+        self.stdout.write(
+            f'Пользователей с расхождениями: {len(broken_ids)}'
+            + (' (не исправлено)' if options['dry_run'] else '')
+        )
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest, Lower
 
 
 class CustomUserRole(models.TextChoices):
@@ -18,6 +20,17 @@ class CustomUser(AbstractUser):
         max_length=255, unique=True,
         blank=False, null=False
     )
+    posts_count = models.PositiveIntegerField("Количество записей", default=0)
+    followers_count = models.PositiveIntegerField("Подписчиков", default=0)
+    follows_count = models.PositiveIntegerField("Подписок", default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Вход по логину или email без учёта регистра
+            # (users.authentication.CustomBackend).
+            models.Index(Lower('username'), name='user_username_lower'),
+            models.Index(Lower('email'), name='user_email_lower'),
+        ]
 
     @property
     def is_admin(self):
@@ -25,4 +38,18 @@ class CustomUser(AbstractUser):
 
     @property
     def is_moderator(self):
-        return self.role == CustomUserRole.moderator
\ No newline at end of file
+        return self.role == CustomUserRole.moderator
+
+
+def change_counters(user_id, **deltas):
+    """
+    Атомарно сдвигает счётчики пользователя одним UPDATE:
+    ``change_counters(user.pk, posts_count=1)``. Уменьшение не опускает
+    счётчик ниже нуля: строки, созданные мимо представлений (админка,
+    фикстуры), его не сдвигали.
+    """
+    CustomUser.objects.filter(pk=user_id).update(**{
+        field: F(field) + delta if delta >= 0
+        else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase
+
+from users.models import CustomUser
+
+
+class CustomBackendTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username="Lena", email="Lena@Yatube.ru", password="secret-pass"
+        )
+
+    def test_login_by_username_or_email_ignores_case(self):
+        for login in ("Lena", "lena", "lena@yatube.ru", " LENA@YATUBE.RU"):
+            with self.subTest(login=login):
+                self.assertEqual(
+                    authenticate(username=login, password="secret-pass"),
+                    self.user,
+                )
+
+    def test_login_is_one_query(self):
+        with self.assertNumQueries(1):
+            authenticate(username="lena@yatube.ru", password="secret-pass")
+
+    def test_wrong_password(self):
+        self.assertIsNone(authenticate(username="Lena", password="wrong"))
+
+    def test_unknown_login_still_hashes(self):
+        with mock.patch.object(CustomUser, "set_password") as set_password:
+            self.assertIsNone(
+                authenticate(username="nobody", password="secret-pass")
+            )
+        set_password.assert_called_once_with("secret-pass")
+
+    def test_exact_username_wins_over_case_insensitive_match(self):
+        other = CustomUser.objects.create_user(
+            username="lena", email="other@yatube.ru", password="other-pass"
+        )
+        self.assertEqual(
+            authenticate(username="lena", password="other-pass"), other
+        )
+
+    def test_legacy_hash_is_upgraded(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            password=make_password("secret-pass", hasher="pbkdf2_sha1")
+        )
+        self.assertEqual(
+            authenticate(username="Lena", password="secret-pass"), self.user
+        )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
@@ -0,0 +1,349 @@
+"""
+Двухуровневый кэш: маленький LRU в памяти процесса перед общим для
+всех воркеров хранилищем.
+
+Общее хранилище — другой алиас из ``CACHES``, его имя задаётся в
+``LOCATION`` (``SharedFileCache`` в каталоге или memcached/Redis; кэш
+включается только боевым профилем). Запись идёт в общее хранилище и в
+локальный уровень, чтение — сначала из локального.
+
+Межпроцессная инвалидация — по ключам, через журнал в общем хранилище:
+``set`` существующего ключа, ``delete`` и ``incr`` увеличивают счётчик
+``SEQUENCE_KEY`` и пишут изменённый ключ под ``LOG_KEY`` с его номером.
+Процесс не чаще раза в ``SYNC_INTERVAL`` секунд читает счётчик и
+``get_many`` новых записей журнала и удаляет из своего LRU только эти
+ключи, так что частые сдвиги версий (``cards``, ``pagecache``) не
+выбрасывают остальной локальный уровень. Если записей больше
+``LOG_SIZE`` (так делает ``clear``), часть журнала уже истекла или
+процесс давно не сверялся, локальный уровень сбрасывается целиком.
+Локальная запись к тому же живёт не дольше ``LOCAL_TIMEOUT`` секунд:
+у ``SharedFileCache`` ``incr`` не атомарен, и потерянная запись журнала
+устаревает самое позднее через это время. Свой процесс видит запись сразу.
+
+``get_or_set`` с вычисляемым значением склеивает одновременные промахи:
+внутри процесса ждут на блокировке ключа, между процессами — на
+``add`` ключа-замка в общем хранилище. Таймаут записи случайно
+удлиняется до ``JITTER`` долей, чтобы ключи, записанные вместе, не
+истекали разом.
+
+Попадания и промахи каждого уровня считаются в процессе и отдаются
+через ``tier_stats()`` (и на ``/metrics/``).
+"""
+import pickle
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+SEQUENCE_KEY = 'two_tier:sequence'
+LOG_KEY = 'two_tier:log:{}'
+LOCK_KEY = 'two_tier:lock:{}'
+LOCK_STRIPES = 64
+_MISSING = object()
+
+
+class LocalTier:
+    """LRU процесса, общий для всех потоков (как у ``LocMemCache``)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.key_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.sequence = None
+        self.synced = 0.0
+        self.counts = {'local_hits': 0, 'local_misses': 0,
+                       'remote_hits': 0, 'remote_misses': 0}
+
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.counts['local_hits'] += 1
+                return entry[0]
+            if entry is not None:
+                del self.entries[key]
+            self.counts['local_misses'] += 1
+        return None
+
+    def set(self, key, pickled, timeout):
+        with self.lock:
+            self.entries[key] = (pickled, time.monotonic() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def key_lock(self, key):
+        return self.key_locks[hash(key) % LOCK_STRIPES]
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class SharedFileCache(FileBasedCache):
+    """
+    Общее хранилище в каталоге. Штатный ``FileBasedCache`` ради проверки
+    ``MAX_ENTRIES`` перечисляет весь каталог при каждой записи; этот — в
+    среднем раз в ``OPTIONS['CULL_EVERY']`` записей. Кроме того, запись
+    сжимается с окном 4 КБ: ``zlib.compress`` со стандартным окном
+    выделяет около 300 КБ на каждую запись.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_every = params.get('OPTIONS', {}).get('CULL_EVERY', 100)
+
+    def _cull(self):
+        if random.random() * self._cull_every < 1:
+            super()._cull()
+
+    def _write_content(self, file, timeout, value):
+        compressor = zlib.compressobj(1, zlib.DEFLATED, 12, 2)
+        file.write(pickle.dumps(self.get_backend_timeout(timeout),
+                                self.pickle_protocol))
+        file.write(compressor.compress(
+            pickle.dumps(value, self.pickle_protocol)
+        ) + compressor.flush())
+
+
+def _rate(hits, misses):
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.remote_alias = location
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.sync_interval = options.get('SYNC_INTERVAL', 1)
+        self.jitter = options.get('JITTER', 0.1)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.lock_poll = options.get('LOCK_POLL', 0.05)
+        self.log_size = options.get('LOG_SIZE', 1000)
+        # Запись журнала нужна, пока жива локальная копия ключа в процессе,
+        # который сверялся перед самой записью.
+        self.log_timeout = 2 * self.local_timeout + self.sync_interval
+        with _tiers_lock:
+            self.local = _tiers.get(location)
+            if self.local is None:
+                self.local = _tiers[location] = LocalTier(
+                    options.get('LOCAL_MAX_ENTRIES', 1000)
+                )
+
+    @property
+    def remote(self):
+        return caches[self.remote_alias]
+
+    def jittered(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None or timeout <= 0:
+            return timeout
+        return timeout * (1 + random.uniform(0, self.jitter))
+
+    def local_timeout_for(self, timeout):
+        if timeout is None:
+            return self.local_timeout
+        return min(self.local_timeout, timeout)
+
+    def sync(self):
+        """Убирает из локального уровня ключи, изменённые другими."""
+        local = self.local
+        now = time.monotonic()
+        if now - local.synced < self.sync_interval:
+            return
+        sequence = self.remote.get(SEQUENCE_KEY, 0)
+        with local.lock:
+            last = local.sequence
+            stale = now - local.synced > self.local_timeout
+            local.synced = now
+        if sequence == last:
+            return
+        changed = None
+        if last is not None and not stale and (
+            last < sequence <= last + self.log_size
+        ):
+            names = [LOG_KEY.format(number)
+                     for number in range(last + 1, sequence + 1)]
+            logged = self.remote.get_many(names)
+            if len(logged) == len(names):
+                changed = logged.values()
+        with local.lock:
+            local.sequence = sequence
+            if changed is None:
+                local.entries.clear()
+            else:
+                for key in changed:
+                    local.entries.pop(key, None)
+
+    def invalidate(self, local_key):
+        """Записывает изменённый ключ в журнал для других процессов."""
+        remote = self.remote
+        remote.add(SEQUENCE_KEY, 0, timeout=None)
+        try:
+            sequence = remote.incr(SEQUENCE_KEY)
+        except ValueError:
+            # Счётчик вытеснили между add и incr: журнал начинается заново,
+            # процессы со старым номером сбросят локальный уровень целиком.
+            sequence = 1
+            remote.set(SEQUENCE_KEY, sequence, timeout=None)
+        remote.set(LOG_KEY.format(sequence), local_key,
+                   timeout=self.log_timeout)
+
+    def remember(self, key, value, timeout):
+        if timeout is not None and timeout <= 0:
+            return
+        self.local.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                       self.local_timeout_for(timeout))
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version)
+        self.sync()
+        pickled = self.local.get(local_key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+        value = self.remote.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.local.count('remote_misses')
+            return default
+        self.local.count('remote_hits')
+        self.remember(local_key, value, None)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.jittered(timeout)
+        local_key = self.make_key(key, version)
+        # Ключ-версию обычно только что читали — тогда он есть локально,
+        # и лишний раз спрашивать общее хранилище не нужно.
+        existed = (local_key in self.local
+                   or self.remote.has_key(key, version=version))
+        self.remote.set(key, value, timeout=timeout, version=version)
+        self.remember(local_key, value, timeout)
+        if existed:
+            self.invalidate(local_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.jittered(timeout)
+        added = self.remote.add(key, value, timeout=timeout, version=version)
+        if added:
+            self.remember(self.make_key(key, version), value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.remote.touch(key, timeout=self.jittered(timeout),
+                                 version=version)
+
+    def delete(self, key, version=None):
+        local_key = self.make_key(key, version)
+        self.local.delete(local_key)
+        deleted = self.remote.delete(key, version=version)
+        if deleted:
+            self.invalidate(local_key)
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_key(key, version)
+        self.local.delete(local_key)
+        value = self.remote.incr(key, delta, version=version)
+        self.invalidate(local_key)
+        return value
+
+    def clear(self):
+        # Счётчик журнала перепрыгивает больше чем на LOG_SIZE записей:
+        # остальные процессы сбросят локальные уровни при следующей сверке.
+        sequence = self.remote.get(SEQUENCE_KEY, 0)
+        self.local.clear()
+        self.remote.clear()
+        self.remote.set(SEQUENCE_KEY, sequence + self.log_size + 1,
+                        timeout=None)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Как ``BaseCache.get_or_set``, но вычисляемое значение при
+        одновременных промахах считает только один поток одного процесса.
+        """
+        value = self.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version)
+        with self.local.key_lock(self.make_key(key, version)):
+            value = self.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                return value
+            lock_key = LOCK_KEY.format(self.make_key(key, version))
+            if self.remote.add(lock_key, 1, timeout=self.lock_timeout):
+                try:
+                    return self.compute(key, default, timeout, version)
+                finally:
+                    self.remote.delete(lock_key)
+            value = self.wait_for(key, version)
+            if value is not _MISSING:
+                return value
+            # Соседний процесс не успел: считаем сами.
+            return self.compute(key, default, timeout, version)
+
+    def compute(self, key, default, timeout, version):
+        value = default()
+        self.add(key, value, timeout, version)
+        return self.get(key, value, version=version)
+
+    def wait_for(self, key, version):
+        """Ждёт значение, которое считает другой процесс."""
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll)
+            value = self.remote.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self.remember(self.make_key(key, version), value, None)
+                return value
+        return _MISSING
+
+    def tier_stats(self):
+        with self.local.lock:
+            counts = dict(self.local.counts)
+            size = len(self.local.entries)
+        return {
+            'local': {
+                'hits': counts['local_hits'],
+                'misses': counts['local_misses'],
+                'hit_rate': _rate(counts['local_hits'],
+                                  counts['local_misses']),
+                'entries': size,
+            },
+            'remote': {
+                'hits': counts['remote_hits'],
+                'misses': counts['remote_misses'],
+                'hit_rate': _rate(counts['remote_hits'],
+                                  counts['remote_misses']),
+            },
+        }
@@ -0,0 +1,53 @@
+"""
+SQLite для боевой нагрузки.
+
+Поверх штатного бэкенда каждое новое соединение получает PRAGMA из
+``OPTIONS['pragmas']`` (по умолчанию — ``DEFAULT_PRAGMAS``): журнал WAL,
+чтобы читатели не ждали писателя, ``synchronous=NORMAL``, отображение
+файла в память, увеличенный кэш страниц и ``busy_timeout``, в течение
+которого писатель ждёт освободившуюся блокировку, а не падает с
+«database is locked».
+
+Транзакции ``atomic`` начинаются с ``BEGIN IMMEDIATE``
+(``OPTIONS['transaction_mode']``): блокировка записи берётся сразу,
+и транзакция не упирается в ``SQLITE_BUSY`` при попытке повысить
+блокировку чтения до записи — эту ошибку ``busy_timeout`` не лечит.
+
+Постоянные соединения включаются штатным ``CONN_MAX_AGE``.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, *args, **kwargs):
+        options = dict(settings_dict.get('OPTIONS', {}))
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.pop('pragmas', {})}
+        self.transaction_mode = options.pop(
+            'transaction_mode', 'IMMEDIATE'
+        ).upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из {TRANSACTION_MODES}.'
+            )
+        settings_dict = {**settings_dict, 'OPTIONS': options}
+        super().__init__(settings_dict, *args, **kwargs)
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,115 @@
+"""
+Сколько стоит импорт каждого модуля при старте и кто его импортировал.
+
+``python -X importtime`` не видит модулей, загруженных через
+``importlib.import_module``, — а так Django грузит приложения, модели и
+библиотеки тегов. Поэтому замер идёт в отдельном интерпретаторе с
+поисковиком в начале ``sys.meta_path`` (``HOOK``), который оборачивает
+``exec_module`` загрузчика каждого найденного модуля. Модуль приписан
+тому модулю, который исполнялся, когда его импортировали впервые;
+«своё» время — без вложенных импортов.
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+# Исполняется в дочернем интерпретаторе до импорта цели: только sys и
+# time, чтобы сам замер не загружал лишних модулей.
+HOOK = '''
+import sys
+import time
+
+stack = []
+records = []
+
+
+class TimingFinder:
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Встроенные и замороженные модули грузит сам класс загрузчика.
+        if loader is None or isinstance(loader, type):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            parent = stack[-1][0] if stack else ''
+            stack.append([name, 0.0])
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - started
+                children = stack.pop()[1]
+                if stack:
+                    stack[-1][1] += elapsed
+                records.append((name, elapsed - children, elapsed, parent))
+
+        loader.exec_module = timed_exec_module
+        return spec
+
+
+sys.meta_path.insert(0, TimingFinder())
+try:
+    __import__(sys.argv[1])
+finally:
+    for record in records:
+        sys.stderr.write('import profile:%s\\t%d\\t%d\\t%s\\n' % (
+            record[0], record[1] * 1e6, record[2] * 1e6, record[3]))
+'''
+PREFIX = 'import profile:'
+
+
+@dataclass
+class ImportEntry:
+    name: str
+    self_us: int
+    cumulative_us: int
+    parent: str = None
+
+    @property
+    def package(self):
+        return self.name.split('.')[0]
+
+
+def parse_profile(lines):
+    """Записи ``ImportEntry`` в порядке завершения импорта."""
+    entries = []
+    for line in lines:
+        if not line.startswith(PREFIX):
+            continue
+        name, self_us, cumulative_us, parent = (
+            line[len(PREFIX):].rstrip('\n').split('\t')
+        )
+        entries.append(ImportEntry(name, int(self_us), int(cumulative_us),
+                                   parent or None))
+    return entries
+
+
+def profile_imports(target, env=None, cwd=None):
+    """Импортирует ``target`` в новом интерпретаторе и меряет импорты."""
+    result = subprocess.run(
+        [sys.executable, '-W', 'ignore', '-c', HOOK, target],
+        env={**os.environ, **(env or {})}, cwd=cwd,
+        capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_profile(result.stderr.splitlines())
+
+
+def package_totals(entries):
+    """Собственное время модулей, сложенное по пакетам верхнего уровня."""
+    totals = defaultdict(int)
+    for entry in entries:
+        totals[entry.package] += entry.self_us
+    return sorted(totals.items(), key=lambda item: -item[1])
@@ -0,0 +1,234 @@
+"""
+Лёгкие метрики запросов: число SQL-запросов, время в базе, время
+рендеринга шаблонов и полное время ответа по каждой вьюхе.
+
+Замеры копятся в гистограммах внутри процесса и отдаются на
+``/metrics/`` в текстовом формате Prometheus. У каждого процесса
+воркера свои гистограммы, суммировать их — задача сборщика.
+
+Запросы к базе считаются обёрткой ``execute_wrapper``, которая
+ставится на каждое новое соединение; текущий запрос она находит через
+``ContextVar``, поэтому учитываются и запросы, выполненные в потоках
+``sync_to_async``.
+"""
+import bisect
+import contextvars
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+current_collector = contextvars.ContextVar('metrics_collector', default=None)
+
+
+class Collector:
+    """
+    Замеры одного запроса. SQL-запросы могут приходить сразу из
+    нескольких потоков (``posts.concurrency.gather_queries``), поэтому
+    счётчики запросов меняются под блокировкой.
+    """
+
+    def __init__(self, capture_sql=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.capture_sql = capture_sql
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def add_query(self, elapsed, sql, params):
+        with self._lock:
+            self.queries += 1
+            self.db_time += elapsed
+            if self.capture_sql:
+                self.statements.append((elapsed, sql, params))
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        with self._lock:
+            series = self._series.get(view)
+            if series is None:
+                series = self._series[view] = {
+                    'counts': [0] * (len(self.buckets) + 1),
+                    'sum': 0.0,
+                }
+            series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+            series['sum'] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def exposition(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(view, list(data['counts']), data['sum'])
+                      for view, data in series]
+        for view, counts, total in series:
+            label = _escape(view)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{view="{label}",le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            cumulative += counts[-1]
+            lines.append(
+                f'{self.name}_bucket{{view="{label}",le="+Inf"}} {cumulative}'
+            )
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {cumulative}')
+        return lines
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+REQUEST_DURATION = Histogram(
+    'yatube_request_duration_seconds',
+    'Полное время ответа вьюхи.', DURATION_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'yatube_request_db_seconds',
+    'Суммарное время SQL-запросов за запрос.', DURATION_BUCKETS,
+)
+REQUEST_TEMPLATE_TIME = Histogram(
+    'yatube_request_template_seconds',
+    'Время рендеринга шаблонов за запрос.', DURATION_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'yatube_request_queries',
+    'Число SQL-запросов за запрос.', QUERY_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_TIME, REQUEST_TEMPLATE_TIME,
+              REQUEST_QUERIES)
+
+
+def record(view, duration, collector):
+    REQUEST_DURATION.observe(view, duration)
+    REQUEST_DB_TIME.observe(view, collector.db_time)
+    REQUEST_TEMPLATE_TIME.observe(view, collector.template_time)
+    REQUEST_QUERIES.observe(view, collector.queries)
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+CACHE_HELP = {
+    'hits': 'Попадания в кэш по уровням.',
+    'misses': 'Промахи кэша по уровням.',
+}
+
+
+def cache_exposition():
+    """Счётчики уровней кэшей, у которых есть ``tier_stats()``."""
+    samples = {result: [] for result in CACHE_HELP}
+    for alias in settings.CACHES:
+        tier_stats = getattr(caches[alias], 'tier_stats', None)
+        if tier_stats is None:
+            continue
+        for tier, data in tier_stats().items():
+            labels = f'cache="{_escape(alias)}",tier="{tier}"'
+            for result, series in samples.items():
+                series.append((labels, data[result]))
+    lines = []
+    for result, series in samples.items():
+        if not series:
+            continue
+        name = f'yatube_cache_{result}_total'
+        lines.append(f'# HELP {name} {CACHE_HELP[result]}')
+        lines.append(f'# TYPE {name} counter')
+        lines.extend(f'{name}{{{labels}}} {value}' for labels, value in series)
+    return lines
+
+
+def exposition():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.exposition())
+    lines.extend(cache_exposition())
+    return '\n'.join(lines) + '\n'
+
+
+def count_queries(execute, sql, params, many, context):
+    collector = current_collector.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        collector.add_query(time.perf_counter() - started, sql, params)
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context=None, request=None):
+    collector = current_collector.get()
+    if collector is None:
+        return _original_render(self, context, request)
+    # Вложенный render_to_string (например, из тега аватара) уже входит
+    # во время внешнего шаблона.
+    collector.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        collector.template_depth -= 1
+        if not collector.template_depth:
+            collector.template_time += time.perf_counter() - started
+
+
+_installed = False
+
+
+def install():
+    """Подключает счётчик запросов к соединениям и замер шаблонов."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_wrap_connection,
+                               dispatch_uid='yatube.metrics')
+    Template.render = _timed_render
+
+
+def metrics_view(request):
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', settings.INTERNAL_IPS)
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
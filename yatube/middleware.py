@@ -0,0 +1,167 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .routers import RoutingState, routing_state
+
+logger = logging.getLogger('yatube.slow_requests')
+
+METRICS_VIEW_MODULES = ('posts.views', 'users.views', 'about.views')
+REPLICA_VIEWS = (
+    'posts.views.index',
+    'posts.views.groups',
+    'posts.views.trending',
+    'posts.views.group_posts',
+    'posts.views.profile',
+    'posts.views.post_view',
+)
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def view_name(view_func):
+    view_class = getattr(view_func, 'view_class', None)
+    if view_class is not None:
+        return f'{view_class.__module__}.{view_class.__name__}'
+    return f'{view_func.__module__}.{view_func.__name__}'
+
+
+class MetricsMiddleware:
+    """
+    Замеряет запросы к вьюхам из ``METRICS_VIEW_MODULES`` и пишет их
+    в гистограммы ``yatube.metrics``.
+
+    Доля ``METRICS_SLOW_SAMPLE_RATE`` запросов собирает тексты SQL; если
+    такой запрос оказался дольше ``METRICS_SLOW_REQUEST_SECONDS``, он
+    уходит в лог ``yatube.slow_requests`` вместе с самыми долгими
+    SQL-запросами.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.modules = tuple(
+            getattr(settings, 'METRICS_VIEW_MODULES', METRICS_VIEW_MODULES)
+        )
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_SECONDS',
+                                    1.0)
+        self.sample_rate = getattr(settings, 'METRICS_SLOW_SAMPLE_RATE', 0.1)
+        metrics.install()
+        # Соединения, открытые до установки, обёртку ещё не получили.
+        for connection in connections.all():
+            metrics._wrap_connection(None, connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self._finish(request, token, started)
+        return response
+
+    async def __acall__(self, request):
+        token, started = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._finish(request, token, started)
+        return response
+
+    def _start(self, request):
+        collector = metrics.Collector(
+            capture_sql=random.random() < self.sample_rate
+        )
+        return metrics.current_collector.set(collector), time.perf_counter()
+
+    def _finish(self, request, token, started):
+        duration = time.perf_counter() - started
+        collector = metrics.current_collector.get()
+        metrics.current_collector.reset(token)
+        match = getattr(request, 'resolver_match', None)
+        if match is None or match.func.__module__ not in self.modules:
+            return
+        view = view_name(match.func)
+        metrics.record(view, duration, collector)
+        if collector.capture_sql and duration >= self.slow_seconds:
+            self._log_slow(request, view, duration, collector)
+
+    def _log_slow(self, request, view, duration, collector):
+        statements = sorted(collector.statements, key=lambda item: -item[0])
+        lines = [
+            f'{elapsed * 1000:.1f} ms: {sql} {params!r}'
+            for elapsed, sql, params in statements[:10]
+        ]
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.0f ms, SQL %d за %.0f ms, '
+            'шаблоны %.0f ms\n%s',
+            request.method, request.get_full_path(), view,
+            duration * 1000, collector.queries, collector.db_time * 1000,
+            collector.template_time * 1000, '\n'.join(lines),
+        )
+
+
+class ReplicaMiddleware:
+    """
+    Пускает безопасные запросы к ``REPLICA_VIEWS`` читать с реплик
+    (см. ``yatube.routers``) и ставит cookie прилипания к основной
+    базе, если запрос что-то записал.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = set(getattr(settings, 'REPLICA_VIEWS', REPLICA_VIEWS))
+        self.cookie = getattr(settings, 'REPLICA_STICKY_COOKIE',
+                              'use_primary')
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self._finish(state, response)
+
+    def _start(self, request):
+        state = RoutingState(sticky=self.cookie in request.COOKIES)
+        request.routing_state = state
+        return state, routing_state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(self.cookie, '1',
+                                max_age=self.sticky_seconds, httponly=True,
+                                samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Объект состояния общий, поэтому флаг виден и тогда, когда
+        # process_view выполняется в другом потоке под ASGI.
+        if (request.method in SAFE_METHODS
+                and view_name(view_func) in self.views):
+            request.routing_state.use_replica = True
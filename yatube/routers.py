@@ -0,0 +1,67 @@
+"""
+Чтение с реплик.
+
+Реплики — алиасы из ``DATABASES``, перечисленные в
+``DATABASE_REPLICAS``. ``ReplicaMiddleware`` разрешает ходить на них
+только безопасным запросам к вьюхам из ``REPLICA_VIEWS``; всё прочее,
+включая сессии и аутентификацию, читает основную базу.
+
+Запрос, который хоть что-то записал, ставит cookie
+``REPLICA_STICKY_COOKIE`` на ``REPLICA_STICKY_SECONDS``: пока она жива,
+этот клиент читает только основную базу и видит свои же записи, даже
+если реплики отстают.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+routing_state = contextvars.ContextVar('routing_state', default=None)
+
+# Сессии читаются только с основной базы: отставшая реплика «разлогинила»
+# бы пользователя сразу после входа.
+PRIMARY_APPS = ('sessions',)
+
+
+class RoutingState:
+    """Состояние маршрутизации одного запроса."""
+
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.use_replica = False
+        self.wrote = False
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        replicas = get_replicas()
+        if (replicas and state is not None and state.use_replica
+                and not state.sticky and not state.wrote
+                and model._meta.app_label not in PRIMARY_APPS):
+            return random.choice(replicas)
+        # Остальное решает Django: база объекта-подсказки или основная.
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики — копии основной базы, схему в них не накатываем.
+        if db in get_replicas():
+            return False
+        return None
@@ -0,0 +1,19 @@
+"""
+Настройки проекта. Профиль выбирает переменная окружения ``YATUBE_ENV``:
+``development`` (по умолчанию) или ``production``. Профиль можно указать
+и напрямую: ``DJANGO_SETTINGS_MODULE=yatube.settings.production``.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+ENVIRONMENT = os.environ.get('YATUBE_ENV', 'development')
+
+if ENVIRONMENT == 'production':
+    from .production import *  # noqa: F401,F403
+elif ENVIRONMENT == 'development':
+    from .development import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль настроек YATUBE_ENV={ENVIRONMENT!r}'
+    )
@@ -1,11 +1,14 @@
+"""
+Общие настройки профилей ``development`` и ``production``.
+"""
 import os
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
 
-SECRET_KEY = 'xboc%%=g4hvu&c7&h7-d7f6*zem5o4154z#_uhj1sndp=o0+k!'
-
-DEBUG = True
+DEBUG = False
 
 ALLOWED_HOSTS = [
     "localhost",
@@ -16,7 +19,7 @@ ALLOWED_HOSTS = [
 
 INTERNAL_IPS = [
     "127.0.0.1",
-] 
+]
 
 # Application definition
 
@@ -31,20 +34,19 @@ INSTALLED_APPS = [
     'posts',
     'about',
     'sorl.thumbnail',
-    'debug_toolbar',
     'avatar',
-    
 ]
 
 MIDDLEWARE = [
+    'yatube.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'yatube.middleware.ReplicaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -66,7 +68,16 @@ TEMPLATES = [
     },
 ]
 
+# Компилировать все шаблоны при старте воркера (yatube.warmup). Имеет
+# смысл только с кэширующим загрузчиком — см. yatube/settings/production.py.
+TEMPLATE_WARMUP = False
+# Загружать URLconf, шаблоны и стек картинок при старте и замораживать
+# объекты для сборщика мусора (yatube.warmup.preload) — для серверов,
+# форкающих воркеры после импорта приложения (gunicorn --preload).
+PRELOAD = False
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
 
 
 # Database
@@ -74,13 +85,32 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'yatube.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Реплики только для чтения — алиасы из DATABASES, например
+# 'replica': {'ENGINE': 'yatube.backends.sqlite3',
+#             'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+#             'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['yatube.routers.ReplicaRouter']
+# Сколько секунд после записи клиент читает только основную базу.
+REPLICA_STICKY_SECONDS = 10
+
+# Вклад события в популярность поста или группы затухает вдвое за это
+# число часов; recompute_trending учитывает последние TRENDING_WINDOW_DAYS.
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_DAYS = 7
+
+# Сколько рекомендаций «на кого подписаться» хранить на пользователя и
+# авторов с каким числом читателей не учитывать в совместных подписках.
+RECOMMENDATIONS_PER_USER = 20
+COFOLLOW_READERS_LIMIT = 1000
+
 AUTHENTICATION_BACKENDS = (
-    'django.contrib.auth.backends.ModelBackend',
     'users.authentication.CustomBackend',
 )
 
@@ -104,10 +134,12 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Кэш процесса: в разработке и тестах он живёт не дольше процесса и не
+# переживает пересоздание базы. Боевой профиль ставит двухуровневый кэш.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
 }
 
 # Internationalization
@@ -132,10 +164,23 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 STATIC_URL = '/static/'
+# Раздавать статику и медиа самим Django при выключенном DEBUG, если
+# перед ним нет nginx или CDN (yatube.static). Файлы с хешем в имени
+# кэшируются браузером на STATIC_MAX_AGE, остальные — на MEDIA_MAX_AGE.
+STATIC_SERVE = False
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+MEDIA_MAX_AGE = 60 * 60
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 LOGOUT_REDIRECT_URL = "/auth/login/"
 AVATAR_CACHE_ENABLED = False
+# URL аватаров для карточек кэшируются по версии автора (posts.avatars).
+AVATAR_URL_TIMEOUT = 24 * 60 * 60
 LOGIN_REDIRECT_URL = "index"
 AVATAR_EXPOSE_USERNAMES = False
 DEFAULT_AUTO_FIELD='django.db.models.AutoField'
+
+# Метрики запросов (yatube.middleware.MetricsMiddleware)
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+METRICS_SLOW_SAMPLE_RATE = 0.1
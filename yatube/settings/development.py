@@ -0,0 +1,18 @@
+"""
+Профиль разработки: ``DEBUG``, панель отладки, статика и медиа через
+``runserver``.
+"""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE
+
+# Ключ из репозитория годится только для разработки.
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'xboc%%=g4hvu&c7&h7-d7f6*zem5o4154z#_uhj1sndp=o0+k!'
+)
+
+DEBUG = True
+
+INSTALLED_APPS = [*INSTALLED_APPS, 'debug_toolbar']
+MIDDLEWARE = [*MIDDLEWARE, 'debug_toolbar.middleware.DebugToolbarMiddleware']
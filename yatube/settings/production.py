@@ -0,0 +1,106 @@
+"""
+Боевой профиль: ``YATUBE_ENV=production``.
+
+Отличается от разработки выключенным ``DEBUG``, отсутствием панели
+отладки и явным кэширующим загрузчиком шаблонов: с ``DEBUG = True``
+Django его не включает, и каждый ``{% include %}`` заново читает и
+компилирует шаблон. Шаблоны компилируются при старте воркера
+(``TEMPLATE_WARMUP``), поэтому первые запросы не платят за разбор
+``nav.html``, ``menu.html``, ``post_item.html`` и остальных включений.
+
+Статика собирается ``collectstatic`` с хешами в именах и отдаётся с
+долгим ``Cache-Control`` (``yatube.static``). ``SECRET_KEY`` и
+``ALLOWED_HOSTS`` обязательно задаются в ``DJANGO_SECRET_KEY`` и
+``DJANGO_ALLOWED_HOSTS`` (через запятую): без них профиль не
+загружается, а не молча берёт значения разработки. ``YATUBE_PRELOAD=1``
+включает загрузку приложения до fork воркеров (см. ``yatube.warmup``).
+
+Кэш двухуровневый (``yatube.backends.cache``), общий уровень лежит в
+``YATUBE_CACHE_DIR``; в разработке и тестах кэш живёт в процессе.
+"""
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASE_REPLICAS, MIDDLEWARE, TEMPLATES
+
+
+def required_env(name):
+    value = os.environ.get(name, '').strip()
+    if not value:
+        raise ImproperlyConfigured(
+            f'Для профиля production задайте переменную окружения {name}'
+        )
+    return value
+
+
+SECRET_KEY = required_env('DJANGO_SECRET_KEY')
+ALLOWED_HOSTS = [
+    host.strip() for host in required_env('DJANGO_ALLOWED_HOSTS').split(',')
+    if host.strip()
+]
+
+DEBUG = False
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    # С явным списком loaders APP_DIRS должен быть выключен: каталоги
+    # приложений ищет app_directories.Loader внутри кэширующего.
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        # Контекст debug без DEBUG всё равно пуст.
+        'context_processors': [
+            processor for processor in TEMPLATES[0]['OPTIONS'][
+                'context_processors'
+            ]
+            if processor != 'django.template.context_processors.debug'
+        ],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+TEMPLATE_WARMUP = True
+PRELOAD = os.environ.get('YATUBE_PRELOAD') == '1'
+
+# Без реплик маршрутизатор и ReplicaMiddleware ничего не меняют, а
+# работают на каждом запросе и каждом SQL-запросе.
+if not DATABASE_REPLICAS:
+    DATABASE_ROUTERS = []
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE
+        if middleware != 'yatube.middleware.ReplicaMiddleware'
+    ]
+
+# Маленький LRU в каждом процессе перед общим для всех воркеров
+# хранилищем (yatube.backends.cache). Вместо каталога 'shared' может быть
+# memcached или Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'yatube.backends.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'SYNC_INTERVAL': 1,
+            'JITTER': 0.1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'yatube.backends.cache.SharedFileCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'yatube-cache'),
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_EVERY': 100},
+    },
+}
+
+STATICFILES_STORAGE = 'yatube.static.ManifestStorage'
+STATIC_SERVE = os.environ.get('YATUBE_SERVE_STATIC', '1') == '1'
@@ -0,0 +1,68 @@
+"""
+Статика и медиа в боевом профиле.
+
+``collectstatic`` с ``ManifestStorage`` кладёт файлы с хешем содержимого
+в имени (``base.0123456789ab.css``), и ``{% static %}`` ссылается на
+них. Такой файл никогда не меняется, поэтому при ``STATIC_SERVE = True``
+он отдаётся с ``Cache-Control: public, max-age=STATIC_MAX_AGE,
+immutable``: браузер не переспрашивает его до смены хеша. Файлы без
+хеша и медиа кэшируются на ``MEDIA_MAX_AGE``.
+
+С ``DEBUG`` статику и медиа, как и раньше, отдаёт ``runserver``.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.urls import re_path
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+STATIC_MAX_AGE = getattr(settings, 'STATIC_MAX_AGE', 365 * 24 * 60 * 60)
+MEDIA_MAX_AGE = getattr(settings, 'MEDIA_MAX_AGE', 60 * 60)
+# Хеш, который ManifestStaticFilesStorage вставляет перед расширением.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+
+
+class ManifestStorage(ManifestStaticFilesStorage):
+    """
+    Ссылка на файл, которого нет в манифесте (например, подключённый в
+    шаблоне, но не собранный ``collectstatic``), остаётся без хеша, а не
+    роняет страницу ``ValueError``.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+def serve_static(request, path):
+    response = serve(request, path, document_root=settings.STATIC_ROOT)
+    if HASHED_NAME.search(path):
+        patch_cache_control(response, public=True, max_age=STATIC_MAX_AGE,
+                            immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=MEDIA_MAX_AGE)
+    return response
+
+
+def serve_media(request, path):
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    patch_cache_control(response, public=True, max_age=MEDIA_MAX_AGE)
+    return response
+
+
+def _prefix(url):
+    return r'^{}(?P<path>.*)$'.format(re.escape(url.lstrip('/')))
+
+
+def static_urlpatterns():
+    """Маршруты статики и медиа для ``STATIC_SERVE`` без ``DEBUG``."""
+    return [
+        re_path(_prefix(settings.STATIC_URL), serve_static),
+        re_path(_prefix(settings.MEDIA_URL), serve_media),
+    ]
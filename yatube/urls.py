@@ -4,12 +4,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from .metrics import metrics_view
+from .static import static_urlpatterns
+
 handler404 = "posts.views.page_not_found"
 handler500 = "posts.views.server_error"
 
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("adminmysite/", admin.site.urls),
+    path("metrics/", metrics_view, name="metrics"),
     path("auth/", include("django.contrib.auth.urls")),
     path("", include("posts.urls")),
 
@@ -18,10 +22,14 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
-    import debug_toolbar
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
+elif settings.STATIC_SERVE:
+    urlpatterns += static_urlpatterns()
+
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    import debug_toolbar
     urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)
     
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Прогрев процесса при старте (см. ``wsgi.py`` и ``asgi.py``).
+
+С кэширующим загрузчиком шаблонов (боевой профиль
+``YATUBE_ENV=production``) каждый шаблон читается с диска и
+компилируется при первом обращении к нему, то есть на первых запросах
+каждого воркера. ``warm_templates`` заранее компилирует все шаблоны из
+каталогов загрузчиков, кроме шаблонов самого Django (админка, виджеты
+форм) — на горячих страницах они не нужны.
+
+С ``PRELOAD`` процесс загружает и всё остальное, что обычно грузится на
+первых запросах (``preload``). Это имеет смысл, когда сервер импортирует
+приложение в мастер-процессе и потом форкает воркеры (``gunicorn
+--preload``): воркеры стартуют готовыми и делят эту память с мастером.
+"""
+import gc
+import logging
+import os
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.urls import get_resolver
+from django.utils.autoreload import is_django_path
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = ('.html', '.txt')
+
+
+def template_names(engine):
+    """Имена шаблонов в каталогах загрузчиков движка, по одному разу."""
+    names = []
+    seen = set()
+    for loader in engine.template_loaders:
+        if not hasattr(loader, 'get_dirs'):
+            continue
+        for directory in loader.get_dirs():
+            directory = str(directory)
+            if is_django_path(directory) or not os.path.isdir(directory):
+                continue
+            for root, _, files in os.walk(directory):
+                for file_name in sorted(files):
+                    if not file_name.endswith(TEMPLATE_SUFFIXES):
+                        continue
+                    name = os.path.relpath(os.path.join(root, file_name),
+                                           directory).replace(os.sep, '/')
+                    if name not in seen:
+                        seen.add(name)
+                        names.append(name)
+    return names
+
+
+def warm_templates():
+    """
+    Компилирует шаблоны всех движков Django. Возвращает число
+    скомпилированных шаблонов и список ``(имя, ошибка)`` для шаблонов с
+    синтаксическими ошибками — они не мешают старту, а попадают в лог.
+    """
+    compiled = 0
+    errors = []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in template_names(backend.engine):
+            try:
+                backend.engine.get_template(name)
+            except TemplateSyntaxError as exc:
+                errors.append((name, exc))
+                logger.warning('Шаблон %s не компилируется: %s', name, exc)
+            else:
+                compiled += 1
+    return compiled, errors
+
+
+def preload_images():
+    """
+    Модули нарезки миниатюр и все плагины форматов PIL, которые иначе
+    загружаются при первой картинке.
+    """
+    from PIL import Image
+    from sorl.thumbnail.conf import settings as thumbnail_settings
+    Image.init()
+    for path in (thumbnail_settings.THUMBNAIL_BACKEND,
+                 thumbnail_settings.THUMBNAIL_ENGINE,
+                 thumbnail_settings.THUMBNAIL_KVSTORE):
+        import_string(path)
+
+
+def preload():
+    """
+    Загружает URLconf со всеми вьюхами, словари ``reverse()``, шаблоны
+    и стек картинок. Затем закрывает соединения с базами — сокет не должен
+    достаться нескольким процессам — и переносит все объекты в постоянное
+    поколение сборщика мусора: иначе первая же сборка в воркере запишет
+    в заголовки объектов, и общие с мастером страницы памяти скопируются.
+    """
+    # Заполнение словарей reverse() импортирует и весь URLconf.
+    get_resolver().reverse_dict
+    warm_templates()
+    preload_images()
+    connections.close_all()
+    gc.freeze()
+
+
+def warm_up():
+    if getattr(settings, 'PRELOAD', False):
+        preload()
+    elif getattr(settings, 'TEMPLATE_WARMUP', False):
+        warm_templates()